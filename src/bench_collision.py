@@ -0,0 +1,103 @@
+"""Microbenchmark of solidity queries and player collision.
+
+Compares reading each block's type (get_block(...) != AIR) against the
+packed solidity map behind is_solid, a per-tile loop against any_solid,
+and fast moves resolved by sub-stepping against one swept collision.
+
+Usage: python src/bench_collision.py
+"""
+import time
+
+import numpy as np
+
+from collision import move_and_collide
+from player import Player
+from world import World, BlockType
+
+def per_second(function, count):
+    start = time.perf_counter()
+    function()
+    return count / (time.perf_counter() - start)
+
+def run(queries=200000, seed=1):
+    world = World(1000, 400, seed=seed)
+    rng = np.random.default_rng(seed)
+    xs = rng.integers(0, world.width, queries).tolist()
+    ys = rng.integers(0, world.height, queries).tolist()
+    points = list(zip(xs, ys))
+
+    def block_type_lookup():
+        for x, y in points:
+            world.get_block(x, y) != BlockType.AIR
+
+    def solid_map_lookup():
+        for x, y in points:
+            world.is_solid(x, y)
+
+    # Player-sized rectangles: 2 columns by 3 rows of tiles
+    rects = [(x, y, x + 1, y + 2) for x, y in points[:queries // 4]]
+
+    def rect_loop():
+        for x0, y0, x1, y1 in rects:
+            any(world.is_solid(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1))
+
+    def rect_query():
+        for x0, y0, x1, y1 in rects:
+            world.any_solid(x0, y0, x1, y1)
+
+    # Fast bodies: up to 8 blocks per tick
+    moves = [(x * 32, y * 32, dx, dy) for (x, y), dx, dy in zip(
+        points[:queries // 20],
+        rng.integers(-64, 65, queries // 20).tolist(),
+        rng.integers(0, 257, queries // 20).tolist())]
+
+    def substeps():
+        for x, y, dx, dy in moves:
+            # Discrete checks need steps shorter than a block to not tunnel
+            steps = max(abs(dx), abs(dy)) // 31 + 1
+            for _ in range(steps):
+                x += dx / steps
+                if world.any_solid(int(x / 32), int(y / 32), int((x + 19) / 32), int((y + 39) / 32)):
+                    break
+                y += dy / steps
+                if world.any_solid(int(x / 32), int(y / 32), int((x + 19) / 32), int((y + 39) / 32)):
+                    break
+
+    def swept():
+        for x, y, dx, dy in moves:
+            move_and_collide(world, x, y, 20, 40, dx, dy)
+
+    players = [Player(world, x * 32, y * 32) for x, y in points[:200]]
+    ticks = 50
+
+    def player_ticks():
+        for _ in range(ticks):
+            for player in players:
+                player.moving_right = True
+                player.move()
+
+    return {
+        'block_type_lookups_per_s': per_second(block_type_lookup, queries),
+        'is_solid_per_s': per_second(solid_map_lookup, queries),
+        'rect_loop_per_s': per_second(rect_loop, len(rects)),
+        'any_solid_per_s': per_second(rect_query, len(rects)),
+        'substep_moves_per_s': per_second(substeps, len(moves)),
+        'swept_moves_per_s': per_second(swept, len(moves)),
+        'player_moves_per_s': per_second(player_ticks, ticks * len(players)),
+    }
+
+def main():
+    results = run()
+    print("point queries:  type %10.0f/s   solid map %10.0f/s   (%.1fx)" % (
+        results['block_type_lookups_per_s'], results['is_solid_per_s'],
+        results['is_solid_per_s'] / results['block_type_lookups_per_s']))
+    print("rect queries:   loop %10.0f/s   any_solid %10.0f/s   (%.1fx)" % (
+        results['rect_loop_per_s'], results['any_solid_per_s'],
+        results['any_solid_per_s'] / results['rect_loop_per_s']))
+    print("fast moves:     substeps %6.0f/s   swept %10.0f/s   (%.1fx)" % (
+        results['substep_moves_per_s'], results['swept_moves_per_s'],
+        results['swept_moves_per_s'] / results['substep_moves_per_s']))
+    print("Player.move:    %10.0f/s" % results['player_moves_per_s'])
+
+if __name__ == "__main__":
+    main()
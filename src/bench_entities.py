@@ -0,0 +1,82 @@
+"""Benchmark of the entity spatial hash with many moving entities.
+
+Each tick every entity takes a random step, then all overlapping pairs
+are found and a camera-sized rectangle is queried. The brute-force
+comparisons scan every entity (or every pair) instead.
+
+Usage: python src/bench_entities.py [count] [ticks]
+"""
+import sys
+import time
+
+import numpy as np
+
+from entities import Entity, EntityManager
+
+def run(count=10000, ticks=20, seed=0, world_size=(8400, 2400)):
+    rng = np.random.default_rng(seed)
+    width, height = world_size
+    manager = EntityManager()
+    entities = [manager.add(Entity(float(x), float(y), 20, 20))
+                for x, y in zip(rng.uniform(0, width, count), rng.uniform(0, height, count))]
+    steps = rng.uniform(-4, 4, (ticks, count, 2))
+    views = rng.uniform(0, 1, (ticks, 2)) * (width - 800, height - 600)
+
+    move_seconds = pair_seconds = query_seconds = 0.0
+    pairs = 0
+    for tick in range(ticks):
+        start = time.perf_counter()
+        for entity, (dx, dy) in zip(entities, steps[tick].tolist()):
+            manager.move(entity, entity.x + dx, entity.y + dy)
+        move_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        pairs += len(manager.collisions())
+        pair_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for _ in range(100):
+            manager.query_rect(views[tick, 0], views[tick, 1], 800, 600)
+        query_seconds += time.perf_counter() - start
+
+    # Brute force: a linear scan per query, and all pairs of a sample
+    view_x, view_y = views[-1]
+    start = time.perf_counter()
+    for _ in range(10):
+        [e for e in entities
+         if e.x < view_x + 800 and view_x < e.x + e.width and e.y < view_y + 600 and view_y < e.y + e.height]
+    scan_seconds = (time.perf_counter() - start) / 10
+
+    sample = entities[:1000]
+    start = time.perf_counter()
+    for i, a in enumerate(sample):
+        for b in sample[i + 1:]:
+            a.x < b.x + b.width and b.x < a.x + a.width and a.y < b.y + b.height and b.y < a.y + a.height
+    sample_seconds = time.perf_counter() - start
+    # All-pairs work grows with n^2
+    brute_pair_seconds = sample_seconds * (count / len(sample)) ** 2
+
+    return {
+        'count': count,
+        'ticks': ticks,
+        'move_ms': move_seconds / ticks * 1000,
+        'pairs_ms': pair_seconds / ticks * 1000,
+        'pairs_per_tick': pairs / ticks,
+        'view_query_us': query_seconds / (ticks * 100) * 1e6,
+        'view_scan_us': scan_seconds * 1e6,
+        'brute_pairs_ms': brute_pair_seconds * 1000,
+    }
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    results = run(count, ticks)
+    print("%d entities, %d ticks" % (results['count'], results['ticks']))
+    print("move all:        %8.2f ms/tick" % results['move_ms'])
+    print("overlapping pairs: %6.2f ms/tick (%.0f pairs), all-pairs scan ~%.0f ms" % (
+        results['pairs_ms'], results['pairs_per_tick'], results['brute_pairs_ms']))
+    print("camera query:    %8.1f us, linear scan %.1f us" % (
+        results['view_query_us'], results['view_scan_us']))
+
+if __name__ == "__main__":
+    main()
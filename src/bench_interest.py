@@ -0,0 +1,88 @@
+"""Per-client bandwidth of the multiplayer server as the player count grows.
+
+Players are spread evenly over a world that grows with them, each
+walking and digging at random. With interest management every client
+receives only its own area's chunks, block changes and players, so the
+bytes per client should stay flat; the broadcast column is what sending
+every change and every player to every client would cost instead.
+
+Usage: python src/bench_interest.py [ticks]
+"""
+import sys
+import time
+
+import numpy as np
+
+import protocol
+from server import GameServer
+from world import World
+
+class ByteCounter:
+    """Stands in for a client connection, counting what is written to it"""
+    def __init__(self):
+        self.bytes = 0
+
+    def write(self, data):
+        self.bytes += len(data)
+
+    async def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+def run(players, ticks=200, spacing=64, height=200, seed=1):
+    world = World(players * spacing, height, seed=seed)
+    server = GameServer(world)
+    clients = []
+    for i in range(players):
+        client = server.add_client(ByteCounter())
+        client.player.x = (i * spacing + spacing // 2) * 32
+        clients.append(client)
+    server.step()  # Initial chunks
+
+    rng = np.random.default_rng(seed)
+    start_bytes = sum(client.writer.bytes for client in clients)
+    broadcast_bytes = 0
+    start = time.perf_counter()
+    for tick in range(ticks):
+        for client in clients:
+            direction = int(rng.integers(3))
+            x, y = round(client.player.x), round(client.player.y)
+            action = protocol.ACTION_BREAK if rng.random() < 0.2 else protocol.ACTION_NONE
+            client.input = {
+                'sequence': tick, 'left': direction == 1, 'right': direction == 2,
+                'jump': bool(rng.random() < 0.05), 'action': action,
+                'target': (x // 32 + int(rng.integers(-2, 3)), y // 32 + int(rng.integers(0, 3))),
+            }
+        cursor = world.journal.cursor
+        server.step()
+        # Every change and every player, to every client
+        changes = world.changes_since(cursor)
+        everything = (len(protocol.encode_blocks(changes['x'], changes['y'], changes['new']))
+                      + protocol.FRAME.size + protocol.ENTITIES_HEADER.size
+                      + players * protocol.ENTITY_DTYPE.itemsize)
+        broadcast_bytes += everything * players
+    seconds = time.perf_counter() - start
+    sent = sum(client.writer.bytes for client in clients) - start_bytes
+
+    return {
+        'players': players,
+        'bytes_per_client_tick': sent / players / ticks,
+        'broadcast_bytes_per_client_tick': broadcast_bytes / players / ticks,
+        'tick_ms': seconds / ticks * 1000,
+        'tick_us_per_client': seconds / ticks / players * 1e6,
+    }
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    print("players  bytes/client/tick  broadcast  tick ms  us/client")
+    for players in (4, 16, 64, 256):
+        result = run(players, ticks)
+        print("%7d  %17.1f  %9.1f  %7.2f  %9.1f" % (
+            result['players'], result['bytes_per_client_tick'],
+            result['broadcast_bytes_per_client_tick'], result['tick_ms'],
+            result['tick_us_per_client']))
+
+if __name__ == "__main__":
+    main()
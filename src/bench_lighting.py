@@ -0,0 +1,59 @@
+"""Cost of keeping the light map up to date as blocks are edited.
+
+Digs and places blocks near the surface and underground, the way a
+player does, and times the incremental relight after each edit against
+recomputing the whole map.
+
+Usage: python src/bench_lighting.py [edits]
+"""
+import sys
+import time
+
+import numpy as np
+
+from lighting import LightMap
+from world import World, BlockType
+
+def run(edits=500, width=1000, height=400, seed=1):
+    world = World(width, height, seed=seed)
+    lighting = LightMap(world)
+    rng = np.random.default_rng(seed)
+
+    start = time.perf_counter()
+    for _ in range(5):
+        lighting.recompute()
+    full_ms = (time.perf_counter() - start) / 5 * 1000
+
+    # Edits within a few blocks of the surface, where sunlight is affected
+    surface = lighting.sky.copy()
+    xs = rng.integers(0, width, edits)
+    ys = np.clip(surface[xs] + rng.integers(-3, 20, edits), 0, height - 1)
+    blocks = [BlockType.AIR if block else BlockType.DIRT for block in rng.random(edits) < 0.7]
+    times = []
+    relit = lighting.relit_blocks
+    for x, y, block in zip(xs.tolist(), ys.tolist(), blocks):
+        world.set_block(x, y, block)
+        start = time.perf_counter()
+        lighting.sync()
+        times.append(time.perf_counter() - start)
+
+    times = np.array(times) * 1000
+    return {
+        'world': (width, height),
+        'full_ms': full_ms,
+        'edit_ms': times.mean(),
+        'edit_p99_ms': np.percentile(times, 99),
+        'blocks_per_edit': (lighting.relit_blocks - relit) / edits,
+    }
+
+def main():
+    edits = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    result = run(edits)
+    print("world %dx%d" % result['world'])
+    print("full recompute:  %8.2f ms" % result['full_ms'])
+    print("per block edit:  %8.3f ms (p99 %.3f ms, %.0f blocks relit)" % (
+        result['edit_ms'], result['edit_p99_ms'], result['blocks_per_edit']))
+    print("speedup:         %8.0fx" % (result['full_ms'] / result['edit_ms']))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Liquid tick cost against world size and against the amount moving.
+
+The same pool of water is let loose in worlds of growing size: with
+active-set scheduling the tick cost follows the moving water and stays
+flat, where stepping the whole world grows with its area. A lake
+released at once then compares stepping it block by block with NumPy.
+
+Usage: python src/bench_liquids.py [ticks]
+"""
+import sys
+import time
+
+import numpy as np
+
+from liquids import LiquidSim, flow
+from world import World, BlockType
+
+def flat_world(width, height, floor):
+    world = World(width, height, seed=1)
+    xs, ys = np.meshgrid(np.arange(width), np.arange(height))
+    blocks = np.where(ys >= floor, BlockType.STONE.value, BlockType.AIR.value)
+    world.set_blocks(xs.ravel(), ys.ravel(), blocks.ravel())
+    return world
+
+def pour(liquids, x0, y0, width, height):
+    for y in range(y0, y0 + height):
+        for x in range(x0, x0 + width):
+            liquids.add_liquid(x, y)
+
+def tick_ms(liquids, ticks):
+    start = time.perf_counter()
+    for _ in range(ticks):
+        liquids.step()
+    return (time.perf_counter() - start) / ticks * 1000
+
+def world_size(ticks=100):
+    """Same column of water, worlds of growing size"""
+    results = []
+    for width in (200, 1000, 4000):
+        height = width // 2
+        world = flat_world(width, height, height - 10)
+        liquids = LiquidSim(world)
+        pour(liquids, width // 2, height - 40, 4, 20)
+        active = tick_ms(liquids, ticks)
+
+        # Every block of the world, every tick
+        open_blocks = world.blocks == BlockType.AIR.value
+        level = liquids.level.astype(np.int32)
+        kind = liquids.kind.astype(np.int32)
+        start = time.perf_counter()
+        for _ in range(3):
+            flow(level, kind, open_blocks)
+        whole = (time.perf_counter() - start) / 3 * 1000
+        results.append((width, height, active, whole))
+    return results
+
+def release(ticks=100):
+    """A 100x40 lake let loose at once"""
+    results = {}
+    for name, vectorize in (('block by block', False), ('numpy', True), ('auto', None)):
+        world = flat_world(400, 200, 190)
+        liquids = LiquidSim(world, vectorize=vectorize)
+        pour(liquids, 150, 100, 100, 40)
+        results[name] = tick_ms(liquids, ticks)
+    return results
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    print("world        active set ms  whole world ms")
+    for width, height, active, whole in world_size(ticks):
+        print("%5dx%-5d  %13.3f  %14.2f" % (width, height, active, whole))
+    print()
+    print("lake release  ms/tick")
+    for name, ms in release(ticks).items():
+        print("%-14s %7.2f" % (name, ms))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark of the navigation graph on a large world.
+
+Builds the graph over the surface of the world, then times single A*
+queries between random surface nodes, batches of mobs all heading for
+one goal (answered by one backwards search) and the repair after a block
+edit.
+
+Usage: python src/bench_pathfinding.py [width] [queries]
+"""
+import sys
+import time
+
+import numpy as np
+
+from chunks import CHUNK_SIZE
+from pathfinding import NavGraph
+from world import World, BlockType
+
+def surface_nodes(graph, world, step=1):
+    """The highest node of every step-th column"""
+    nodes = []
+    for x in range(0, world.width, step):
+        for y in range(world.height):
+            if graph.is_node(x, y):
+                nodes.append((x, y))
+                break
+    return nodes
+
+def run(width=2000, height=400, queries=200, mobs=100, reach=60, seed=1):
+    world = World(width, height, seed=seed)
+    rng = np.random.default_rng(seed)
+
+    graph = NavGraph(world)
+    start = time.perf_counter()
+    nodes = surface_nodes(graph, world)
+    build_seconds = time.perf_counter() - start
+    links = sum(len(node_links) for nav in graph.chunks.values() for node_links in nav.links.values())
+
+    # Single queries between nodes up to reach blocks apart
+    pairs = []
+    while len(pairs) < queries:
+        a = int(rng.integers(len(nodes)))
+        b = int(np.clip(a + rng.integers(-reach, reach + 1), 0, len(nodes) - 1))
+        pairs.append((nodes[a], nodes[b]))
+    start = time.perf_counter()
+    found = sum(graph.find_path(a, b) is not None for a, b in pairs)
+    single_seconds = time.perf_counter() - start
+
+    # Mobs around one goal, one query each, asked as a batch and one by one
+    goal_index = len(nodes) // 2
+    goal = nodes[goal_index]
+    indices = np.clip(goal_index + rng.integers(-reach, reach + 1, mobs), 0, len(nodes) - 1)
+    batch = [(nodes[int(index)], goal) for index in indices]
+    start = time.perf_counter()
+    batch_found = sum(path is not None for path in graph.find_paths(batch))
+    batch_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for mob, target in batch:
+        graph.find_path(mob, target)
+    one_by_one_seconds = time.perf_counter() - start
+
+    # Dig and fill blocks at the surface, relinking after each edit
+    edits = 100
+    start = time.perf_counter()
+    for index in rng.integers(len(nodes), size=edits).tolist():
+        x, y = nodes[index]
+        world.set_block(x, y + 1, BlockType.AIR)
+        graph.sync()
+    repair_seconds = time.perf_counter() - start
+
+    return {
+        'chunks': len(graph.chunks),
+        'build_ms_per_chunk': build_seconds / max(graph.builds, 1) * 1000,
+        'links': links,
+        'queries_per_s': queries / single_seconds,
+        'found': found / queries,
+        'batched_queries_per_s': mobs / batch_seconds,
+        'one_by_one_queries_per_s': mobs / one_by_one_seconds,
+        'batch_found': batch_found / mobs,
+        'repair_ms': repair_seconds / edits * 1000,
+    }
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    results = run(width, queries=queries)
+    print("graph:        %d chunks of %d blocks, %.2f ms each, %d links" % (
+        results['chunks'], CHUNK_SIZE, results['build_ms_per_chunk'], results['links']))
+    print("A* queries:   %8.0f/s (%.0f%% found)" % (results['queries_per_s'], results['found'] * 100))
+    print("mobs to goal: %8.0f/s batched, %.0f/s one by one (%.0f%% found)" % (
+        results['batched_queries_per_s'], results['one_by_one_queries_per_s'],
+        results['batch_found'] * 100))
+    print("block edit:   %8.2f ms to relink" % results['repair_ms'])
+
+if __name__ == "__main__":
+    main()
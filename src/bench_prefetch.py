@@ -0,0 +1,72 @@
+"""Main-thread frame times while flying across an endless world.
+
+A camera moves right and down through a chunked world at a steady speed,
+reading the blocks in view every tick as the renderer would. Without
+prefetching, every new column of chunks is generated on the spot; with
+it, they are generated by workers ahead of the camera and the main
+thread mostly just installs them.
+
+Usage: python src/bench_prefetch.py [ticks] [speed]
+"""
+import sys
+import time
+
+import numpy as np
+
+from prefetch import ChunkPrefetcher
+from world import World
+
+class Camera:
+    def __init__(self, width=800, height=600):
+        self.x = 0
+        self.y = 1200
+        self.width = width
+        self.height = height
+
+def run(ticks=600, speed=(24, 4), prefetch=None, seed=1):
+    world = World(width=None, height=None, seed=seed, chunked=True)
+    prefetcher = None
+    if prefetch is not None:
+        prefetcher = ChunkPrefetcher(world, workers=2, processes=prefetch == 'processes')
+    camera = Camera()
+    times = []
+    for _ in range(ticks):
+        start = time.perf_counter()
+        camera.x += speed[0]
+        camera.y += speed[1]
+        if prefetcher is not None:
+            prefetcher.update(camera, speed)
+        x0, y0 = int(camera.x) // 32, int(camera.y) // 32
+        world.get_region(x0, y0, x0 + camera.width // 32 + 1, y0 + camera.height // 32 + 1)
+        times.append(time.perf_counter() - start)
+        # The rest of the frame, when the workers get the CPU to themselves
+        time.sleep(0.004)
+    stats = None
+    if prefetcher is not None:
+        stats = (prefetcher.installed, prefetcher.claimed, prefetcher.waits)
+        prefetcher.close()
+
+    times = np.array(times) * 1000
+    return {
+        'mean_ms': times.mean(),
+        'p99_ms': np.percentile(times, 99),
+        'max_ms': times.max(),
+        'slow_frames': int(np.count_nonzero(times > 1000 / 60)),
+        'chunks': len(world.chunks),
+        'prefetch': stats,
+    }
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 600
+    speed = int(sys.argv[2]) if len(sys.argv) > 2 else 24
+    print("mode        mean ms  p99 ms  max ms  frames > 16.7 ms  chunks  installed/claimed/waited")
+    for mode in (None, 'threads', 'processes'):
+        result = run(ticks, (speed, speed // 6), mode)
+        stats = result['prefetch']
+        print("%-10s  %7.3f  %6.2f  %6.2f  %16d  %6d  %s" % (
+            mode or 'none', result['mean_ms'], result['p99_ms'], result['max_ms'],
+            result['slow_frames'], result['chunks'],
+            '-' if stats is None else '%d/%d/%d' % stats))
+
+if __name__ == "__main__":
+    main()
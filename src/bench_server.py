@@ -0,0 +1,83 @@
+"""Load test of the multiplayer server on localhost.
+
+Connects a number of bot clients to an in-process server and steps it as
+fast as the clients keep up, reporting the server's tick time and the
+bandwidth sent to each client.
+
+Usage: python src/bench_server.py [ticks]
+"""
+import asyncio
+import sys
+import time
+
+import numpy as np
+
+import protocol
+from client import GameClient
+from server import GameServer
+from world import World
+
+async def load_test(clients=8, ticks=300, width=1000, height=200, seed=1):
+    world = World(width, height, seed=seed)
+    server = GameServer(world)
+    await server.start()
+    bots = []
+    for _ in range(clients):
+        bot = GameClient()
+        await bot.connect('127.0.0.1', server.port)
+        bots.append(bot)
+    while len(server.clients) < clients:
+        await asyncio.sleep(0.001)
+
+    rng = np.random.default_rng(seed)
+    directions = rng.integers(3, size=clients)
+    start = time.perf_counter()
+    for tick in range(ticks):
+        if tick % 30 == 0:
+            directions = rng.integers(3, size=clients)
+        for bot, direction in zip(bots, directions.tolist()):
+            action, target = protocol.ACTION_NONE, (0, 0)
+            if bot.position is not None and rng.random() < 0.2:
+                x, y = bot.position
+                action = protocol.ACTION_BREAK
+                target = (x // 32 + int(rng.integers(-2, 3)), y // 32 + int(rng.integers(0, 3)))
+            bot.send_input(left=direction == 1, right=direction == 2,
+                           jump=bool(rng.random() < 0.05), action=action, target=target)
+            await bot.drain()
+        await asyncio.sleep(0)  # Let the server read the input
+        server.step()
+        await server.flush()
+        for bot in bots:
+            await bot.read_tick()
+    wall_seconds = time.perf_counter() - start
+    sent = sum(client.bytes_sent for client in server.clients.values())
+
+    for bot in bots:
+        await bot.close()
+    await server.close()
+
+    tick_times = np.array(server.tick_times)
+    # The first tick sends every client its initial chunks
+    steady = tick_times[1:] if len(tick_times) > 1 else tick_times
+    return {
+        'clients': clients,
+        'ticks': ticks,
+        'tick_ms': steady.mean() * 1000,
+        'tick_ms_per_client': steady.mean() * 1000 / clients,
+        'max_tick_ms': tick_times.max() * 1000,
+        'bytes_per_client_tick': sent / clients / ticks,
+        'kbps_per_client': sent / clients / ticks * server.tick_rate * 8 / 1000,
+        'wall_ticks_per_second': ticks / wall_seconds,
+    }
+
+def main():
+    ticks = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    print("clients  tick ms  ms/client  max ms  bytes/client/tick  kbit/s/client")
+    for clients in (1, 4, 16, 64):
+        result = asyncio.run(load_test(clients, ticks))
+        print("%7d  %7.3f  %9.3f  %6.2f  %17.1f  %13.1f" % (
+            result['clients'], result['tick_ms'], result['tick_ms_per_client'],
+            result['max_tick_ms'], result['bytes_per_client_tick'], result['kbps_per_client']))
+
+if __name__ == "__main__":
+    main()
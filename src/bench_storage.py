@@ -0,0 +1,73 @@
+"""Compare the region file codecs against the raw World.blocks dump.
+
+Usage: python src/bench_storage.py [width] [height]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import region
+from world import World
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+def run(width=4200, height=1200, seed=1):
+    """Save and load a world in every format, returning one result dict per format"""
+    world = World(width, height, seed=seed)
+    results = []
+    workdir = tempfile.mkdtemp()
+    try:
+        # Raw dump: header plus the int8 array
+        path = os.path.join(workdir, 'world.twld')
+        start = time.perf_counter()
+        world.save(path)
+        save_time = time.perf_counter() - start
+        start = time.perf_counter()
+        blocks = np.array(World.load(path).blocks)  # Page everything in
+        load_time = time.perf_counter() - start
+        assert np.array_equal(blocks, world.blocks)
+        results.append({'format': 'raw', 'bytes': os.path.getsize(path),
+                        'save_s': save_time, 'load_s': load_time, 'chunk_read_s': None})
+
+        for codec in ('none', 'rle', 'zlib', 'lzma'):
+            directory = os.path.join(workdir, codec)
+            start = time.perf_counter()
+            world.save(directory, codec=codec)
+            save_time = time.perf_counter() - start
+            start = time.perf_counter()
+            loaded = World.load(directory)
+            load_time = time.perf_counter() - start
+            assert np.array_equal(loaded.blocks, world.blocks)
+
+            # Read a single chunk near the surface through a fresh store
+            key = (width // 64, height // 64)
+            start = time.perf_counter()
+            region.RegionStore(directory).read(key)
+            chunk_time = time.perf_counter() - start
+            results.append({'format': 'region-%s' % codec, 'bytes': directory_size(directory),
+                            'save_s': save_time, 'load_s': load_time, 'chunk_read_s': chunk_time})
+    finally:
+        shutil.rmtree(workdir)
+    return results
+
+def main():
+    width = int(sys.argv[1]) if len(sys.argv) > 1 else 4200
+    height = int(sys.argv[2]) if len(sys.argv) > 2 else 1200
+    results = run(width, height)
+    raw_size = results[0]['bytes']
+    print("World %dx%d" % (width, height))
+    print("%-14s %12s %7s %9s %9s %12s" % ('format', 'bytes', 'ratio', 'save ms', 'load ms', 'chunk ms'))
+    for result in results:
+        chunk = result['chunk_read_s']
+        print("%-14s %12d %6.1f%% %9.1f %9.1f %12s" % (
+            result['format'], result['bytes'], 100.0 * result['bytes'] / raw_size,
+            result['save_s'] * 1000, result['load_s'] * 1000,
+            '-' if chunk is None else '%.3f' % (chunk * 1000)))
+
+if __name__ == "__main__":
+    main()
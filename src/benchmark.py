@@ -0,0 +1,206 @@
+"""Benchmark suite for the world, physics and rendering hot paths.
+
+Every benchmark times one operation, such as generating a world, a
+hundred thousand block lookups, a physics tick of N players or one full
+frame, and reports its median over several repeats. Results are written
+as JSON, and --compare checks them against a stored baseline, listing
+the benchmarks that got slower by more than --threshold and exiting
+with status 1 if any did. Rendering uses the dummy SDL video driver, so
+the suite runs without a display.
+
+Usage:
+    python src/benchmark.py --output baseline.json
+    python src/benchmark.py --compare baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+
+from game import Game
+from physics import EntityPhysics
+from player import Player
+from world import World
+
+WORLD_SIZES = {'small': (100, 100), 'medium': (500, 200), 'large': (1000, 400),
+               'huge': (8400, 2400)}  # Terraria's large world
+LOOKUPS = 100000
+PHYSICS_COUNTS = (1, 100, 1000)
+
+def time_operation(operation, repeat):
+    """Seconds taken by each of repeat calls of operation, after one warm-up call"""
+    operation()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        operation()
+        times.append(time.perf_counter() - start)
+    return times
+
+def generation(width, height):
+    def operation():
+        World(width, height, seed=1)
+    return operation
+
+def lookups(method, order):
+    world = World(*WORLD_SIZES['large'], seed=1)
+    if order == 'random':
+        rng = np.random.default_rng(0)
+        points = list(zip(rng.integers(0, world.width, LOOKUPS).tolist(),
+                          rng.integers(0, world.height, LOOKUPS).tolist()))
+    else:
+        # Row by row, as a renderer or a scan of the world reads them
+        points = [(index % world.width, index // world.width) for index in range(LOOKUPS)]
+    lookup = getattr(world, method)
+
+    def operation():
+        for x, y in points:
+            lookup(x, y)
+    return operation
+
+def spawn_points(world, count, seed=0):
+    """Pixel positions just above the ground at random columns"""
+    rng = np.random.default_rng(seed)
+    points = []
+    for x in rng.integers(1, world.width - 1, count).tolist():
+        ground = next(y for y in range(world.height) if world.is_solid(x, y))
+        points.append((x * 32, (ground - 2) * 32))
+    return points
+
+def player_ticks(count):
+    world = World(*WORLD_SIZES['large'], seed=1)
+    players = [Player(world, x, y) for x, y in spawn_points(world, count)]
+    for index, player in enumerate(players):
+        player.moving_right = index % 2 == 0
+        player.moving_left = index % 2 == 1
+
+    def operation():
+        for player in players:
+            player.move()
+    return operation
+
+def batched_ticks(count):
+    world = World(*WORLD_SIZES['large'], seed=1)
+    bodies = EntityPhysics(world)
+    for index, (x, y) in enumerate(spawn_points(world, count)):
+        bodies.add(x, y, moving_right=index % 2 == 0, moving_left=index % 2 == 1)
+
+    def operation():
+        bodies.step()
+    return operation
+
+def render_frame(use_tile_cache):
+    game = Game(headless=True)
+    game.use_tile_cache = use_tile_cache
+    game.show_lighting = False
+    # Let the player land so the view shows the ground
+    game.run_headless(120)
+    start_x = game.player.x
+    frames = [0]
+
+    def operation():
+        # Pan back and forth so the renderer does real work every frame
+        frames[0] += 1
+        game.player.x = start_x + (frames[0] % 200 - 100) * 3
+        game.render(alpha=1.0)
+    return operation
+
+def benchmarks():
+    """Name -> (set-up function returning the timed operation, repeats)"""
+    suite = {}
+    for size, (width, height) in WORLD_SIZES.items():
+        suite['generate_' + size] = (lambda w=width, h=height: generation(w, h), 5)
+    for method in ('get_block', 'is_solid'):
+        for order in ('random', 'sequential'):
+            suite['%s_%s' % (method, order)] = (lambda m=method, o=order: lookups(m, o), 5)
+    for count in PHYSICS_COUNTS:
+        suite['player_tick_%d' % count] = (lambda c=count: player_ticks(c), 20)
+        suite['batched_tick_%d' % count] = (lambda c=count: batched_ticks(c), 20)
+    suite['render_frame'] = (lambda: render_frame(True), 30)
+    suite['render_frame_uncached'] = (lambda: render_frame(False), 10)
+    return suite
+
+def run(names=None, repeat_scale=1.0):
+    """Run the benchmarks whose names contain one of names (all if None).
+
+    Returns the results document: the environment, and for each
+    benchmark the median, minimum and maximum milliseconds per operation.
+    """
+    results = {}
+    for name, (setup, repeat) in benchmarks().items():
+        if names and not any(part in name for part in names):
+            continue
+        times = time_operation(setup(), max(3, round(repeat * repeat_scale)))
+        results[name] = {
+            'median_ms': statistics.median(times) * 1000,
+            'min_ms': min(times) * 1000,
+            'max_ms': max(times) * 1000,
+            'repeat': len(times),
+        }
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+
+def compare(current, baseline, threshold=0.2):
+    """Rows of (name, baseline ms, current ms, ratio, regressed) for benchmarks in both.
+
+    A benchmark regressed if its median is more than threshold (a
+    fraction) slower than the baseline's.
+    """
+    rows = []
+    for name, result in current['results'].items():
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]['median_ms']
+        after = result['median_ms']
+        ratio = after / before if before > 0 else float('inf')
+        rows.append((name, before, after, ratio, ratio > 1 + threshold))
+    return rows
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark the game's hot paths")
+    parser.add_argument('names', nargs='*', help="only run benchmarks whose names contain one of these")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--compare', metavar='BASELINE', help="compare against a results file")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="slowdown that counts as a regression (0.2 = 20%%)")
+    parser.add_argument('--quick', action='store_true', help="fewer repeats, noisier numbers")
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+    current = run(args.names, 0.2 if args.quick else 1.0)
+    for name, result in current['results'].items():
+        print("%-24s %10.3f ms  (min %.3f, max %.3f, %d runs)" % (
+            name, result['median_ms'], result['min_ms'], result['max_ms'], result['repeat']))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(current, file, indent=2)
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        rows = compare(current, baseline, args.threshold)
+        print()
+        print("%-24s %12s %12s %8s" % ("benchmark", "baseline ms", "current ms", "ratio"))
+        for name, before, after, ratio, regressed in rows:
+            print("%-24s %12.3f %12.3f %7.2fx%s" % (
+                name, before, after, ratio, "  REGRESSION" if regressed else ""))
+        regressions = sum(row[4] for row in rows)
+        print("%d of %d benchmarks regressed by more than %.0f%%" % (
+            regressions, len(rows), args.threshold * 100))
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,96 @@
+import numpy as np
+
+WORD_BITS = 64
+FULL_WORD = (1 << WORD_BITS) - 1
+
+# Rectangles touching at most this many words are checked with plain Python
+# integer operations, which beat NumPy's per-call overhead for small queries
+SMALL_QUERY_WORDS = 32
+
+class SolidBitmap:
+    """Packed bit map of which tiles are solid.
+
+    Each row is stored as 64-bit words, bit (x % 64) of word (x // 64), so
+    a single tile is one word read and a rectangle query only touches the
+    words it covers. Coordinates are local to the map, indexed (x, y).
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.bits = np.zeros((height, (width + WORD_BITS - 1) // WORD_BITS), dtype=np.uint64)
+
+    @classmethod
+    def from_array(cls, solid):
+        """Pack a [y, x] boolean array"""
+        height, width = solid.shape
+        bitmap = cls(width, height)
+        packed = np.packbits(solid, axis=1, bitorder='little')
+        # Pad each row to whole words, then reinterpret the bytes as words
+        padded = np.zeros((height, bitmap.bits.shape[1] * 8), dtype=np.uint8)
+        padded[:, :packed.shape[1]] = packed
+        bitmap.bits[:] = padded.view('<u8')
+        return bitmap
+
+    def to_array(self):
+        """Unpack into a [y, x] boolean array"""
+        unpacked = np.unpackbits(self.bits.astype('<u8').view(np.uint8), axis=1, bitorder='little')
+        return unpacked[:, :self.width].astype(bool)
+
+    def get(self, x, y):
+        return (self.bits.item(y, x >> 6) >> (x & 63)) & 1 == 1
+
+    def set(self, x, y, solid):
+        word = self.bits.item(y, x >> 6)
+        if solid:
+            word |= 1 << (x & 63)
+        else:
+            word &= ~(1 << (x & 63)) & FULL_WORD
+        self.bits[y, x >> 6] = word
+
+    def set_many(self, xs, ys, solid):
+        """Set arrays of in-range coordinates to an array of solidity"""
+        solid = np.broadcast_to(np.asarray(solid, dtype=bool), xs.shape)
+        words = (ys, xs >> 6)
+        masks = np.left_shift(np.uint64(1), (xs & 63).astype(np.uint64))
+        # ufunc.at so several bits of the same word can be set in one call
+        np.bitwise_and.at(self.bits, words, ~masks)
+        np.bitwise_or.at(self.bits, (ys[solid], xs[solid] >> 6), masks[solid])
+
+    def get_many(self, xs, ys):
+        """Solidity at arrays of in-range coordinates"""
+        words = self.bits[ys, xs >> 6]
+        return ((words >> (xs & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+    def any(self, x0, y0, x1, y1):
+        """Check if any tile from (x0, y0) to (x1, y1) inclusive is solid.
+
+        The rectangle must lie inside the map.
+        """
+        x0, x1 = int(x0), int(x1)  # NumPy integers would overflow the masks
+        w0, w1 = x0 >> 6, x1 >> 6
+        first_mask = (FULL_WORD << (x0 & 63)) & FULL_WORD
+        last_mask = FULL_WORD >> (63 - (x1 & 63))
+        bits = self.bits
+
+        if (y1 - y0 + 1) * (w1 - w0 + 1) <= SMALL_QUERY_WORDS:
+            if w0 == w1:
+                mask = first_mask & last_mask
+                for y in range(y0, y1 + 1):
+                    if bits.item(y, w0) & mask:
+                        return True
+                return False
+            for y in range(y0, y1 + 1):
+                if bits.item(y, w0) & first_mask or bits.item(y, w1) & last_mask:
+                    return True
+                for w in range(w0 + 1, w1):
+                    if bits.item(y, w):
+                        return True
+            return False
+
+        words = bits[y0:y1 + 1, w0:w1 + 1]
+        if w0 == w1:
+            return bool((words & np.uint64(first_mask & last_mask)).any())
+        return bool((words[:, 0] & np.uint64(first_mask)).any()
+                    or (words[:, -1] & np.uint64(last_mask)).any()
+                    or words[:, 1:-1].any())
@@ -0,0 +1,80 @@
+"""Block types and the registry of their properties.
+
+The world stores blocks as int8 ids. Every property of a block type
+lives in a NumPy table indexed by id, so the same table answers for one
+block (SOLID[block_id]) or, by fancy indexing, for a whole array of ids
+(SOLID[blocks]). The tables have 256 entries, so the negative int8 ids
+land where the same ids viewed as uint8 would; ids that are not
+registered are air-like: not solid, black and with no hardness.
+
+BlockType names the ids; TYPES maps an id back to its BlockType without
+constructing an Enum per lookup. Code that looks a table up over a
+region every frame or tick holds a Lookup, which writes into the same
+output array each time, so it allocates nothing once the region's shape
+settles.
+"""
+from enum import Enum
+
+import numpy as np
+
+class BlockType(Enum):
+    AIR = 0
+    DIRT = 1
+    STONE = 2
+    GRASS = 3
+    SAND = 4
+    SNOW = 5
+    COAL_ORE = 6
+    IRON_ORE = 7
+
+TABLE_SIZE = 256
+
+TYPES = [None] * TABLE_SIZE  # BlockType of each id
+SOLID = np.zeros(TABLE_SIZE, dtype=bool)  # Collides and blocks light
+COLORS = np.zeros((TABLE_SIZE, 3), dtype=np.uint8)  # RGB
+HARDNESS = np.zeros(TABLE_SIZE, dtype=np.float32)  # Relative effort to break
+
+def register(block_type, solid, color, hardness):
+    """Set the properties of a block type in every table"""
+    block_id = block_type.value
+    TYPES[block_id] = block_type
+    SOLID[block_id] = solid
+    COLORS[block_id] = color
+    HARDNESS[block_id] = hardness
+
+def lookup(table, blocks, out=None):
+    """Property of each id in blocks, written into out if given.
+
+    With a reused out array, region-wide queries allocate nothing.
+    """
+    # 'wrap' writes straight into out; ids are always in range anyway
+    return np.take(table, blocks, axis=0, out=out, mode='wrap')
+
+class Lookup:
+    """Lookups of one table into an output array reused from call to call.
+
+    The array is replaced only when the shape looked up changes. Each
+    result is overwritten by the next call, so use it before then.
+    """
+    def __init__(self, table):
+        self.table = table
+        self.out = None
+
+    def buffer(self, shape):
+        """The output array for block ids of shape"""
+        shape = tuple(shape) + self.table.shape[1:]
+        if self.out is None or self.out.shape != shape:
+            self.out = np.empty(shape, dtype=self.table.dtype)
+        return self.out
+
+    def __call__(self, blocks):
+        return lookup(self.table, blocks, self.buffer(blocks.shape))
+
+register(BlockType.AIR, solid=False, color=(135, 206, 235), hardness=0)    # Sky blue
+register(BlockType.DIRT, solid=True, color=(139, 69, 19), hardness=0.5)    # Brown
+register(BlockType.STONE, solid=True, color=(128, 128, 128), hardness=1.5)  # Gray
+register(BlockType.GRASS, solid=True, color=(34, 139, 34), hardness=0.6)   # Green
+register(BlockType.SAND, solid=True, color=(219, 195, 130), hardness=0.5)  # Pale yellow
+register(BlockType.SNOW, solid=True, color=(235, 240, 245), hardness=0.2)  # Off-white
+register(BlockType.COAL_ORE, solid=True, color=(54, 54, 60), hardness=3)   # Near black
+register(BlockType.IRON_ORE, solid=True, color=(176, 132, 110), hardness=3)  # Rust
@@ -0,0 +1,170 @@
+import sys
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+from bitmap import SolidBitmap
+from blocks import SOLID
+
+# Chunks are square blocks of tiles, CHUNK_SIZE on each side
+CHUNK_SIZE = 32
+BLOCK_BYTES = CHUNK_SIZE * CHUNK_SIZE  # Block data of a chunk, one spill file slot
+
+class Chunk:
+    def __init__(self, position, blocks):
+        self.position = position  # Chunk coordinates (cx, cy)
+        self.blocks = blocks  # (CHUNK_SIZE, CHUNK_SIZE) int8 array indexed [y, x]
+        self.solid = SolidBitmap.from_array(SOLID[blocks])  # Kept in step with blocks
+        self.is_modified = False  # True once it differs from the generated terrain
+
+def chunk_footprint():
+    """Approximate bytes of a resident chunk: blocks, solidity bitmap and the objects holding them"""
+    chunk = Chunk((0, 0), np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=np.int8))
+    parts = (chunk, vars(chunk), chunk.position, chunk.blocks,
+             chunk.solid, vars(chunk.solid), chunk.solid.bits)
+    return sum(sys.getsizeof(part) for part in parts)
+
+CHUNK_BYTES = chunk_footprint()
+
+class ChunkCache:
+    """LRU cache of chunks keyed by chunk coordinates.
+
+    Missing chunks are produced by generate(cx, cy). When a memory budget
+    (in bytes, counted as CHUNK_BYTES per resident chunk: blocks, bitmap
+    and object overhead) is set, the least recently used chunks are
+    evicted once it is exceeded: clean chunks are simply dropped and
+    regenerated later, modified chunks are written to a spill file first
+    and read back from it on their next access.
+    """
+
+    def __init__(self, generate, memory_budget=None, spill_path=None):
+        self.generate = generate
+        self.memory_budget = memory_budget
+        self.chunk_bytes = CHUNK_BYTES
+        if memory_budget is None:
+            self.max_chunks = None
+        else:
+            self.max_chunks = max(1, memory_budget // self.chunk_bytes)
+
+        self._chunks = OrderedDict()  # Least recently used first
+
+        # Spill file holds one fixed-size slot per evicted modified chunk
+        self.spill_path = spill_path
+        self._spill_file = None
+        self._spill_slots = {}
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.spills = 0
+
+    def __len__(self):
+        return len(self._chunks)
+
+    def __contains__(self, key):
+        return key in self._chunks
+
+    def __getitem__(self, key):
+        return self._chunks[key]
+
+    def items(self):
+        return self._chunks.items()
+
+    def values(self):
+        return self._chunks.values()
+
+    @property
+    def memory_used(self):
+        """Approximate bytes held by resident chunks, bitmaps and overhead included"""
+        return len(self._chunks) * self.chunk_bytes
+
+    @property
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'spills': self.spills,
+            'resident': len(self._chunks),
+            'spilled': len(self._spill_slots),
+            'memory_used': self.memory_used,
+        }
+
+    def get_chunk(self, cx, cy):
+        """Get chunk (cx, cy), restoring or generating it on a miss"""
+        key = (cx, cy)
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            self.hits += 1
+            self._chunks.move_to_end(key)
+            return chunk
+
+        self.misses += 1
+        if key in self._spill_slots:
+            chunk = Chunk(key, self._read_spill(key))
+            chunk.is_modified = True
+        else:
+            chunk = Chunk(key, self.generate(cx, cy))
+        self._chunks[key] = chunk
+        self._evict()
+        return chunk
+
+    def get_cached(self, key):
+        """Resident chunk at key or None, without loading it or touching the LRU order"""
+        return self._chunks.get(key)
+
+    def is_spilled(self, key):
+        return key in self._spill_slots
+
+    def install(self, key, blocks):
+        """Add a chunk generated elsewhere, as the most recently used"""
+        self._chunks[key] = Chunk(key, blocks)
+        self._chunks.move_to_end(key)
+        self._evict()
+
+    def clear(self):
+        """Drop every chunk, including spilled ones"""
+        self._chunks.clear()
+        self._spill_slots.clear()
+        if self._spill_file is not None:
+            self._spill_file.truncate(0)
+
+    def close(self):
+        """Close the spill file"""
+        if self._spill_file is not None:
+            self._spill_file.close()
+            self._spill_file = None
+        self._spill_slots.clear()
+
+    def _evict(self):
+        """Evict least recently used chunks until within the memory budget"""
+        if self.max_chunks is None:
+            return
+        while len(self._chunks) > self.max_chunks:
+            key, chunk = self._chunks.popitem(last=False)
+            if chunk.is_modified:
+                self._write_spill(key, chunk.blocks)
+            self.evictions += 1
+
+    def _open_spill(self):
+        if self._spill_file is None:
+            if self.spill_path is None:
+                self._spill_file = tempfile.TemporaryFile()
+            else:
+                self._spill_file = open(self.spill_path, 'w+b')
+        return self._spill_file
+
+    def _write_spill(self, key, blocks):
+        spill = self._open_spill()
+        slot = self._spill_slots.setdefault(key, len(self._spill_slots))
+        spill.seek(slot * BLOCK_BYTES)
+        spill.write(blocks.tobytes())
+        self.spills += 1
+
+    def _read_spill(self, key):
+        spill = self._open_spill()
+        spill.seek(self._spill_slots[key] * BLOCK_BYTES)
+        data = bytearray(spill.read(BLOCK_BYTES))
+        return np.frombuffer(data, dtype=np.int8).reshape(CHUNK_SIZE, CHUNK_SIZE)
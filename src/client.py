@@ -0,0 +1,136 @@
+"""Client for the multiplayer server.
+
+GameClient connects over TCP, sends input and keeps a replica of what the
+server has sent: the chunks in view and the positions of the players
+near it. Run on its own it connects a bot that walks around at random.
+
+Usage: python src/client.py [--host 127.0.0.1] [--port 5555] [--ticks 600]
+"""
+import argparse
+import asyncio
+
+import numpy as np
+
+import protocol
+
+class GameClient:
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+        self.info = None  # Decoded hello message
+        self.id = None
+        self.chunk_size = None
+        self.chunks = {}  # (cx, cy) -> int8 blocks
+        self.players = {}  # Player id -> (x, y)
+        self.tick = 0  # Server tick of the latest complete update
+        self.sequence = 0
+        self.bytes_received = 0
+
+    async def connect(self, host='127.0.0.1', port=5555):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        message_type, payload = await self.read()
+        if message_type != protocol.MSG_HELLO:
+            raise ConnectionError("Expected a hello message, got type %d" % message_type)
+        self.info = protocol.decode_hello(payload)
+        self.id = self.info['client_id']
+        self.chunk_size = self.info['chunk_size']
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    async def read(self):
+        message = await protocol.read_message(self.reader)
+        if message is None:
+            raise ConnectionError("Server closed the connection")
+        self.bytes_received += protocol.FRAME.size + len(message[1])
+        return message
+
+    def send_input(self, left=False, right=False, jump=False,
+                   action=protocol.ACTION_NONE, target=(0, 0)):
+        self.writer.write(protocol.encode_input(self.sequence, left, right, jump, action, target))
+        self.sequence += 1
+
+    async def drain(self):
+        await self.writer.drain()
+
+    def handle(self, message_type, payload):
+        if message_type == protocol.MSG_CHUNK:
+            cx, cy, blocks = protocol.decode_chunk(payload)
+            self.chunks[(cx, cy)] = blocks
+        elif message_type == protocol.MSG_UNLOAD:
+            self.chunks.pop(protocol.decode_unload(payload), None)
+        elif message_type == protocol.MSG_BLOCKS:
+            size = self.chunk_size
+            for x, y, block in protocol.decode_blocks(payload).tolist():
+                blocks = self.chunks.get((x // size, y // size))
+                if blocks is not None:
+                    blocks[y % size, x % size] = block
+        elif message_type == protocol.MSG_REMOVE:
+            for key in protocol.decode_remove(payload).tolist():
+                self.players.pop(key, None)
+        elif message_type == protocol.MSG_ENTITIES:
+            self.tick, records = protocol.decode_entities(payload)
+            for key, x, y in records.tolist():
+                self.players[key] = (x, y)
+
+    async def read_tick(self):
+        """Apply messages up to the end of the next tick's update and return its tick"""
+        while True:
+            message_type, payload = await self.read()
+            self.handle(message_type, payload)
+            if message_type == protocol.MSG_ENTITIES:
+                return self.tick
+
+    def get_block(self, x, y):
+        """Block id at (x, y), or None if its chunk has not been received"""
+        size = self.chunk_size
+        blocks = self.chunks.get((x // size, y // size))
+        if blocks is None:
+            return None
+        return int(blocks[y % size, x % size])
+
+    @property
+    def position(self):
+        """Own player's position as last sent by the server"""
+        return self.players.get(self.id)
+
+async def run_bot(host, port, ticks, seed=None):
+    """Connect and walk at random, jumping and digging now and then"""
+    rng = np.random.default_rng(seed)
+    client = GameClient()
+    await client.connect(host, port)
+    direction = 0
+    try:
+        for tick in range(ticks):
+            if tick % 30 == 0:
+                direction = int(rng.integers(3))
+            action, target = protocol.ACTION_NONE, (0, 0)
+            if client.position is not None and rng.random() < 0.1:
+                x, y = client.position
+                action = protocol.ACTION_BREAK
+                target = (x // 32 + int(rng.integers(-2, 3)), y // 32 + int(rng.integers(0, 3)))
+            client.send_input(left=direction == 1, right=direction == 2,
+                              jump=bool(rng.random() < 0.05), action=action, target=target)
+            await client.drain()
+            await client.read_tick()
+    finally:
+        await client.close()
+    return client
+
+def main():
+    parser = argparse.ArgumentParser(description="Connect a bot to a multiplayer server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--ticks', type=int, default=600)
+    args = parser.parse_args()
+    client = asyncio.run(run_bot(args.host, args.port, args.ticks))
+    print("received %d bytes over %d ticks, %d chunks held, %d players in view" % (
+        client.bytes_received, args.ticks, len(client.chunks), len(client.players)))
+
+if __name__ == "__main__":
+    main()
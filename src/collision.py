@@ -0,0 +1,116 @@
+"""Continuous (swept) collision of boxes against the tile grid.
+
+A box moving by (dx, dy) in one step is traced through every tile column
+and row its leading edges cross, in time order, like a DDA line
+traversal. The first solid tile it would enter gives the exact contact
+time and surface normal, so nothing tunnels however fast it moves.
+Boxes are half-open pixel rectangles [x, x + width) x [y, y + height),
+the same tiles Player covers.
+"""
+import math
+from collections import namedtuple
+
+TILE_SIZE = 32
+
+# Slack when turning a float position back into tiles, so an edge that lands
+# a rounding error short of a boundary does not count the next tile
+EPSILON = 1e-9
+
+# time is the fraction of (dx, dy) travelled before contact; the normal
+# points out of the surface that was hit, e.g. (0, -1) for a floor
+Hit = namedtuple('Hit', ['time', 'normal_x', 'normal_y'])
+
+def _span(low, size, tile_size):
+    """First and last tile covered by the pixel interval [low, low + size)"""
+    return (math.floor((low + EPSILON) / tile_size),
+            math.ceil((low + size - EPSILON) / tile_size) - 1)
+
+def _first_crossing(low, size, delta, tile_size):
+    """Tile the leading edge enters first and the step towards further ones"""
+    if delta > 0:
+        return math.ceil((low + size) / tile_size), 1
+    return math.floor(low / tile_size) - 1, -1
+
+def _crossing_time(tile, step, low, size, delta, tile_size):
+    """Time at which the leading edge reaches the boundary of tile"""
+    if delta == 0:
+        return math.inf
+    if step > 0:
+        return (tile * tile_size - (low + size)) / delta
+    return ((tile + 1) * tile_size - low) / delta
+
+def sweep(world, x, y, width, height, dx, dy, tile_size=TILE_SIZE):
+    """First contact of a box moving by (dx, dy) with a solid tile, or None.
+
+    Tiles the box already overlaps at the start are ignored, so a box that
+    is stuck inside terrain can still move out of it.
+    """
+    if dx == 0 and dy == 0:
+        return None
+
+    column, step_x = _first_crossing(x, width, dx, tile_size)
+    row, step_y = _first_crossing(y, height, dy, tile_size)
+    time_x = _crossing_time(column, step_x, x, width, dx, tile_size)
+    time_y = _crossing_time(row, step_y, y, height, dy, tile_size)
+
+    while True:
+        time = min(time_x, time_y)
+        if time > 1:
+            return None
+
+        # Tiles covered at the moment of crossing, not counting the one being entered
+        if time_x < time_y:
+            top, bottom = _span(y + dy * time, height, tile_size)
+            if world.any_solid(column, top, column, bottom):
+                return Hit(time, -step_x, 0)
+        elif time_y < time_x:
+            left, right = _span(x + dx * time, width, tile_size)
+            if world.any_solid(left, row, right, row):
+                return Hit(time, 0, -step_y)
+        else:
+            top, bottom = _span(y + dy * time, height, tile_size)
+            left, right = _span(x + dx * time, width, tile_size)
+            # Crossing a corner: the column and row first, then the diagonal
+            # tile, which counts as a floor or ceiling so boxes land on ledges
+            if world.any_solid(column, top, column, bottom):
+                return Hit(time, -step_x, 0)
+            if world.any_solid(left, row, right, row) or world.is_solid(column, row):
+                return Hit(time, 0, -step_y)
+
+        if time_x <= time:
+            column += step_x
+            time_x = _crossing_time(column, step_x, x, width, dx, tile_size)
+        if time_y <= time:
+            row += step_y
+            time_y = _crossing_time(row, step_y, y, height, dy, tile_size)
+
+def move_and_collide(world, x, y, width, height, dx, dy, tile_size=TILE_SIZE):
+    """Move a box by (dx, dy), stopping against solid tiles and sliding along them.
+
+    Returns the new (x, y) and the normals hit on each axis (0 if the box
+    moved freely along it). The contact position is snapped onto the tile
+    boundary so it does not drift from floating point error.
+    """
+    normal_x = normal_y = 0
+    # Each contact stops one axis, so there are at most two
+    for _ in range(2):
+        hit = sweep(world, x, y, width, height, dx, dy, tile_size)
+        if hit is None:
+            return x + dx, y + dy, normal_x, normal_y
+
+        x += dx * hit.time
+        y += dy * hit.time
+        if hit.normal_x:
+            normal_x = hit.normal_x
+            edge = x + width if hit.normal_x < 0 else x
+            x += round(edge / tile_size) * tile_size - edge
+            dx = 0
+        else:
+            normal_y = hit.normal_y
+            edge = y + height if hit.normal_y < 0 else y
+            y += round(edge / tile_size) * tile_size - edge
+            dy = 0
+        # Slide along the surface for the rest of the step
+        dx *= 1 - hit.time
+        dy *= 1 - hit.time
+    return x, y, normal_x, normal_y
@@ -0,0 +1,235 @@
+"""Entities and the broad-phase index used to find them.
+
+SpatialHash buckets axis-aligned boxes into a uniform grid of cells
+aligned with the 32 pixel tile grid, so finding what is near a point or
+rectangle only looks at the cells it covers instead of every entity.
+EntityManager owns the entities, keeps the hash up to date as they move
+and reports overlapping pairs filtered by collision group.
+"""
+import math
+
+CELL_SIZE = 32
+
+class SpatialHash:
+    """Uniform grid of cells mapping to the ids of the boxes that touch them.
+
+    Boxes are half-open pixel rectangles [x, x + width) x [y, y + height).
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}  # (cx, cy) -> set of ids
+        self.bounds = {}  # id -> (x, y, width, height)
+        self.ranges = {}  # id -> (cx0, cy0, cx1, cy1) of the cells it covers
+
+    def __len__(self):
+        return len(self.bounds)
+
+    def __contains__(self, key):
+        return key in self.bounds
+
+    def _cell_range(self, x, y, width, height):
+        size = self.cell_size
+        return (math.floor(x / size), math.floor(y / size),
+                math.ceil((x + width) / size) - 1, math.ceil((y + height) / size) - 1)
+
+    def _add_to_cells(self, key, cell_range):
+        cx0, cy0, cx1, cy1 = cell_range
+        cells = self.cells
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket is None:
+                    cells[(cx, cy)] = {key}
+                else:
+                    bucket.add(key)
+
+    def _remove_from_cells(self, key, cell_range):
+        cx0, cy0, cx1, cy1 = cell_range
+        cells = self.cells
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = cells[(cx, cy)]
+                bucket.discard(key)
+                if not bucket:
+                    del cells[(cx, cy)]
+
+    def insert(self, key, x, y, width, height):
+        if key in self.bounds:
+            raise KeyError(f"{key!r} is already in the spatial hash")
+        cell_range = self._cell_range(x, y, width, height)
+        self.bounds[key] = (x, y, width, height)
+        self.ranges[key] = cell_range
+        self._add_to_cells(key, cell_range)
+
+    def move(self, key, x, y, width=None, height=None):
+        """Update a box, touching the cells only if it crossed into new ones"""
+        _, _, old_width, old_height = self.bounds[key]
+        width = old_width if width is None else width
+        height = old_height if height is None else height
+        self.bounds[key] = (x, y, width, height)
+        cell_range = self._cell_range(x, y, width, height)
+        old_range = self.ranges[key]
+        if cell_range != old_range:
+            self._remove_from_cells(key, old_range)
+            self._add_to_cells(key, cell_range)
+            self.ranges[key] = cell_range
+
+    def remove(self, key):
+        self._remove_from_cells(key, self.ranges.pop(key))
+        del self.bounds[key]
+
+    def candidates(self, x, y, width, height):
+        """Ids in the cells a rectangle covers, which may not overlap it"""
+        cx0, cy0, cx1, cy1 = self._cell_range(x, y, width, height)
+        found = set()
+        cells = self.cells
+        for cy in range(cy0, cy1 + 1):
+            for cx in range(cx0, cx1 + 1):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    found |= bucket
+        return found
+
+    def query_rect(self, x, y, width, height):
+        """Ids of the boxes overlapping a rectangle"""
+        right, bottom = x + width, y + height
+        result = []
+        for key in self.candidates(x, y, width, height):
+            bx, by, bw, bh = self.bounds[key]
+            if bx < right and x < bx + bw and by < bottom and y < by + bh:
+                result.append(key)
+        return result
+
+    def query_radius(self, x, y, radius):
+        """Ids of the boxes with any point within radius of (x, y)"""
+        radius_squared = radius * radius
+        result = []
+        for key in self.candidates(x - radius, y - radius, 2 * radius, 2 * radius):
+            bx, by, bw, bh = self.bounds[key]
+            # Distance from the point to the nearest point of the box
+            dx = max(bx - x, 0, x - (bx + bw))
+            dy = max(by - y, 0, y - (by + bh))
+            if dx * dx + dy * dy <= radius_squared:
+                result.append(key)
+        return result
+
+    def pairs(self):
+        """Every pair of ids whose boxes overlap, each pair once as (low, high)"""
+        bounds = self.bounds
+        size = self.cell_size
+        result = []
+        for (cx, cy), bucket in self.cells.items():
+            if len(bucket) < 2:
+                continue
+            members = sorted(bucket)
+            for i, a in enumerate(members):
+                ax, ay, aw, ah = bounds[a]
+                for b in members[i + 1:]:
+                    bx, by, bw, bh = bounds[b]
+                    if ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah:
+                        # Boxes can share several cells; only report the pair
+                        # from the cell holding the top-left of their overlap
+                        if (math.floor(max(ax, bx) / size) == cx
+                                and math.floor(max(ay, by) / size) == cy):
+                            result.append((a, b))
+        return result
+
+class Entity:
+    def __init__(self, x, y, width=20, height=20, group='default'):
+        self.id = None  # Assigned by EntityManager.add
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.group = group
+
+    @property
+    def center_position(self):
+        return (self.x + self.width / 2,
+                self.y + self.height / 2)
+
+class EntityManager:
+    """Owns the entities in a world and indexes them in a SpatialHash.
+
+    Entities collide with each other unless their groups have been told
+    not to with set_collision, e.g. to stop items colliding with items.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.entities = {}
+        self.index = SpatialHash(cell_size)
+        self.next_id = 0
+        self.ignored_groups = set()  # frozensets of group pairs that never collide
+
+    def __len__(self):
+        return len(self.entities)
+
+    def __iter__(self):
+        return iter(self.entities.values())
+
+    def add(self, entity):
+        entity.id = self.next_id
+        self.next_id += 1
+        self.entities[entity.id] = entity
+        self.index.insert(entity.id, entity.x, entity.y, entity.width, entity.height)
+        return entity
+
+    def remove(self, entity):
+        self.index.remove(entity.id)
+        del self.entities[entity.id]
+
+    def get(self, entity_id):
+        return self.entities.get(entity_id)
+
+    def move(self, entity, x, y):
+        """Move an entity and update the index; entities must move through here"""
+        entity.x = x
+        entity.y = y
+        self.index.move(entity.id, x, y)
+
+    def set_collision(self, group_a, group_b, enabled=True):
+        pair = frozenset((group_a, group_b))
+        if enabled:
+            self.ignored_groups.discard(pair)
+        else:
+            self.ignored_groups.add(pair)
+
+    def collides(self, group_a, group_b):
+        return frozenset((group_a, group_b)) not in self.ignored_groups
+
+    def query_rect(self, x, y, width, height, group=None):
+        """Entities overlapping a rectangle, e.g. the camera's view"""
+        entities = self.entities
+        found = [entities[key] for key in self.index.query_rect(x, y, width, height)]
+        if group is not None:
+            found = [entity for entity in found if entity.group == group]
+        return found
+
+    def query_radius(self, x, y, radius, group=None):
+        entities = self.entities
+        found = [entities[key] for key in self.index.query_radius(x, y, radius)]
+        if group is not None:
+            found = [entity for entity in found if entity.group == group]
+        return found
+
+    def nearest(self, x, y, radius, group=None):
+        """Closest entity (by center) within radius of a point, or None"""
+        best = None
+        best_distance = None
+        for entity in self.query_radius(x, y, radius, group):
+            center_x, center_y = entity.center_position
+            distance = (center_x - x) ** 2 + (center_y - y) ** 2
+            if best is None or distance < best_distance:
+                best, best_distance = entity, distance
+        return best
+
+    def collisions(self):
+        """Pairs of overlapping entities whose groups collide"""
+        entities = self.entities
+        result = []
+        for a, b in self.index.pairs():
+            entity_a, entity_b = entities[a], entities[b]
+            if self.collides(entity_a.group, entity_b.group):
+                result.append((entity_a, entity_b))
+        return result
@@ -1,8 +1,24 @@
+import argparse
+import os
 import pygame
 import sys
+from collections import defaultdict
 from pygame.locals import *
 from world import World, BlockType
+from blocks import COLORS
 from player import Player
+from prefetch import ChunkPrefetcher
+from profiler import Profiler
+from lighting import LightMap
+from liquids import LiquidSim, MAX_LEVEL, WATER, LAVA
+from rasterizer import TileRasterizer
+from renderer import ChunkRenderer
+from timestep import FixedTimestep
+
+# Actions that change the world at the mouse, queued for the next tick
+TORCH = 0
+POUR_WATER = 1
+POUR_LAVA = 2
 
 class Camera:
     def __init__(self, width, height):
@@ -22,22 +38,46 @@ class Camera:
         self.x = target_x - self.width // 2
         self.y = target_y - self.height // 2
 
+class NullMouse:
+    """Mouse with no buttons pressed, used when there is no window"""
+    def get_pressed(self):
+        return (0, 0, 0)
+    
+    def get_pos(self):
+        return (0, 0)
+
 class Game:
-    def __init__(self):
+    def __init__(self, save_path=None, headless=False, tick_rate=60, chunked=False,
+                 profile=False, seed=None):
+        # Headless games never open a window
+        self.headless = headless
+        if headless:
+            os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
         pygame.init()
         
         # Initialize display
         self.WINDOW_SIZE = (800, 600)
-        self.screen = pygame.display.set_mode(self.WINDOW_SIZE)
-        pygame.display.set_caption("Terraria Clone")
+        if headless:
+            self.screen = pygame.Surface(self.WINDOW_SIZE)
+        else:
+            self.screen = pygame.display.set_mode(self.WINDOW_SIZE)
+            pygame.display.set_caption("Terraria Clone")
         
         # Initialize game objects
         self.clock = pygame.time.Clock()
-        self.world = World(100, 100)
+        # Resume a saved world if there is one
+        self.save_path = save_path
+        if save_path is not None and os.path.exists(save_path):
+            self.world = World.load(save_path)
+        elif chunked:
+            # Endless world, generated as it is explored
+            self.world = World(None, None, seed=seed, chunked=True)
+        else:
+            self.world = World(100, 100, seed=seed)
         self.camera = Camera(*self.WINDOW_SIZE)
         
         # Create player at middle of world
-        spawn_x = (self.world.width * 32) // 2
+        spawn_x = (self.world.width * 32) // 2 if self.world.width is not None else 0
         spawn_y = 0
         self.player = Player(self.world, spawn_x, spawn_y)
         
@@ -46,16 +86,54 @@ class Game:
         self.BLOCK_SIZE = 32
         self.running = True
         
-        # Block colors
-        self.BLOCK_COLORS = {
-            BlockType.AIR: (135, 206, 235),    # Sky blue
-            BlockType.DIRT: (139, 69, 19),     # Brown
-            BlockType.STONE: (128, 128, 128),  # Gray
-            BlockType.GRASS: (34, 139, 34)     # Green
-        }
+        # Simulation runs at a fixed tick rate, independent of the frame rate
+        self.TICK_RATE = tick_rate
+        self.MAX_CATCH_UP = 5  # Most ticks simulated per rendered frame
+        self.interpolate = True  # Render between the last two ticks
+        self.timestep = FixedTimestep(self.TICK_RATE, self.MAX_CATCH_UP)
+        self.previous_position = (self.player.x, self.player.y)
+        
+        # Block colors, from the block registry
+        self.BLOCK_COLORS = {block_type: tuple(COLORS[block_type.value].tolist())
+                             for block_type in BlockType}
+        
+        # Draw the world from cached surfaces instead of tile by tile
+        self.use_tile_cache = True
+        self.tile_renderer = ChunkRenderer(self.world, self.BLOCK_COLORS, self.BLOCK_SIZE)
+        
+        # Minimap of the area around the player, toggled with M
+        self.show_minimap = False
+        self.MINIMAP_TILES = (160, 120)
+        self.minimap_rasterizer = TileRasterizer(self.BLOCK_COLORS, 1)
+        
+        # Sunlight and torches, toggled with L; T places or removes a torch
+        self.lighting = LightMap(self.world) if not self.world.chunked else None
+        self.show_lighting = self.lighting is not None
+        
+        # Water and lava, poured at the mouse with F and G
+        self.liquids = LiquidSim(self.world) if not self.world.chunked else None
+        self.LIQUID_COLORS = {WATER: (40, 90, 220), LAVA: (230, 90, 20)}
+        
+        # Generate chunks ahead of the camera in the background
+        self.prefetcher = ChunkPrefetcher(self.world) if self.world.chunked else None
+        
+        # Frame profiler and its overlay, toggled with P
+        self.profiler = Profiler(enabled=profile)
+        self.profiler.show_overlay = profile and not headless
+        self.profiler.count_calls(self.world, 'is_solid')
+        self.profiler.count_calls(self.world, 'any_solid')
+        self.profile_output = None  # CSV or JSON file for the trace on exit
+        
+        # Torch and pour actions at world positions, applied next tick
+        self.actions = []
+        # Input recording and replay (see replay.py); input_source, if set,
+        # returns each tick's (keys, mouse, camera) in place of the devices
+        self.recorder = None
+        self.input_source = None
         
         # Enable key repeat for smooth movement
-        pygame.key.set_repeat(1, 10)
+        if not headless:
+            pygame.key.set_repeat(1, 10)
     
     def handle_events(self):
         """Handle pygame events"""
@@ -65,49 +143,127 @@ class Game:
             elif event.type == KEYDOWN:
                 if event.key == K_ESCAPE:
                     self.running = False
+                elif event.key == K_m:
+                    self.show_minimap = not self.show_minimap
+                elif event.key == K_p:
+                    self.profiler.toggle()
+                elif event.key == K_l and self.lighting is not None:
+                    self.show_lighting = not self.show_lighting
+                elif event.key == K_t and self.lighting is not None:
+                    self.queue_action(TORCH, *pygame.mouse.get_pos())
+                elif event.key in (K_f, K_g) and self.liquids is not None:
+                    self.queue_action(POUR_WATER if event.key == K_f else POUR_LAVA,
+                                      *pygame.mouse.get_pos())
     
     def handle_input(self):
         """Handle continuous keyboard and mouse input"""
-        keys = pygame.key.get_pressed()
-        mouse = pygame.mouse
-        self.player.handle_input(keys, mouse, self.camera)
+        camera = self.camera
+        if self.input_source is not None:
+            keys, mouse, camera = self.input_source()
+        elif self.headless:
+            keys = defaultdict(bool)
+            mouse = NullMouse()
+        else:
+            keys = pygame.key.get_pressed()
+            mouse = pygame.mouse
+        self.player.handle_input(keys, mouse, camera)
+        if self.recorder is not None:
+            mouse_x, mouse_y = mouse.get_pos()
+            self.recorder.record_input(keys, mouse.get_pressed(),
+                                       (mouse_x + camera.x, mouse_y + camera.y))
     
     def update(self):
-        """Update game state"""
-        self.handle_input()
-        self.player.move()
+        """Update game state by one simulation tick"""
+        profiler = self.profiler
+        self.previous_position = (self.player.x, self.player.y)
+        for action in self.actions:
+            if self.recorder is not None:
+                self.recorder.record_action(*action)
+            self.apply_action(*action)
+        self.actions.clear()
+        with profiler.scope('input'):
+            self.handle_input()
+        with profiler.scope('player'):
+            self.player.move()
+        if self.liquids is not None:
+            with profiler.scope('liquids'):
+                self.liquids.step()
         
         # Make camera follow player
         self.camera.follow(*self.player.center_position)
+        if self.prefetcher is not None:
+            with profiler.scope('prefetch'):
+                self.prefetcher.update(self.camera, (self.player.velocity_x, self.player.velocity_y))
+        self.world.tick += 1
+        if self.recorder is not None:
+            self.recorder.end_tick()
+    
+    def queue_action(self, action, screen_x, screen_y):
+        """Apply an action at a screen position at the start of the next tick"""
+        self.actions.append((action, screen_x + self.camera.x, screen_y + self.camera.y))
+    
+    def apply_action(self, action, world_x, world_y):
+        """Toggle a torch or pour liquid at a world position in pixels"""
+        x = int(world_x // self.BLOCK_SIZE)
+        y = int(world_y // self.BLOCK_SIZE)
+        if action == TORCH:
+            if not (0 <= x < self.world.width and 0 <= y < self.world.height):
+                return
+            if (x, y) in self.lighting.sources:
+                self.lighting.remove_light(x, y)
+            else:
+                self.lighting.add_light(x, y)
+        else:
+            self.liquids.add_liquid(x, y, WATER if action == POUR_WATER else LAVA)
+    
+    def toggle_torch(self, screen_x, screen_y):
+        """Place a torch on the block at a screen position, or take it away"""
+        self.apply_action(TORCH, screen_x + self.camera.x, screen_y + self.camera.y)
+    
+    def pour(self, screen_x, screen_y, kind):
+        """Pour a block's worth of liquid at a screen position"""
+        self.apply_action(POUR_WATER if kind == WATER else POUR_LAVA,
+                          screen_x + self.camera.x, screen_y + self.camera.y)
     
-    def render(self):
-        """Render the game state"""
+    def render(self, alpha=None):
+        """Render the game state.
+        
+        With alpha, the player and camera are drawn that fraction of the way
+        from the previous tick's position to the current one.
+        """
+        player_position = None
+        if alpha is not None:
+            previous_x, previous_y = self.previous_position
+            player_position = (previous_x + (self.player.x - previous_x) * alpha,
+                               previous_y + (self.player.y - previous_y) * alpha)
+            self.camera.follow(player_position[0] + self.player.width / 2,
+                               player_position[1] + self.player.height / 2)
+        
+        profiler = self.profiler
         # Fill screen with background color
         self.screen.fill(self.BLOCK_COLORS[BlockType.AIR])
         
-        # Calculate visible range
-        start_x = max(0, int(self.camera.x // self.BLOCK_SIZE))
-        end_x = min(self.world.width, int((self.camera.x + self.WINDOW_SIZE[0]) // self.BLOCK_SIZE + 1))
-        start_y = max(0, int(self.camera.y // self.BLOCK_SIZE))
-        end_y = min(self.world.height, int((self.camera.y + self.WINDOW_SIZE[1]) // self.BLOCK_SIZE + 1))
+        with profiler.scope('tiles'):
+            if self.use_tile_cache:
+                profiler.count('sections drawn', self.tile_renderer.render(self.screen, self.camera))
+            else:
+                self.render_blocks()
         
-        # Render visible blocks
-        for y in range(start_y, end_y):
-            for x in range(start_x, end_x):
-                block_type = self.world.get_block(x, y)
-                if block_type != BlockType.AIR:
-                    rect = pygame.Rect(
-                        x * self.BLOCK_SIZE - int(self.camera.x),
-                        y * self.BLOCK_SIZE - int(self.camera.y),
-                        self.BLOCK_SIZE,
-                        self.BLOCK_SIZE
-                    )
-                    pygame.draw.rect(self.screen, self.BLOCK_COLORS[block_type], rect)
-                    # Add block outline
-                    pygame.draw.rect(self.screen, (0, 0, 0), rect, 1)
+        if self.liquids is not None:
+            with profiler.scope('draw liquids'):
+                self.render_liquids()
+        
+        # Darken the blocks by their light level
+        if self.show_lighting:
+            with profiler.scope('lighting'):
+                self.lighting.sync()
+                self.lighting.render(self.screen, self.camera, self.BLOCK_SIZE)
         
         # Render player
-        self.player.render(self.screen, self.camera)
+        self.player.render(self.screen, self.camera, player_position)
+        
+        if self.show_minimap:
+            self.render_minimap()
         
         # Draw crosshair at mouse position
         mouse_pos = pygame.mouse.get_pos()
@@ -119,20 +275,139 @@ class Game:
                         (mouse_pos[0], mouse_pos[1] - crosshair_size),
                         (mouse_pos[0], mouse_pos[1] + crosshair_size))
         
+        if profiler.show_overlay:
+            profiler.render(self.screen)
+        
         # Update display
-        pygame.display.flip()
+        if not self.headless:
+            with profiler.scope('flip'):
+                pygame.display.flip()
+    
+    def render_minimap(self):
+        """Draw a one pixel per block map around the player in the top-right corner"""
+        center_x, center_y = self.player.center_position
+        x0 = int(center_x // self.BLOCK_SIZE) - self.MINIMAP_TILES[0] // 2
+        y0 = int(center_y // self.BLOCK_SIZE) - self.MINIMAP_TILES[1] // 2
+        tiles = self.world.get_region(x0, y0, x0 + self.MINIMAP_TILES[0], y0 + self.MINIMAP_TILES[1])
+        minimap = self.minimap_rasterizer.minimap(tiles)
+        
+        position = (self.WINDOW_SIZE[0] - self.MINIMAP_TILES[0] - 10, 10)
+        self.screen.blit(minimap, position)
+        pygame.draw.rect(self.screen, (255, 255, 255), pygame.Rect(position, self.MINIMAP_TILES), 1)
+    
+    def visible_blocks(self):
+        """Range (start_x, end_x, start_y, end_y) of blocks in view, clipped to the world"""
+        start_x = int(self.camera.x // self.BLOCK_SIZE)
+        end_x = int((self.camera.x + self.WINDOW_SIZE[0]) // self.BLOCK_SIZE + 1)
+        start_y = int(self.camera.y // self.BLOCK_SIZE)
+        end_y = int((self.camera.y + self.WINDOW_SIZE[1]) // self.BLOCK_SIZE + 1)
+        # An unbounded world has blocks at every coordinate
+        if self.world.width is not None:
+            start_x, end_x = max(0, start_x), min(self.world.width, end_x)
+        if self.world.height is not None:
+            start_y, end_y = max(0, start_y), min(self.world.height, end_y)
+        return start_x, end_x, start_y, end_y
+
+    def render_liquids(self):
+        """Draw the visible liquid as blocks filled up to its level"""
+        start_x, end_x, start_y, end_y = self.visible_blocks()
+        levels = self.liquids.level[start_y:end_y, start_x:end_x]
+        kinds = self.liquids.kind[start_y:end_y, start_x:end_x]
+        for y, x in zip(*levels.nonzero()):
+            height = max(int(levels[y, x]) * self.BLOCK_SIZE // MAX_LEVEL, 1)
+            rect = pygame.Rect((start_x + x) * self.BLOCK_SIZE - self.camera.x,
+                               (start_y + y + 1) * self.BLOCK_SIZE - height - self.camera.y,
+                               self.BLOCK_SIZE, height)
+            pygame.draw.rect(self.screen, self.LIQUID_COLORS[int(kinds[y, x])], rect)
+    
+    def render_blocks(self):
+        """Draw the visible blocks one by one"""
+        start_x, end_x, start_y, end_y = self.visible_blocks()
+        
+        # Render visible blocks
+        drawn = 0
+        for y in range(start_y, end_y):
+            for x in range(start_x, end_x):
+                block_type = self.world.get_block(x, y)
+                if block_type != BlockType.AIR:
+                    rect = pygame.Rect(
+                        x * self.BLOCK_SIZE - int(self.camera.x),
+                        y * self.BLOCK_SIZE - int(self.camera.y),
+                        self.BLOCK_SIZE,
+                        self.BLOCK_SIZE
+                    )
+                    pygame.draw.rect(self.screen, self.BLOCK_COLORS[block_type], rect)
+                    # Add block outline
+                    pygame.draw.rect(self.screen, (0, 0, 0), rect, 1)
+                    drawn += 1
+        self.profiler.count('tiles drawn', drawn)
     
-    def run(self):
+    def run(self, max_ticks=None):
         """Main game loop"""
-        while self.running:
-            self.handle_events()
-            self.update()
-            self.render()
-            self.clock.tick(self.FPS)
+        if self.headless:
+            self.run_headless(max_ticks)
+        else:
+            self.timestep.reset()
+            profiler = self.profiler
+            while self.running:
+                with profiler.scope('events'):
+                    self.handle_events()
+                # Simulate the ticks due since the last frame, then draw once
+                with profiler.scope('update'):
+                    for _ in range(self.timestep.advance()):
+                        self.update()
+                with profiler.scope('render'):
+                    self.render(self.timestep.alpha if self.interpolate else None)
+                with profiler.scope('wait'):
+                    self.clock.tick(self.FPS)
+                profiler.end_frame()
         
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+        if self.profile_output is not None:
+            self.profiler.export(self.profile_output)
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.save_path is not None:
+            self.world.save(self.save_path)
         pygame.quit()
         sys.exit()
+    
+    def run_headless(self, max_ticks=None):
+        """Step the simulation as fast as possible, without rendering.
+        
+        Runs until the game stops or max_ticks ticks have been simulated, and
+        returns the number of ticks simulated.
+        """
+        ticks = 0
+        while self.running and (max_ticks is None or ticks < max_ticks):
+            with self.profiler.scope('events'):
+                self.handle_events()
+            with self.profiler.scope('update'):
+                self.update()
+            self.profiler.end_frame()
+            ticks += 1
+        return ticks
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Terraria Clone")
+    parser.add_argument('save_path', nargs='?', help="world file to load and save")
+    parser.add_argument('--headless', action='store_true', help="simulate without a window")
+    parser.add_argument('--ticks', type=int, help="stop after this many ticks (headless)")
+    parser.add_argument('--tick-rate', type=int, default=60, help="simulation ticks per second")
+    parser.add_argument('--chunked', action='store_true', help="play an endless chunked world")
+    parser.add_argument('--profile', metavar='TRACE', nargs='?', const='',
+                        help="profile every frame, writing a .csv or .json trace on exit if given")
+    parser.add_argument('--record', metavar='REPLAY', help="record the session's input for replay.py")
+    parser.add_argument('--seed', type=int, help="seed of a newly generated world")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    game = Game()
-    game.run()
\ No newline at end of file
+    args = parse_args(sys.argv[1:])
+    game = Game(args.save_path, headless=args.headless, tick_rate=args.tick_rate,
+                chunked=args.chunked, profile=args.profile is not None, seed=args.seed)
+    game.profile_output = args.profile or None
+    if args.record:
+        from replay import Recorder
+        Recorder(game, args.record)
+    game.run(args.ticks)
\ No newline at end of file
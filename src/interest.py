@@ -0,0 +1,108 @@
+"""Area-of-interest tracking for the multiplayer server.
+
+Each client is interested in the chunks under its camera's view
+rectangle plus a margin. InterestManager keeps both directions of that
+relation, client -> chunks and chunk -> clients, so routing a block
+change or finding the players near a client only touches the chunks
+involved, and the work per client stays flat however many players the
+world holds.
+"""
+import numpy as np
+
+from chunks import CHUNK_SIZE
+
+class InterestManager:
+    def __init__(self, world, view_size=(800, 600), margin=1, block_size=32):
+        """Track interest in the chunks of world.
+
+        A client's area is the chunks overlapping its view_size view (in
+        pixels) plus margin chunks on every side. A chunk stays in the area
+        until it is more than margin + 1 chunks away, so a camera moving
+        back and forth across a chunk border does not resend it.
+        """
+        self.world = world
+        self.view_size = view_size
+        self.margin = margin
+        self.chunk_pixels = CHUNK_SIZE * block_size
+        self.areas = {}  # Client id -> set of chunks
+        self.subscribers = {}  # Chunk -> set of client ids
+
+    def view_chunks(self, camera_x, camera_y, margin):
+        """Chunks overlapping the view at (camera_x, camera_y), grown by margin"""
+        size = self.chunk_pixels
+        x0 = int(camera_x) // size - margin
+        x1 = (int(camera_x) + self.view_size[0] - 1) // size + margin
+        y0 = int(camera_y) // size - margin
+        y1 = (int(camera_y) + self.view_size[1] - 1) // size + margin
+        # Chunks outside a bounded world do not exist
+        if self.world.width is not None:
+            x0, x1 = max(x0, 0), min(x1, (self.world.width - 1) // CHUNK_SIZE)
+        if self.world.height is not None:
+            y0, y1 = max(y0, 0), min(y1, (self.world.height - 1) // CHUNK_SIZE)
+        return {(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)}
+
+    def update(self, client_id, camera_x, camera_y):
+        """Move a client's view; returns the chunks that entered and left its area"""
+        area = self.areas.setdefault(client_id, set())
+        entered = self.view_chunks(camera_x, camera_y, self.margin) - area
+        left = area - self.view_chunks(camera_x, camera_y, self.margin + 1)
+        for key in entered:
+            self.subscribers.setdefault(key, set()).add(client_id)
+        for key in left:
+            self._unsubscribe(client_id, key)
+        area |= entered
+        area -= left
+        return entered, left
+
+    def _unsubscribe(self, client_id, key):
+        clients = self.subscribers[key]
+        clients.discard(client_id)
+        if not clients:
+            del self.subscribers[key]
+
+    def remove(self, client_id):
+        for key in self.areas.pop(client_id, ()):
+            self._unsubscribe(client_id, key)
+
+    def area(self, client_id):
+        return self.areas.get(client_id, set())
+
+    def interested(self, cx, cy):
+        """Ids of the clients whose area holds chunk (cx, cy)"""
+        return self.subscribers.get((cx, cy), set())
+
+    def route(self, xs, ys):
+        """Indices of the block coordinates each interested client should get.
+
+        Returns {client id: index array}, in the order of the coordinates.
+        Clients with nothing to receive are left out.
+        """
+        if len(xs) == 0:
+            return {}
+        keys = np.stack((np.asarray(xs) // CHUNK_SIZE, np.asarray(ys) // CHUNK_SIZE), axis=1)
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        routed = {}
+        for i, key in enumerate(map(tuple, unique_keys.tolist())):
+            clients = self.subscribers.get(key)
+            if clients:
+                for client_id in clients:
+                    routed.setdefault(client_id, []).append(i)
+        # Back from chunk numbers to the coordinates in them
+        return {client_id: np.flatnonzero(np.isin(inverse, chunks))
+                for client_id, chunks in routed.items()}
+
+    def bucket(self, positions):
+        """Group {key: (x, y) in pixels} into {chunk: [key, ...]} for nearby()"""
+        size = self.chunk_pixels
+        buckets = {}
+        for key, (x, y) in positions.items():
+            buckets.setdefault((int(x // size), int(y // size)), []).append(key)
+        return buckets
+
+    def nearby(self, client_id, buckets):
+        """Keys in the buckets of the chunks in a client's area"""
+        found = []
+        for key in self.areas.get(client_id, ()):
+            found.extend(buckets.get(key, ()))
+        return found
@@ -0,0 +1,77 @@
+import numpy as np
+
+# One record per block change
+CHANGE_DTYPE = np.dtype([
+    ('x', '<i4'),
+    ('y', '<i4'),
+    ('old', 'i1'),
+    ('new', 'i1'),
+    ('tick', '<i8'),
+])
+
+class ChangeJournal:
+    """Append-only log of block changes that consumers read from a cursor.
+
+    A cursor is the number of changes recorded so far; a consumer keeps
+    the cursor it last read up to and asks for changes_since(cursor), so
+    work downstream is proportional to what changed rather than to the
+    size of the world. Once more than max_length changes are held the
+    oldest half is dropped, and a consumer whose cursor is older than
+    that gets None and has to resynchronize from the world itself.
+    """
+
+    def __init__(self, max_length=1 << 20, capacity=1024):
+        self.max_length = max_length
+        self.records = np.zeros(capacity, dtype=CHANGE_DTYPE)
+        self.length = 0  # Records held
+        self.start = 0  # Cursor of records[0]
+
+    @property
+    def cursor(self):
+        """Cursor just past the latest change"""
+        return self.start + self.length
+
+    def __len__(self):
+        return self.length
+
+    def _reserve(self, count):
+        needed = self.length + count
+        if needed > self.max_length:
+            # Drop the oldest records, keeping at least the newest half
+            keep = min(self.length, max(self.max_length // 2 - count, 0))
+            drop = self.length - keep
+            self.records[:keep] = self.records[drop:self.length]
+            self.start += drop
+            self.length = keep
+            needed = keep + count
+        if needed > len(self.records):
+            records = np.zeros(max(needed, 2 * len(self.records)), dtype=CHANGE_DTYPE)
+            records[:self.length] = self.records[:self.length]
+            self.records = records
+
+    def record(self, x, y, old, new, tick):
+        self._reserve(1)
+        self.records[self.length] = (x, y, old, new, tick)
+        self.length += 1
+
+    def record_many(self, xs, ys, old, new, tick):
+        count = len(xs)
+        self._reserve(count)
+        records = self.records[self.length:self.length + count]
+        records['x'] = xs
+        records['y'] = ys
+        records['old'] = old
+        records['new'] = new
+        records['tick'] = tick
+        self.length += count
+
+    def changes_since(self, cursor):
+        """Changes recorded at or after cursor, oldest first, or None if dropped"""
+        if cursor < self.start:
+            return None
+        return self.records[min(cursor, self.cursor) - self.start:self.length].copy()
+
+    def clear(self):
+        """Forget all changes; consumers' cursors stay valid"""
+        self.start = self.cursor
+        self.length = 0
@@ -0,0 +1,231 @@
+"""Block lighting: sunlight and point lights spread through the world.
+
+Light levels run from 0 (dark) to MAX_LIGHT and are kept in a uint8 map
+the size of the world. Air open to the sky is lit at MAX_LIGHT, and
+light sources (torches) at their own level; from there light spreads to
+neighbouring blocks, losing AIR_FALLOFF entering air and SOLID_FALLOFF
+entering a solid block, so it reaches a little way into the walls.
+
+The whole map is computed with NumPy once. After that, a block change
+or a light added or removed only relights the area it can affect,
+with the add/remove flood fills used by block games: light that came
+through the changed blocks is taken out, then light from the remaining
+neighbours and sources is spread back in.
+"""
+from collections import deque
+
+import numpy as np
+import pygame
+
+from blocks import SOLID, Lookup
+
+MAX_LIGHT = 15
+AIR_FALLOFF = 1
+SOLID_FALLOFF = 3
+
+# Light lost entering a block, by block id
+FALLOFF = np.where(SOLID, SOLID_FALLOFF, AIR_FALLOFF).astype(np.int16)
+
+# Screen brightness (0-255) of each light level
+BRIGHTNESS = (np.arange(MAX_LIGHT + 1) * 255 // MAX_LIGHT).astype(np.uint8)
+
+# More changes than this since the last sync are cheaper to handle by
+# recomputing the whole map
+MAX_INCREMENTAL_CHANGES = 64
+
+class LightMap:
+    def __init__(self, world):
+        """Light map of a bounded world, kept in step with it by sync()"""
+        if world.width is None or world.height is None:
+            raise ValueError("Lighting needs a world with a fixed width and height")
+        self.world = world
+        self.width = world.width
+        self.height = world.height
+        self.light = np.zeros((self.height, self.width), dtype=np.uint8)
+        self.sky = np.zeros(self.width, dtype=np.int64)  # First solid row of each column
+        self.sources = {}  # (x, y) -> level of each light source
+        self.cursor = world.journal.cursor  # Journal position read up to
+        self.relit_blocks = 0  # Blocks visited by incremental updates
+        # Property lookups reusing their arrays between updates
+        self._solid = Lookup(SOLID)
+        self._falloff = Lookup(FALLOFF)
+        self._column = Lookup(SOLID)
+        self._window_falloff = Lookup(FALLOFF)
+        self._overlay = None
+        self._scaled = None
+        self.recompute()
+
+    def recompute(self):
+        """Compute the whole light map from scratch"""
+        blocks = self.world.get_region(0, 0, self.width, self.height)
+        solid = self._solid(blocks)
+        # Rows above the first solid block of a column see the sky
+        self.sky[:] = np.where(solid.any(axis=0), solid.argmax(axis=0), self.height)
+        rows = np.arange(self.height)[:, np.newaxis]
+        light = np.where(rows < self.sky, MAX_LIGHT, 0).astype(np.int16)
+        for (x, y), level in self.sources.items():
+            light[y, x] = max(light[y, x], level)
+        falloff = self._falloff(blocks)
+
+        # Relax until nothing brightens; light travels at least a block per pass
+        brightest = np.empty_like(light)
+        for _ in range(MAX_LIGHT):
+            brightest.fill(0)
+            np.maximum(brightest[1:], light[:-1], out=brightest[1:])
+            np.maximum(brightest[:-1], light[1:], out=brightest[:-1])
+            np.maximum(brightest[:, 1:], light[:, :-1], out=brightest[:, 1:])
+            np.maximum(brightest[:, :-1], light[:, 1:], out=brightest[:, :-1])
+            brightest -= falloff
+            if not (brightest > light).any():
+                break
+            np.maximum(light, brightest, out=light)
+        self.light[:] = light
+
+    def sync(self):
+        """Relight the areas touched by block changes since the last sync"""
+        changes = self.world.changes_since(self.cursor)
+        self.cursor = self.world.journal.cursor
+        if changes is None or len(changes) > MAX_INCREMENTAL_CHANGES:
+            self.recompute()
+            return
+        for x, y in zip(changes['x'].tolist(), changes['y'].tolist()):
+            self.block_changed(x, y)
+
+    def block_changed(self, x, y):
+        """Relight around block (x, y) after it changed"""
+        column = self._column(self.world.get_region(x, 0, x + 1, self.height)[:, 0])
+        solid_rows = np.flatnonzero(column)
+        new_sky = int(solid_rows[0]) if len(solid_rows) else self.height
+        old_sky = int(self.sky[x])
+        self.sky[x] = new_sky
+        # The block itself, and the blocks below it that gained or lost the sky
+        changed = [(x, y)] + [(x, row) for row in range(min(old_sky, new_sky), max(old_sky, new_sky))]
+        self.relight(changed)
+
+    def add_light(self, x, y, level=MAX_LIGHT):
+        self.sources[(x, y)] = level
+        self.relight([(x, y)])
+
+    def remove_light(self, x, y):
+        if self.sources.pop((x, y), None) is not None:
+            self.relight([(x, y)])
+
+    def relight(self, changed):
+        """Recompute light after the blocks or sources at the changed positions changed.
+
+        Light levels only reach MAX_LIGHT blocks, so the flood fills run on
+        a copy of the window that reaches one block beyond that around the
+        changes, as Python lists, which are much faster to index one
+        element at a time than the NumPy map.
+        """
+        reach = MAX_LIGHT + 1
+        xs = [x for x, _ in changed]
+        ys = [y for _, y in changed]
+        x0, x1 = max(min(xs) - reach, 0), min(max(xs) + reach + 1, self.width)
+        y0, y1 = max(min(ys) - reach, 0), min(max(ys) + reach + 1, self.height)
+        width = x1 - x0
+
+        falloff = self._window_falloff(self.world.get_region(x0, y0, x1, y1)).ravel().tolist()
+        rows = np.arange(y0, y1)[:, np.newaxis]
+        source = np.where(rows < self.sky[x0:x1], MAX_LIGHT, 0)
+        for (x, y), level in self.sources.items():
+            if x0 <= x < x1 and y0 <= y < y1:
+                source[y - y0, x - x0] = max(source[y - y0, x - x0], level)
+        source = source.ravel().tolist()
+        light = self.light[y0:y1, x0:x1].ravel().tolist()
+        size = len(light)
+
+        def neighbours(cell):
+            column = cell % width
+            if column > 0:
+                yield cell - 1
+            if column < width - 1:
+                yield cell + 1
+            if cell >= width:
+                yield cell - width
+            if cell + width < size:
+                yield cell + width
+
+        # Take out the light that may have come through the changed cells
+        removing = deque()
+        for x, y in changed:
+            cell = (y - y0) * width + (x - x0)
+            if light[cell]:
+                removing.append((cell, light[cell]))
+                light[cell] = 0
+        removed = [cell for cell, _ in removing]
+        adding = deque()
+        while removing:
+            cell, level = removing.popleft()
+            for neighbour in neighbours(cell):
+                neighbour_level = light[neighbour]
+                if neighbour_level == 0:
+                    continue
+                if neighbour_level < level:
+                    light[neighbour] = 0
+                    removing.append((neighbour, neighbour_level))
+                    removed.append(neighbour)
+                else:
+                    # Lit some other way; spread that light back in
+                    adding.append(neighbour)
+
+        # Relight the sources among the emptied cells, then spread light out,
+        # also from around changed cells that were dark and took nothing out
+        for x, y in changed:
+            cell = (y - y0) * width + (x - x0)
+            removed.append(cell)
+            adding.extend(neighbours(cell))
+        for cell in removed:
+            if source[cell] > light[cell]:
+                light[cell] = source[cell]
+                adding.append(cell)
+        visited = len(removed)
+        while adding:
+            cell = adding.popleft()
+            level = light[cell]
+            for neighbour in neighbours(cell):
+                spread = level - falloff[neighbour]
+                if spread > light[neighbour]:
+                    light[neighbour] = spread
+                    adding.append(neighbour)
+                    visited += 1
+
+        self.light[y0:y1, x0:x1] = np.array(light, dtype=np.uint8).reshape(y1 - y0, width)
+        self.relit_blocks += visited
+
+    def get_light(self, x, y):
+        """Light level at block (x, y); full daylight outside the world"""
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return int(self.light[y, x])
+        return MAX_LIGHT
+
+    def get_region(self, x0, y0, x1, y1):
+        """Light levels of the rectangle [x0, x1) x [y0, y1), indexed [y, x]"""
+        region = np.full((y1 - y0, x1 - x0), MAX_LIGHT, dtype=np.uint8)
+        cx0, cx1 = max(x0, 0), min(x1, self.width)
+        cy0, cy1 = max(y0, 0), min(y1, self.height)
+        if cx0 < cx1 and cy0 < cy1:
+            region[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0] = self.light[cy0:cy1, cx0:cx1]
+        return region
+
+    def render(self, screen, camera, block_size=32):
+        """Darken what is on screen by the light of the blocks under it.
+
+        The light of the visible blocks is drawn one pixel per block,
+        scaled up to block size and multiplied onto the screen.
+        """
+        view_width, view_height = screen.get_size()
+        x0 = int(camera.x) // block_size
+        y0 = int(camera.y) // block_size
+        columns = (int(camera.x) + view_width - 1) // block_size - x0 + 1
+        rows = (int(camera.y) + view_height - 1) // block_size - y0 + 1
+        levels = self.get_region(x0, y0, x0 + columns, y0 + rows)
+
+        if self._overlay is None or self._overlay.get_size() != (columns, rows):
+            self._overlay = pygame.Surface((columns, rows))
+            self._scaled = pygame.Surface((columns * block_size, rows * block_size))
+        brightness = BRIGHTNESS[levels].T
+        pygame.surfarray.blit_array(self._overlay, np.repeat(brightness[:, :, np.newaxis], 3, axis=2))
+        pygame.transform.scale(self._overlay, self._scaled.get_size(), self._scaled)
+        screen.blit(self._scaled, (x0 * block_size - int(camera.x), y0 * block_size - int(camera.y)),
+                    special_flags=pygame.BLEND_RGB_MULT)
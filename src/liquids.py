@@ -0,0 +1,339 @@
+"""Water and lava as a cellular automaton.
+
+Liquid lives in air blocks, as a fill level (0 to MAX_LEVEL) and a kind
+per block, held in arrays the size of the world next to the blocks.
+Every tick, all at once from the previous tick's state:
+
+1. liquid falls into the block below as far as it has room,
+2. then spreads sideways, a SPREAD_DIVISOR-th of the difference in level
+   to each lower neighbour, so it levels out and then stops moving,
+3. and lava that touches water, or a block that water and lava flow into
+   at the same time, hardens into stone.
+
+Most liquid in a world sits still most of the time, so only the active
+blocks are stepped: those around a block that changed in the last tick
+or around a block edit in the world, and those still flowing. A tick
+costs time in proportion to the liquid that moves, not to the size of
+the world. When a lot starts moving at once, such as a lake let loose,
+the active area is stepped with NumPy instead of block by block; both
+give exactly the same result.
+"""
+import numpy as np
+
+from blocks import BlockType, SOLID, Lookup
+
+MAX_LEVEL = 255
+
+# Liquid kinds
+NONE = 0
+WATER = 1
+LAVA = 2
+
+# Lava is thick and spreads in smaller steps
+SPREAD_DIVISOR = (1, 4, 8)
+
+# Active sets at least this big, and filling at least an eighth of their
+# bounding box, are stepped with NumPy
+DENSE_MIN_BLOCKS = 256
+
+# Blocks beyond the active ones that a tick can change: one for the fall,
+# two for the spread and one for the hardening, plus one untouched
+DENSE_MARGIN = 5
+
+def flow(level, kind, open_blocks):
+    """One tick of the liquid in a rectangle of the world, with NumPy.
+
+    Takes int arrays of levels and kinds and a bool array of the blocks
+    liquid can go into; outside the rectangle is closed. Returns the new
+    levels and kinds, the blocks that hardened into stone, the blocks
+    whose level or kind changed midway (after falling) and the blocks
+    that gave liquid away.
+    """
+    # Fall into the block below if it is open and holds no other liquid
+    fall = np.zeros_like(level)
+    can_fall = open_blocks[1:] & ((kind[1:] == NONE) | (kind[1:] == kind[:-1]))
+    fall[:-1] = np.where(can_fall, np.minimum(level[:-1], MAX_LEVEL - level[1:]), 0)
+    level1 = level - fall
+    level1[1:] += fall[:-1]
+    kind1 = kind.copy()
+    kind1[1:] = np.where(fall[:-1] > 0, kind[:-1], kind1[1:])
+    kind1[level1 == 0] = NONE
+
+    # Spread to lower open neighbours holding no other liquid
+    divisor = np.asarray(SPREAD_DIVISOR)[kind1]
+    to_left = np.zeros_like(level)
+    to_right = np.zeros_like(level)
+    left_open = open_blocks[:, :-1] & ((kind1[:, :-1] == NONE) | (kind1[:, :-1] == kind1[:, 1:]))
+    to_left[:, 1:] = np.where(left_open & (level1[:, 1:] > level1[:, :-1]),
+                              (level1[:, 1:] - level1[:, :-1]) // divisor[:, 1:], 0)
+    right_open = open_blocks[:, 1:] & ((kind1[:, 1:] == NONE) | (kind1[:, 1:] == kind1[:, :-1]))
+    to_right[:, :-1] = np.where(right_open & (level1[:, :-1] > level1[:, 1:]),
+                                (level1[:, :-1] - level1[:, 1:]) // divisor[:, :-1], 0)
+    level2 = level1 - to_left - to_right
+    level2[:, :-1] += to_left[:, 1:]
+    level2[:, 1:] += to_right[:, :-1]
+    from_right = np.zeros_like(kind)
+    from_right[:, :-1] = np.where(to_left[:, 1:] > 0, kind1[:, 1:], NONE)
+    from_left = np.zeros_like(kind)
+    from_left[:, 1:] = np.where(to_right[:, :-1] > 0, kind1[:, :-1], NONE)
+    conflict = (from_left != NONE) & (from_right != NONE) & (from_left != from_right)
+    kind2 = np.where(kind1 != NONE, kind1, np.maximum(from_left, from_right))
+    kind2[level2 == 0] = NONE
+
+    # Lava next to water turns to stone
+    water = kind2 == WATER
+    near_water = np.zeros_like(water)
+    near_water[1:] |= water[:-1]
+    near_water[:-1] |= water[1:]
+    near_water[:, 1:] |= water[:, :-1]
+    near_water[:, :-1] |= water[:, 1:]
+    stone = ((kind2 == LAVA) & near_water) | conflict
+    level2[stone] = 0
+    kind2[stone] = NONE
+
+    changed = (level1 != level) | (kind1 != kind)
+    donors = (fall > 0) | (to_left > 0) | (to_right > 0)
+    return level2, kind2, stone, changed, donors
+
+class LiquidSim:
+    def __init__(self, world, vectorize=None):
+        """Liquid in a bounded world.
+
+        vectorize picks how ticks are stepped: True always with NumPy,
+        False always block by block, None by the size of the active set.
+        """
+        if world.width is None or world.height is None:
+            raise ValueError("Liquids need a world with a fixed width and height")
+        self.world = world
+        self.width = world.width
+        self.height = world.height
+        self.vectorize = vectorize
+        self.level = np.zeros((self.height, self.width), dtype=np.uint8)
+        self.kind = np.zeros((self.height, self.width), dtype=np.uint8)
+        self.active = set()  # Flat indices (y * width + x) of the blocks to step
+        self.cursor = world.journal.cursor  # Journal position read up to
+        self.ticks = 0
+        self.dense_ticks = 0  # Ticks stepped with NumPy
+        self._solid = Lookup(SOLID)  # Reuses its array while the window keeps its shape
+
+    def get_liquid(self, x, y):
+        """(kind, level) of the liquid at (x, y)"""
+        return int(self.kind[y, x]), int(self.level[y, x])
+
+    def add_liquid(self, x, y, kind=WATER, amount=MAX_LEVEL):
+        """Pour liquid into an air block, replacing liquid of another kind"""
+        if not self.world.in_bounds(x, y) or self.world.is_solid(x, y):
+            return
+        level = int(self.level[y, x]) if self.kind[y, x] == kind else 0
+        self.level[y, x] = min(level + amount, MAX_LEVEL)
+        self.kind[y, x] = kind
+        self.wake(x, y)
+
+    def remove_liquid(self, x, y):
+        self.level[y, x] = 0
+        self.kind[y, x] = NONE
+        self.wake(x, y)
+
+    def total(self, kind=WATER):
+        """Amount of one kind of liquid in the world"""
+        return int(self.level[self.kind == kind].sum(dtype=np.int64))
+
+    def wake(self, x, y):
+        """Step the blocks around (x, y) on the next tick"""
+        for ny in range(max(y - 1, 0), min(y + 2, self.height)):
+            for nx in range(max(x - 1, 0), min(x + 2, self.width)):
+                self.active.add(ny * self.width + nx)
+
+    def sync(self):
+        """Wake the liquid around block changes since the last sync.
+
+        Liquid in a block that became solid is gone.
+        """
+        changes = self.world.changes_since(self.cursor)
+        self.cursor = self.world.journal.cursor
+        if changes is None:
+            solid = self._solid(self.world.get_region(0, 0, self.width, self.height))
+            self.level[solid] = 0
+            self.kind[solid] = NONE
+            self.active.update(np.flatnonzero(self.level).tolist())
+            return
+        for x, y, new in zip(changes['x'].tolist(), changes['y'].tolist(), changes['new'].tolist()):
+            if SOLID[new]:
+                self.level[y, x] = 0
+                self.kind[y, x] = NONE
+            self.wake(x, y)
+
+    def step(self):
+        """Advance the liquid one tick; returns the number of blocks stepped"""
+        self.sync()
+        active = self.active
+        self.active = set()
+        self.ticks += 1
+        if not active:
+            return 0
+        if self.vectorize is None:
+            window = self._window(active)
+            area = (window[2] - window[0]) * (window[3] - window[1])
+            dense = len(active) >= DENSE_MIN_BLOCKS and len(active) * 8 >= area
+        else:
+            window = self._window(active) if self.vectorize else None
+            dense = self.vectorize
+        if dense:
+            self.dense_ticks += 1
+            return self._step_dense(*window)
+        return self._step_sparse(active)
+
+    def _window(self, active):
+        cells = np.fromiter(active, dtype=np.int64, count=len(active))
+        ys, xs = np.divmod(cells, self.width)
+        return (max(int(xs.min()) - DENSE_MARGIN, 0), max(int(ys.min()) - DENSE_MARGIN, 0),
+                min(int(xs.max()) + DENSE_MARGIN + 1, self.width),
+                min(int(ys.max()) + DENSE_MARGIN + 1, self.height))
+
+    def _step_dense(self, x0, y0, x1, y1):
+        """Step every block of a window with flow()"""
+        level = self.level[y0:y1, x0:x1].astype(np.int32)
+        kind = self.kind[y0:y1, x0:x1].astype(np.int32)
+        open_blocks = self._solid(self.world.get_region(x0, y0, x1, y1))
+        np.logical_not(open_blocks, out=open_blocks)
+        level2, kind2, stone, changed, donors = flow(level, kind, open_blocks)
+        changed |= (level2 != level) | (kind2 != kind)
+        self.level[y0:y1, x0:x1] = level2
+        self.kind[y0:y1, x0:x1] = kind2
+
+        # Next tick: around every change, and wherever liquid is still flowing
+        wake = changed.copy()
+        wake[1:] |= changed[:-1]
+        wake[:-1] |= changed[1:]
+        awake = wake.copy()
+        awake[:, 1:] |= wake[:, :-1]
+        awake[:, :-1] |= wake[:, 1:]
+        ys, xs = np.nonzero(awake | donors)
+        self.active.update(((ys + y0) * self.width + xs + x0).tolist())
+
+        if stone.any():
+            ys, xs = np.nonzero(stone)
+            self.world.set_blocks(xs + x0, ys + y0, np.full(len(xs), BlockType.STONE.value))
+        return level.size
+
+    def _step_sparse(self, active):
+        """Step the active blocks one by one, with the same rules as flow()"""
+        width = self.width
+        size = width * self.height
+        levels = self.level.ravel()
+        kinds = self.kind.ravel()
+        is_solid = self.world.is_solid
+
+        def is_open(cell):
+            return not is_solid(cell % width, cell // width)
+
+        # Fall
+        level1, kind1 = {}, {}
+        donors = set()
+        falls = []
+        for cell in active:
+            level = int(levels[cell])
+            below = cell + width
+            if level == 0 or below >= size:
+                continue
+            kind, below_kind = int(kinds[cell]), int(kinds[below])
+            if (below_kind == NONE or below_kind == kind) and is_open(below):
+                amount = min(level, MAX_LEVEL - int(levels[below]))
+                if amount > 0:
+                    falls.append((cell, below, amount, kind))
+        for cell, below, amount, kind in falls:
+            level1[cell] = level1.get(cell, int(levels[cell])) - amount
+            level1[below] = level1.get(below, int(levels[below])) + amount
+            kind1[below] = kind
+            donors.add(cell)
+        for cell, level in level1.items():
+            kind1[cell] = NONE if level == 0 else kind1.get(cell, int(kinds[cell]))
+        changed = set(level1)
+
+        def level_after_fall(cell):
+            return level1[cell] if cell in level1 else int(levels[cell])
+
+        def kind_after_fall(cell):
+            return kind1[cell] if cell in kind1 else int(kinds[cell])
+
+        # Spread, from the active blocks and the blocks next to where liquid fell
+        spreading = set(active)
+        for cell in level1:
+            spreading.add(cell)
+            if cell % width > 0:
+                spreading.add(cell - 1)
+            if cell % width < width - 1:
+                spreading.add(cell + 1)
+        level2 = dict(level1)
+        arrivals = {}
+        spreads = []
+        for cell in spreading:
+            level = level_after_fall(cell)
+            if level == 0:
+                continue
+            kind = kind_after_fall(cell)
+            x = cell % width
+            for side, inside in ((cell - 1, x > 0), (cell + 1, x < width - 1)):
+                if not inside:
+                    continue
+                side_level = level_after_fall(side)
+                side_kind = kind_after_fall(side)
+                if level > side_level and (side_kind == NONE or side_kind == kind) and is_open(side):
+                    amount = (level - side_level) // SPREAD_DIVISOR[kind]
+                    if amount > 0:
+                        spreads.append((cell, side, amount, kind))
+        for cell, side, amount, kind in spreads:
+            level2[cell] = level2.get(cell, level_after_fall(cell)) - amount
+            level2[side] = level2.get(side, level_after_fall(side)) + amount
+            arrivals.setdefault(side, set()).add(kind)
+            donors.add(cell)
+        kind2 = {}
+        stone = set()
+        for cell, level in level2.items():
+            kind = kind_after_fall(cell)
+            if kind == NONE and cell in arrivals:
+                kind = max(arrivals[cell])
+                if len(arrivals[cell]) > 1:
+                    stone.add(cell)
+            kind2[cell] = NONE if level == 0 else kind
+
+        def kind_after_spread(cell):
+            return kind2[cell] if cell in kind2 else int(kinds[cell])
+
+        # Lava next to water turns to stone
+        reacting = set(active) | set(level2)
+        for cell in level2:
+            reacting.update(self._neighbours(cell))
+        for cell in reacting:
+            if kind_after_spread(cell) == LAVA and any(
+                    kind_after_spread(neighbour) == WATER for neighbour in self._neighbours(cell)):
+                stone.add(cell)
+        for cell in stone:
+            level2[cell] = 0
+            kind2[cell] = NONE
+
+        for cell, level in level2.items():
+            if level != levels[cell] or kind2[cell] != kinds[cell]:
+                changed.add(cell)
+            levels[cell] = level
+            kinds[cell] = kind2[cell]
+
+        # Next tick: around every change, and wherever liquid is still flowing
+        self.active.update(donors)
+        for cell in changed:
+            self.wake(cell % width, cell // width)
+        if stone:
+            for cell in stone:
+                self.world.set_block(cell % width, cell // width, BlockType.STONE)
+        return len(active)
+
+    def _neighbours(self, cell):
+        x = cell % self.width
+        if x > 0:
+            yield cell - 1
+        if x < self.width - 1:
+            yield cell + 1
+        if cell >= self.width:
+            yield cell - self.width
+        if cell + self.width < self.width * self.height:
+            yield cell + self.width
@@ -0,0 +1,414 @@
+"""Pathfinding over the block grid for walking, jumping and falling bodies.
+
+A node is a block a body can stand in: its body's rows of blocks are
+open and the block below its feet is solid. Links between nodes are the
+moves a body can make: walking to the next block, and arcs of jumps and
+falls. The arcs come from simulating the body's own physics (Player's
+acceleration, max_speed, jump_strength, gravity and size), so a link
+only exists where the body could follow it; every arc is kept as a
+template of the blocks it sweeps and the node it lands on, and a link
+exists from a node wherever all of a template's blocks are open.
+
+NavGraph builds the links chunk by chunk, with NumPy over the chunk and
+the margin of blocks the arcs can reach, and caches them. It follows
+the world's change journal like the other derived views: sync() drops
+the chunks whose links a block change could touch, and they are rebuilt
+when next needed. find_path is A*; find_paths answers a batch of
+queries, searching once backwards from each goal shared by several
+starts, which is the common case of many mobs chasing one player.
+"""
+import heapq
+import math
+from collections import defaultdict
+
+import numpy as np
+
+from blocks import SOLID, Lookup
+from chunks import CHUNK_SIZE
+from player import Player
+
+TILE_SIZE = 32
+SPEED_STEPS = 4  # Arcs are simulated at max_speed * k / SPEED_STEPS for k = 1..SPEED_STEPS
+MAX_DROP = 12  # Deepest fall, in blocks, a link may make
+MAX_EXPANSIONS = 20000  # Nodes a search visits before giving up
+# More block changes than this since the last sync are cheaper to handle by
+# rebuilding the chunks around them
+MAX_INCREMENTAL_CHANGES = 64
+
+class JumpTemplate:
+    """A move from a node to the node (dx, dy) away, open where cells are"""
+    __slots__ = ('dx', 'dy', 'cost', 'cells')
+
+    def __init__(self, dx, dy, cost, cells):
+        self.dx = dx
+        self.dy = dy
+        self.cost = cost  # Ticks the move takes
+        self.cells = cells  # (dx, dy) of the blocks swept, relative to the start node
+
+def _arc(body, direction, speed, jump, max_drop):
+    """Simulate one run off the start node, yielding (ticks, x, cells, landings).
+
+    Positions follow Player.move: velocities change, then the body moves
+    by their rounded values. The start node's floor holds the body up
+    until it has moved off it. landings are the columns the body would
+    land on in the row of its feet if that row's next block down were
+    solid.
+    """
+    width, height = body.width, body.height
+    x = (TILE_SIZE - width) // 2
+    y = TILE_SIZE - height
+    vx = 0.0
+    vy = float(body.jump_strength) if jump else 0.0
+    on_ground = not jump
+    swept = set()
+    for ticks in range(1, 400):
+        vx = min(vx + body.acceleration, speed)
+        if not on_ground:
+            vy = min(vy + body.gravity, body.terminal_velocity)
+        x += round(vx) * direction
+        y += round(vy)
+        left, right = x // TILE_SIZE, (x + width - 1) // TILE_SIZE
+        if vy >= 0 and left <= 0 <= right and (y + height - 1) // TILE_SIZE >= 1:
+            if jump:
+                return  # Came back down on the start node
+            # Still over the start node's floor
+            y = TILE_SIZE - height
+            vy = 0.0
+            on_ground = True
+        else:
+            on_ground = False
+        top, bottom = y // TILE_SIZE, (y + height - 1) // TILE_SIZE
+        swept.update((cx, cy) for cx in range(left, right + 1) for cy in range(top, bottom + 1))
+        if bottom > max_drop:
+            return
+
+        # Where the next tick would move the feet into the next row down, the
+        # body lands on any solid block it is over both now and then
+        next_vy = min(vy + body.gravity, body.terminal_velocity) if not on_ground else vy
+        if on_ground or (y + round(next_vy) + height - 1) // TILE_SIZE <= bottom:
+            continue
+        next_vx = min(vx + body.acceleration, speed)
+        next_x = x + round(next_vx) * direction
+        next_left, next_right = next_x // TILE_SIZE, (next_x + width - 1) // TILE_SIZE
+        landings = [column for column in range(max(left, next_left), min(right, next_right) + 1)
+                    if column != 0]
+        if landings:
+            yield ticks, x, frozenset(swept), landings, bottom
+
+def jump_templates(body, speed_steps=SPEED_STEPS, max_drop=MAX_DROP):
+    """Templates of the walks, jumps and falls a body with body's constants can make"""
+    walk_cost = TILE_SIZE / body.max_speed
+    templates = {(1, 0, frozenset()): walk_cost, (-1, 0, frozenset()): walk_cost}
+    body_rows = math.ceil(body.height / TILE_SIZE)
+    for jump in (True, False):
+        for direction in (1, -1):
+            for step in range(1, speed_steps + 1):
+                speed = body.max_speed * step / speed_steps
+                for ticks, x, swept, landings, row in _arc(body, direction, speed, jump, max_drop):
+                    for column in landings:
+                        # Then walk to the middle of the block landed on
+                        center = column * TILE_SIZE + (TILE_SIZE - body.width) // 2
+                        cost = ticks + abs(center - x) / body.max_speed
+                        # The landing node's own blocks are checked as part of it
+                        cells = frozenset(cell for cell in swept
+                                          if not (cell[0] == column and row - body_rows < cell[1] <= row))
+                        key = (column, row, cells)
+                        if cost < templates.get(key, float('inf')):
+                            templates[key] = cost
+    # Drop the moves another one to the same place beats: as fast, needing fewer open blocks
+    kept = []
+    for (dx, dy, cells), cost in sorted(templates.items(), key=lambda item: (item[1], len(item[0][2]))):
+        if not any(other.dx == dx and other.dy == dy and other.cells <= cells for other in kept):
+            kept.append(JumpTemplate(dx, dy, cost, cells))
+    for template in kept:
+        template.cells = tuple(sorted(template.cells))
+    return kept
+
+def _check_trie(templates):
+    """Trie of the checks the templates make, so checks they share are made once.
+
+    A template checks that the node it lands on is standable and that
+    each of its cells is open. Sorted the same way for every template,
+    most templates start with the same checks near the start node. Each
+    trie node is {check: child}, with the templates whose checks end
+    there under the key None.
+    """
+    root = {}
+    for template in templates:
+        checks = [('open', dx, dy) for dx, dy in template.cells] + [('stand', template.dx, template.dy)]
+        checks.sort(key=lambda check: (abs(check[1]), check[2], check[1], check[0]))
+        node = root
+        for check in checks:
+            node = node.setdefault(check, {})
+        node.setdefault(None, []).append(template)
+    return root
+
+class ChunkNav:
+    """Nodes and outgoing links of the nodes in one chunk"""
+    __slots__ = ('origin', 'standable', 'links', 'incoming')
+
+    def __init__(self, origin, standable):
+        self.origin = origin  # World coordinates of the chunk's first block
+        self.standable = standable  # [y, x] bool array over the chunk
+        self.links = {}  # (x, y) -> [(x, y, cost)] leaving each node
+        self.incoming = {}  # (x, y) -> [(x, y, cost)] arriving there from this chunk
+
+    def add_links(self, links):
+        for source, target, cost in links:
+            self.links.setdefault(source, []).append((target[0], target[1], cost))
+            self.incoming.setdefault(target, []).append((source[0], source[1], cost))
+
+    def remove_links(self, x0, y0, x1, y1):
+        """Forget the links leaving the nodes in the rectangle [x0, x1) x [y0, y1)"""
+        for source in [node for node in self.links if x0 <= node[0] < x1 and y0 <= node[1] < y1]:
+            for x, y in {link[:2] for link in self.links.pop(source)}:
+                arriving = [link for link in self.incoming[(x, y)] if link[:2] != source]
+                if arriving:
+                    self.incoming[(x, y)] = arriving
+                else:
+                    del self.incoming[(x, y)]
+
+class NavGraph:
+    def __init__(self, world, body=None, speed_steps=SPEED_STEPS, max_drop=MAX_DROP):
+        """Navigation graph of world for bodies moving like body (a Player by default)"""
+        self.world = world
+        body = body if body is not None else Player(world)
+        self.body_rows = math.ceil(body.height / TILE_SIZE)
+        self.max_speed = body.max_speed
+        self.templates = jump_templates(body, speed_steps, max_drop)
+        self.checks = _check_trie(self.templates)
+
+        # Blocks a node's links can look at beyond it
+        offsets = [(t.dx, t.dy) for t in self.templates] + [cell for t in self.templates for cell in t.cells]
+        self.margin_x = max(abs(dx) for dx, _ in offsets) + 1
+        self.margin_up = max(-min(dy for _, dy in offsets), 0) + self.body_rows
+        self.margin_down = max(dy for _, dy in offsets) + 2
+
+        self.chunks = {}  # (cx, cy) -> ChunkNav
+        self.cursor = world.journal.cursor
+        self.builds = 0  # Chunks built, for tests and benchmarks
+        self.repairs = 0  # Rectangles of nodes relinked after block changes
+        self._solid = Lookup(SOLID)  # Reused by every chunk build
+
+    def sync(self):
+        """Relink the nodes whose links the block changes since the last sync may have changed"""
+        changes = self.world.changes_since(self.cursor)
+        self.cursor = self.world.journal.cursor
+        if changes is None:
+            self.chunks.clear()
+            return
+        if len(changes) == 0 or not self.chunks:
+            return
+        if len(changes) > MAX_INCREMENTAL_CHANGES:
+            # Cheaper to rebuild the chunks near the changes when next needed
+            for x, y in set(zip(changes['x'].tolist(), changes['y'].tolist())):
+                for key in self._chunks_near(x, y):
+                    self.chunks.pop(key, None)
+            return
+
+        # Nodes whose links look at a changed block are within the margins of it
+        rectangles = set()
+        for x, y in set(zip(changes['x'].tolist(), changes['y'].tolist())):
+            rx0, rx1 = x - self.margin_x, x + self.margin_x + 1
+            ry0, ry1 = y - self.margin_down, y + self.margin_up + 1
+            for key in self._chunks_near(x, y):
+                nav = self.chunks.get(key)
+                if nav is None:
+                    continue
+                cx0, cy0 = nav.origin
+                rectangles.add((key, max(rx0, cx0), max(ry0, cy0),
+                                min(rx1, cx0 + CHUNK_SIZE), min(ry1, cy0 + CHUNK_SIZE)))
+        for key, x0, y0, x1, y1 in rectangles:
+            nav = self.chunks[key]
+            nav.remove_links(x0, y0, x1, y1)
+            standable, links = self._link(x0, y0, x1, y1)
+            cx0, cy0 = nav.origin
+            nav.standable[y0 - cy0:y1 - cy0, x0 - cx0:x1 - cx0] = standable
+            nav.add_links(links)
+            self.repairs += 1
+
+    def _chunks_near(self, x, y):
+        """Keys of the chunks with nodes whose links may look at block (x, y)"""
+        return [(cx, cy)
+                for cy in range((y - self.margin_down) // CHUNK_SIZE, (y + self.margin_up) // CHUNK_SIZE + 1)
+                for cx in range((x - self.margin_x) // CHUNK_SIZE, (x + self.margin_x) // CHUNK_SIZE + 1)]
+
+    def chunk(self, cx, cy):
+        """Navigation data of chunk (cx, cy), built if it is not cached"""
+        nav = self.chunks.get((cx, cy))
+        if nav is None:
+            x0, y0 = cx * CHUNK_SIZE, cy * CHUNK_SIZE
+            standable, links = self._link(x0, y0, x0 + CHUNK_SIZE, y0 + CHUNK_SIZE)
+            nav = self.chunks[(cx, cy)] = ChunkNav((x0, y0), standable)
+            nav.add_links(links)
+            self.builds += 1
+        return nav
+
+    def _link(self, x0, y0, x1, y1):
+        """Standable mask of the rectangle [x0, x1) x [y0, y1) and the links leaving its nodes"""
+        mx, mu, md = self.margin_x, self.margin_up, self.margin_down
+        width, height = x1 - x0, y1 - y0
+        solid = self._solid(self.world.get_region(x0 - mx, y0 - mu, x1 + mx, y1 + md))
+        arrays = {'open': ~solid}
+        # A node's body rows are open and the block under it is solid
+        stand = np.zeros_like(solid)
+        stand[:-1] = solid[1:]
+        for row in range(self.body_rows):
+            stand[row:] &= arrays['open'][:len(solid) - row]
+        # Outside a bounded world there is nothing to stand on
+        if self.world.width is not None:
+            columns = np.arange(x0 - mx, x1 + mx)
+            stand[:, (columns < 0) | (columns >= self.world.width)] = False
+        arrays['stand'] = stand
+
+        here = stand[mu:mu + height, mx:mx + width]
+        links = []
+        if not here.any():
+            return here.copy(), links
+        # Walk the trie of checks depth first, narrowing the mask of nodes
+        # that pass, and skipping whole branches once no node does
+        stack = [(self.checks, here)]
+        while stack:
+            node, mask = stack.pop()
+            for check, child in node.items():
+                if check is None:
+                    ys, xs = np.nonzero(mask)
+                    sources = list(zip((xs + x0).tolist(), (ys + y0).tolist()))
+                    for template in child:
+                        links.extend(((x, y), (x + template.dx, y + template.dy), template.cost)
+                                     for x, y in sources)
+                    continue
+                kind, dx, dy = check
+                passed = mask & arrays[kind][mu + dy:mu + dy + height, mx + dx:mx + dx + width]
+                if passed.any():
+                    stack.append((child, passed))
+        return here.copy(), links
+
+    def is_node(self, x, y):
+        """Whether a body can stand with its feet in block (x, y)"""
+        return bool(self.chunk(x // CHUNK_SIZE, y // CHUNK_SIZE).standable[y % CHUNK_SIZE, x % CHUNK_SIZE])
+
+    def node_at(self, x, y, width, height):
+        """Node of a body at pixel position (x, y), or None if it is not standing.
+
+        A body over two blocks stands on the one under its middle if it
+        can, else on the other.
+        """
+        row = int((y + height - 1) // TILE_SIZE)
+        middle = int((x + width / 2) // TILE_SIZE)
+        for column in (middle, int(x // TILE_SIZE), int((x + width - 1) // TILE_SIZE)):
+            if self.is_node(column, row):
+                return (column, row)
+        return None
+
+    def neighbours(self, node):
+        """[(x, y, cost)] of the links leaving node"""
+        x, y = node
+        return self.chunk(x // CHUNK_SIZE, y // CHUNK_SIZE).links.get(node, ())
+
+    def predecessors(self, node):
+        """[(x, y, cost)] of the links arriving at node"""
+        x, y = node
+        found = []
+        # Links come from within a margin of the node
+        for cy in range((y - self.margin_down) // CHUNK_SIZE, (y + self.margin_up) // CHUNK_SIZE + 1):
+            for cx in range((x - self.margin_x) // CHUNK_SIZE, (x + self.margin_x) // CHUNK_SIZE + 1):
+                found.extend(self.chunk(cx, cy).incoming.get(node, ()))
+        return found
+
+    def path_cost(self, path):
+        """Ticks a path takes, following the fastest link between each pair of its nodes"""
+        return sum(min(cost for x, y, cost in self.neighbours(node) if (x, y) == following)
+                   for node, following in zip(path, path[1:]))
+
+    def heuristic(self, node, goal):
+        """Lower bound on the ticks from node to goal: no move is faster than max_speed"""
+        return abs(goal[0] - node[0]) * TILE_SIZE / self.max_speed
+
+    def find_path(self, start, goal, max_expansions=MAX_EXPANSIONS):
+        """Nodes from start to goal on a fastest route, or None if there is none"""
+        self.sync()
+        if not (self.is_node(*start) and self.is_node(*goal)):
+            return None
+        best = {start: 0.0}
+        came_from = {start: None}
+        frontier = [(self.heuristic(start, goal), 0.0, start)]
+        expansions = 0
+        while frontier and expansions < max_expansions:
+            _, cost, node = heapq.heappop(frontier)
+            if node == goal:
+                return _walk_back(came_from, goal)
+            if cost > best[node]:
+                continue
+            expansions += 1
+            for x, y, step in self.neighbours(node):
+                neighbour = (x, y)
+                new_cost = cost + step
+                if new_cost < best.get(neighbour, float('inf')):
+                    best[neighbour] = new_cost
+                    came_from[neighbour] = node
+                    heapq.heappush(frontier, (new_cost + self.heuristic(neighbour, goal), new_cost, neighbour))
+        return None
+
+    def paths_to(self, goal, starts, max_expansions=MAX_EXPANSIONS):
+        """Paths from each of starts to goal (None where there is none), from one backwards search"""
+        self.sync()
+        if not self.is_node(*goal):
+            return [None] * len(starts)
+        waiting = set(starts)
+        best = {goal: 0.0}
+        next_node = {goal: None}
+        frontier = [(0.0, goal)]
+        expansions = 0
+        while frontier and waiting and expansions < max_expansions:
+            cost, node = heapq.heappop(frontier)
+            if cost > best[node]:
+                continue
+            waiting.discard(node)
+            expansions += 1
+            for x, y, step in self.predecessors(node):
+                previous = (x, y)
+                new_cost = cost + step
+                if new_cost < best.get(previous, float('inf')):
+                    best[previous] = new_cost
+                    next_node[previous] = node
+                    heapq.heappush(frontier, (new_cost, previous))
+
+        paths = []
+        for start in starts:
+            if start in waiting or start not in next_node:
+                paths.append(None)
+                continue
+            path = [start]
+            while path[-1] != goal:
+                path.append(next_node[path[-1]])
+            paths.append(path)
+        return paths
+
+    def find_paths(self, queries, max_expansions=MAX_EXPANSIONS):
+        """Paths for a batch of (start, goal) queries, in order.
+
+        Queries sharing a goal are answered by one backwards search from
+        it; the rest by A* each.
+        """
+        by_goal = defaultdict(list)
+        for index, (start, goal) in enumerate(queries):
+            by_goal[goal].append(index)
+        paths = [None] * len(queries)
+        for goal, indices in by_goal.items():
+            if len(indices) == 1:
+                index = indices[0]
+                paths[index] = self.find_path(queries[index][0], goal, max_expansions)
+                continue
+            starts = [queries[index][0] for index in indices]
+            for index, path in zip(indices, self.paths_to(goal, starts, max_expansions)):
+                paths[index] = path
+        return paths
+
+def _walk_back(came_from, node):
+    path = []
+    while node is not None:
+        path.append(node)
+        node = came_from[node]
+    path.reverse()
+    return path
@@ -0,0 +1,209 @@
+import numpy as np
+
+from blocks import SOLID, Lookup
+
+TILE_SIZE = 32
+
+class EntityPhysics:
+    """Gravity, friction and tile collisions for many bodies at once.
+
+    Bodies are stored structure-of-arrays style: one NumPy array per
+    property, with the first count slots in use. step() advances every body
+    with a handful of array operations and follows Player.move exactly, so
+    a body with a player's constants ends up bit-for-bit where the Player
+    would.
+    """
+
+    FIELDS = {
+        'x': np.float64,
+        'y': np.float64,
+        'velocity_x': np.float64,
+        'velocity_y': np.float64,
+        'width': np.int64,
+        'height': np.int64,
+        'acceleration': np.float64,
+        'max_speed': np.float64,
+        'jump_strength': np.float64,
+        'gravity': np.float64,
+        'friction': np.float64,
+        'air_resistance': np.float64,
+        'terminal_velocity': np.float64,
+        'on_ground': bool,
+        'moving_left': bool,
+        'moving_right': bool,
+        'ids': np.int64,
+    }
+
+    # Defaults match Player
+    DEFAULTS = {
+        'width': 20,
+        'height': 40,
+        'acceleration': 0.6,
+        'max_speed': 4,
+        'jump_strength': -8,
+        'gravity': 0.4,
+        'friction': 0.8,
+        'air_resistance': 0.95,
+        'terminal_velocity': 8,
+    }
+
+    def __init__(self, world, capacity=64):
+        self.world = world
+        self.count = 0
+        self.next_id = 0
+        self.capacity = capacity
+        self._solid = Lookup(SOLID)  # Array reused by the collision queries
+        for name, dtype in self.FIELDS.items():
+            setattr(self, '_' + name, np.zeros(capacity, dtype=dtype))
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        self.capacity *= 2
+        for name in self.FIELDS:
+            old = getattr(self, '_' + name)
+            new = np.zeros(self.capacity, dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, '_' + name, new)
+
+    def add(self, x, y, **properties):
+        """Add a body and return its slot; unset properties take DEFAULTS"""
+        if self.count == self.capacity:
+            self._grow()
+        slot = self.count
+        self.count += 1
+        values = dict(self.DEFAULTS, x=x, y=y, ids=self.next_id)
+        values.update(properties)
+        for name in self.FIELDS:
+            getattr(self, '_' + name)[slot] = values.get(name, 0)
+        self.next_id += 1
+        return slot
+
+    def add_player(self, player):
+        """Add a body with a player's position, velocity and physics constants"""
+        return self.add(player.x, player.y,
+                        velocity_x=player.velocity_x, velocity_y=player.velocity_y,
+                        width=player.width, height=player.height,
+                        acceleration=player.acceleration, max_speed=player.max_speed,
+                        jump_strength=player.jump_strength, gravity=player.gravity,
+                        friction=player.friction, air_resistance=player.air_resistance,
+                        terminal_velocity=player.terminal_velocity, on_ground=player.on_ground)
+
+    def remove(self, slot):
+        """Remove the body in slot by moving the last body into it"""
+        last = self.count - 1
+        for name in self.FIELDS:
+            array = getattr(self, '_' + name)
+            array[slot] = array[last]
+        self.count -= 1
+
+    def slot_of(self, entity_id):
+        """Current slot of the body with a given id"""
+        return int(np.flatnonzero(self.ids == entity_id)[0])
+
+    def step(self, moving_left=None, moving_right=None, jump=None):
+        """Advance every body by one tick.
+
+        The optional boolean arrays set the movement flags and request a
+        jump (which only happens on the ground), like Player.handle_input.
+        """
+        if moving_left is not None:
+            self.moving_left[:] = moving_left
+        if moving_right is not None:
+            self.moving_right[:] = moving_right
+        if jump is not None:
+            jumping = np.asarray(jump, dtype=bool) & self.on_ground
+            self.velocity_y[jumping] = self.jump_strength[jumping]
+            self.on_ground[jumping] = False
+
+        on_ground = self.on_ground
+        left = self.moving_left
+        right = self.moving_right & ~left
+        idle = ~(left | right)
+
+        # Accelerate from input, or slow down with friction/air resistance
+        vx = self.velocity_x
+        vx[left] = np.maximum(vx[left] - self.acceleration[left], -self.max_speed[left])
+        vx[right] = np.minimum(vx[right] + self.acceleration[right], self.max_speed[right])
+        damping = np.where(on_ground, self.friction, self.air_resistance)
+        vx[idle] *= damping[idle]
+
+        # Apply gravity up to terminal velocity
+        falling = ~on_ground
+        vy = self.velocity_y
+        vy[falling] = np.minimum(vy[falling] + self.gravity[falling], self.terminal_velocity[falling])
+
+        # Move and resolve horizontally first, then vertically
+        self.x += np.round(vx)
+        self._collide_horizontal()
+        self.y += np.round(vy)
+        self._collide_vertical()
+
+        # Reset extremely small velocities to prevent jittering
+        vx[np.abs(vx) < 0.1] = 0
+
+    def _block_bounds(self):
+        """Tile coordinates covered by each body, truncated like int()"""
+        left = np.trunc(self.x / TILE_SIZE).astype(np.int64)
+        right = np.trunc((self.x + self.width - 1) / TILE_SIZE).astype(np.int64)
+        top = np.trunc(self.y / TILE_SIZE).astype(np.int64)
+        bottom = np.trunc((self.y + self.height - 1) / TILE_SIZE).astype(np.int64)
+        return left, right, top, bottom
+
+    def _any_solid(self, fixed, start, end, fixed_is_x):
+        """For each body, whether any tile from start to end along one axis is solid"""
+        span = int((end - start).max(initial=-1)) + 1
+        if span <= 0:
+            return np.zeros(self.count, dtype=bool)
+        offsets = np.arange(span)
+        along = start[:, np.newaxis] + offsets
+        valid = along <= end[:, np.newaxis]
+        fixed = np.broadcast_to(fixed[:, np.newaxis], along.shape)
+        out = self._solid.buffer(along.shape)
+        if fixed_is_x:
+            solid = self.world.solid_at(fixed, along, out)
+        else:
+            solid = self.world.solid_at(along, fixed, out)
+        return (solid & valid).any(axis=1)
+
+    def _collide_horizontal(self):
+        vx = self.velocity_x
+        left, right, top, bottom = self._block_bounds()
+        moving_right = vx > 0
+        moving_left = vx < 0
+        column = np.where(moving_right, right, left)
+        hit = self._any_solid(column, top, bottom, True) & (moving_right | moving_left)
+
+        hit_right = hit & moving_right
+        hit_left = hit & moving_left
+        self.x[hit_right] = right[hit_right] * TILE_SIZE - self.width[hit_right]
+        self.x[hit_left] = (left[hit_left] + 1) * TILE_SIZE
+        vx[hit] = 0
+
+    def _collide_vertical(self):
+        vy = self.velocity_y
+        left, right, top, bottom = self._block_bounds()
+        moving_down = vy > 0
+        moving_up = vy < 0
+        row = np.where(moving_down, bottom, top)
+        hit = self._any_solid(row, left, right, False) & (moving_down | moving_up)
+
+        self.on_ground[:] = False
+        hit_down = hit & moving_down
+        hit_up = hit & moving_up
+        self.y[hit_down] = bottom[hit_down] * TILE_SIZE - self.height[hit_down]
+        self.y[hit_up] = (top[hit_up] + 1) * TILE_SIZE
+        vy[hit] = 0
+        self.on_ground[hit_down] = True
+
+def _field_property(name):
+    """Property exposing the slots in use of a field array, e.g. physics.x"""
+    def get(self):
+        return getattr(self, '_' + name)[:self.count]
+    def set(self, value):
+        getattr(self, '_' + name)[:self.count] = value
+    return property(get, set)
+
+for _name in EntityPhysics.FIELDS:
+    setattr(EntityPhysics, _name, _field_property(_name))
@@ -2,6 +2,7 @@ import pygame
 from pygame.locals import *
 import numpy as np
 from world import BlockType
+from collision import move_and_collide
 
 class Player:
     def __init__(self, world, x=0, y=0):
@@ -20,7 +21,12 @@ class Player:
         self.gravity = 0.4  # Reduced for smoother falling
         self.friction = 0.8  # Ground friction
         self.air_resistance = 0.95  # Air resistance when jumping
+        self.terminal_velocity = 8  # Falling speed limit
         self.on_ground = False
+
+        # Swept collisions trace the whole move, so speeds above one block
+        # per tick cannot tunnel through terrain
+        self.continuous_collision = False
         
         # Movement flags
         self.moving_left = False
@@ -104,7 +110,7 @@ class Player:
         if not self.on_ground:
             self.velocity_y += self.gravity
             # Terminal velocity
-            self.velocity_y = min(self.velocity_y, 8)
+            self.velocity_y = min(self.velocity_y, self.terminal_velocity)
         
         # Update position and check collisions
         self.update_position()
@@ -115,6 +121,10 @@ class Player:
     
     def update_position(self):
         """Update position and handle collisions"""
+        if self.continuous_collision:
+            self.sweep_position()
+            return
+
         # Move and check horizontally first
         self.x += round(self.velocity_x)  # Round to prevent sub-pixel movement
         self.check_horizontal_collisions()
@@ -123,6 +133,17 @@ class Player:
         self.y += round(self.velocity_y)  # Round to prevent sub-pixel movement
         self.check_vertical_collisions()
     
+    def sweep_position(self):
+        """Move along the whole velocity, stopping at the first block hit"""
+        self.x, self.y, normal_x, normal_y = move_and_collide(
+            self.world, self.x, self.y, self.width, self.height,
+            round(self.velocity_x), round(self.velocity_y))
+        if normal_x:
+            self.velocity_x = 0
+        if normal_y:
+            self.velocity_y = 0
+        self.on_ground = normal_y < 0
+
     def check_horizontal_collisions(self):
         """Handle horizontal collisions"""
         # Get block coordinates for collision check
@@ -131,18 +152,15 @@ class Player:
         top_block = int(self.y / 32)
         bottom_block = int((self.y + self.height - 1) / 32)
         
-        # Check each potential collision point
-        for y in range(top_block, bottom_block + 1):
-            if self.velocity_x > 0:  # Moving right
-                if self.world.is_solid(right_block, y):
-                    self.x = right_block * 32 - self.width
-                    self.velocity_x = 0
-                    break
-            elif self.velocity_x < 0:  # Moving left
-                if self.world.is_solid(left_block, y):
-                    self.x = (left_block + 1) * 32
-                    self.velocity_x = 0
-                    break
+        # Check the column of blocks on the leading edge in one query
+        if self.velocity_x > 0:  # Moving right
+            if self.world.any_solid(right_block, top_block, right_block, bottom_block):
+                self.x = right_block * 32 - self.width
+                self.velocity_x = 0
+        elif self.velocity_x < 0:  # Moving left
+            if self.world.any_solid(left_block, top_block, left_block, bottom_block):
+                self.x = (left_block + 1) * 32
+                self.velocity_x = 0
     
     def check_vertical_collisions(self):
         """Handle vertical collisions"""
@@ -154,26 +172,24 @@ class Player:
         
         self.on_ground = False
         
-        # Check each potential collision point
-        for x in range(left_block, right_block + 1):
-            if self.velocity_y > 0:  # Moving down
-                if self.world.is_solid(x, bottom_block):
-                    self.y = bottom_block * 32 - self.height
-                    self.velocity_y = 0
-                    self.on_ground = True
-                    break
-            elif self.velocity_y < 0:  # Moving up
-                if self.world.is_solid(x, top_block):
-                    self.y = (top_block + 1) * 32
-                    self.velocity_y = 0
-                    break
+        # Check the row of blocks on the leading edge in one query
+        if self.velocity_y > 0:  # Moving down
+            if self.world.any_solid(left_block, bottom_block, right_block, bottom_block):
+                self.y = bottom_block * 32 - self.height
+                self.velocity_y = 0
+                self.on_ground = True
+        elif self.velocity_y < 0:  # Moving up
+            if self.world.any_solid(left_block, top_block, right_block, top_block):
+                self.y = (top_block + 1) * 32
+                self.velocity_y = 0
     
-    def render(self, screen, camera):
-        """Render the player"""
+    def render(self, screen, camera, position=None):
+        """Render the player, at position instead of its own if given"""
+        x, y = position if position is not None else (self.x, self.y)
         # Draw player
         pygame.draw.rect(screen, (255, 0, 0),  # Red color for player
-                        pygame.Rect(round(self.x - camera.x),  # Round for pixel-perfect rendering
-                                  round(self.y - camera.y),
+                        pygame.Rect(round(x - camera.x),  # Round for pixel-perfect rendering
+                                  round(y - camera.y),
                                   self.width,
                                   self.height))
         
@@ -0,0 +1,119 @@
+"""Background chunk generation for chunked worlds.
+
+ChunkPrefetcher generates chunks in a pool of worker threads (or
+processes) before they are needed. Once a frame, update() looks at
+where the camera is and which way it is moving, asks the pool for the
+missing chunks in and around the view and ahead of it in the direction
+of movement, and hands the finished ones to World.install_chunk.
+
+The main thread only waits on generation when it touches a chunk that
+is not ready yet, such as the chunks under the player for collisions;
+if that chunk is already being generated, it waits for that rather than
+generating it again.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from chunks import CHUNK_SIZE
+import worldgen
+
+class ChunkPrefetcher:
+    def __init__(self, world, workers=2, processes=False, margin=1, lookahead=60,
+                 max_pending=16, block_size=32):
+        """Prefetch chunks of a chunked world.
+
+        Chunks within margin chunks of the view are kept loaded, and the
+        view is also extended by where it will be lookahead ticks ahead
+        at the current velocity. At most max_pending chunks are queued at
+        once. Worker threads hand back the generated arrays as they are;
+        worker processes (processes=True) avoid the GIL but their
+        results are copied back.
+        """
+        if not world.chunked:
+            raise ValueError("Prefetching needs a chunked world")
+        self.world = world
+        self.margin = margin
+        self.lookahead = lookahead
+        self.max_pending = max_pending
+        self.block_size = block_size
+        executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        self.executor = executor(max_workers=workers)
+        self.pending = {}  # (cx, cy) -> future of its blocks
+        world.prefetcher = self
+
+        # Statistics
+        self.requested = 0  # Chunks sent to the pool
+        self.installed = 0  # Finished chunks handed to the world by update()
+        self.claimed = 0  # Chunks the world asked for while still in the pool
+        self.waits = 0  # ... and that were not finished yet
+
+    def request(self, cx, cy):
+        """Generate chunk (cx, cy) in the background unless it exists or is queued"""
+        key = (cx, cy)
+        if key in self.pending or not self.world.needs_generating(cx, cy):
+            return False
+        self.pending[key] = self.executor.submit(
+            worldgen.generate_chunk, self.world.generator, cx, cy,
+            self.world.width, self.world.height)
+        self.requested += 1
+        return True
+
+    def claim(self, key):
+        """Blocks of a requested chunk, waiting for them if need be; None if not requested"""
+        future = self.pending.pop(key, None)
+        if future is None:
+            return None
+        self.claimed += 1
+        if not future.done():
+            self.waits += 1
+        return future.result()
+
+    def collect(self):
+        """Install the chunks finished since the last call"""
+        done = [key for key, future in self.pending.items() if future.done()]
+        for key in done:
+            if self.world.install_chunk(*key, self.pending.pop(key).result()):
+                self.installed += 1
+        return len(done)
+
+    def wanted(self, camera, velocity=(0, 0)):
+        """Chunks to have loaded for the view now and lookahead ticks ahead"""
+        size = CHUNK_SIZE * self.block_size
+        ahead_x = camera.x + velocity[0] * self.lookahead
+        ahead_y = camera.y + velocity[1] * self.lookahead
+        x0 = int(min(camera.x, ahead_x)) // size - self.margin
+        x1 = int(max(camera.x, ahead_x) + camera.width - 1) // size + self.margin
+        y0 = int(min(camera.y, ahead_y)) // size - self.margin
+        y1 = int(max(camera.y, ahead_y) + camera.height - 1) // size + self.margin
+
+        # Nearest to the center of the view ahead first, so chunks in the
+        # direction of movement come before those left behind
+        center_x = (ahead_x + camera.width / 2) / size - 0.5
+        center_y = (ahead_y + camera.height / 2) / size - 0.5
+        keys = [(cx, cy) for cy in range(y0, y1 + 1) for cx in range(x0, x1 + 1)
+                if self.world.in_bounds(cx * CHUNK_SIZE, cy * CHUNK_SIZE)]
+        keys.sort(key=lambda key: (key[0] - center_x) ** 2 + (key[1] - center_y) ** 2)
+        return keys
+
+    def update(self, camera, velocity=(0, 0)):
+        """Install finished chunks and queue the ones the view will need next.
+
+        velocity is the camera's movement in pixels per tick. Returns the
+        number of chunks newly queued.
+        """
+        self.collect()
+        queued = 0
+        for cx, cy in self.wanted(camera, velocity):
+            if len(self.pending) >= self.max_pending:
+                break
+            if self.request(cx, cy):
+                queued += 1
+        return queued
+
+    def close(self):
+        """Stop the workers, dropping queued chunks"""
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=True)
+        if self.world.prefetcher is self:
+            self.world.prefetcher = None
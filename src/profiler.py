@@ -0,0 +1,223 @@
+"""Frame profiler: named timing scopes, per-frame counters and an overlay.
+
+Code to be measured is wrapped in profiler.scope(name), and per-frame
+counts are added with profiler.count(name, n). end_frame() closes the
+frame, adding one record of milliseconds per scope and the counters to
+a rolling history, from which percentiles, the overlay graph and the
+CSV or JSON trace are made.
+
+A disabled profiler costs one attribute check per call: scope() hands
+back a shared do-nothing context manager and count() returns at once.
+Counting calls of a method (count_calls) swaps in a counting wrapper
+only while the profiler is enabled, so the method itself never pays
+for it.
+"""
+import csv
+import json
+import time
+from collections import deque
+from contextlib import nullcontext
+from itertools import islice
+
+import numpy as np
+import pygame
+
+NULL_SCOPE = nullcontext()
+
+# Seconds between refreshes of the overlay's percentile table
+OVERLAY_REFRESH = 0.25
+
+class Scope:
+    """Context manager adding its elapsed time to the profiler's current frame"""
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        times = self.profiler.times
+        times[self.name] = times.get(self.name, 0.0) + (time.perf_counter() - self.start) * 1000
+        return False
+
+class Profiler:
+    def __init__(self, enabled=False, history=600):
+        """Keep the records of the last history frames"""
+        self.enabled = False
+        self.history = deque(maxlen=history)
+        self.frame = 0  # Frames ended while enabled
+        self.times = {}  # Scope -> milliseconds so far this frame
+        self.counters = {}  # Counter -> count so far this frame
+        self.scopes = {}  # Scope objects by name, reused every frame
+        self.instrumented = []  # (object, method name, counter) counted by count_calls
+        self.frame_start = None
+        self.show_overlay = False
+        self.font = None
+        self._panel = None  # Overlay graph surface, reused every frame
+        self._table = []  # Rendered rows of the percentile table
+        self._table_time = None  # When the table was last rendered
+        if enabled:
+            self.enable()
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        for target, method, counter in self.instrumented:
+            self._wrap(target, method, counter)
+        self.frame_start = time.perf_counter()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        for target, method, _ in self.instrumented:
+            # Uncover the class's method again
+            target.__dict__.pop(method, None)
+        self.times.clear()
+        self.counters.clear()
+
+    def toggle(self):
+        """Switch profiling and the overlay on or off together"""
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+        self.show_overlay = self.enabled
+
+    def scope(self, name):
+        """Context manager timing its block under name"""
+        if not self.enabled:
+            return NULL_SCOPE
+        scope = self.scopes.get(name)
+        if scope is None:
+            scope = self.scopes[name] = Scope(self, name)
+        return scope
+
+    def count(self, name, amount=1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def count_calls(self, target, method, counter=None):
+        """Count the calls of target.method per frame while enabled"""
+        counter = counter or method + ' calls'
+        self.instrumented.append((target, method, counter))
+        if self.enabled:
+            self._wrap(target, method, counter)
+
+    def _wrap(self, target, method, counter):
+        function = getattr(target, method)
+        counters = self.counters
+
+        def counted(*args, **kwargs):
+            counters[counter] = counters.get(counter, 0) + 1
+            return function(*args, **kwargs)
+        # An instance attribute hides the class's method until disable()
+        setattr(target, method, counted)
+
+    def end_frame(self):
+        """Record the frame's scopes and counters and start the next frame"""
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        record = {'frame': self.frame, 'frame_ms': (now - self.frame_start) * 1000}
+        record.update(self.times)
+        record.update(self.counters)
+        self.history.append(record)
+        self.frame += 1
+        self.frame_start = now
+        self.times.clear()
+        self.counters.clear()
+
+    def names(self):
+        """Every scope and counter name in the history, in first-seen order"""
+        names = {}
+        for record in self.history:
+            names.update(dict.fromkeys(record))
+        names.pop('frame', None)
+        return list(names)
+
+    def values(self, name):
+        """Value of name in each recorded frame, 0 where it was not recorded"""
+        return np.array([record.get(name, 0) for record in self.history], dtype=np.float64)
+
+    def percentiles(self, name, points=(50, 95, 99)):
+        values = self.values(name)
+        if len(values) == 0:
+            return tuple(0.0 for _ in points)
+        return tuple(float(value) for value in np.percentile(values, points))
+
+    def summary(self):
+        """Name -> {'p50', 'p95', 'p99', 'max'} over the history"""
+        summary = {}
+        for name in self.names():
+            p50, p95, p99 = self.percentiles(name)
+            summary[name] = {'p50': p50, 'p95': p95, 'p99': p99,
+                             'max': float(self.values(name).max())}
+        return summary
+
+    def export(self, path):
+        """Write the history as CSV, or as JSON if path ends in .json"""
+        if path.endswith('.json'):
+            with open(path, 'w') as file:
+                json.dump({'frames': list(self.history), 'summary': self.summary()}, file, indent=2)
+            return
+        columns = ['frame'] + self.names()
+        with open(path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, columns, restval=0)
+            writer.writeheader()
+            writer.writerows(self.history)
+
+    def render(self, screen, position=(10, 10), size=(300, 80), budget_ms=1000 / 60):
+        """Draw the frame time graph and the scope percentiles.
+
+        Each frame is a bar, green within budget_ms and red over it; the
+        line across the graph marks the budget. The percentile table is
+        recomputed and rendered only every OVERLAY_REFRESH seconds, so the
+        overlay adds little to the frame times it shows.
+        """
+        if self.font is None:
+            self.font = pygame.font.Font(None, 16)
+        width, height = size
+        if self._panel is None or self._panel.get_size() != size:
+            self._panel = pygame.Surface(size)
+            self._panel.set_alpha(200)
+        panel = self._panel
+        panel.fill((0, 0, 0))
+
+        scale = height / (budget_ms * 2)  # The budget sits halfway up
+        start = max(0, len(self.history) - width)
+        for x, record in enumerate(islice(self.history, start, None)):
+            ms = record['frame_ms']
+            bar = min(height, int(ms * scale) + 1)
+            color = (80, 220, 80) if ms <= budget_ms else (230, 60, 60)
+            pygame.draw.line(panel, color, (x, height - 1), (x, height - bar))
+        budget_y = height - int(budget_ms * scale)
+        pygame.draw.line(panel, (255, 255, 255), (0, budget_y), (width - 1, budget_y))
+        screen.blit(panel, position)
+
+        now = time.perf_counter()
+        if self._table_time is None or now - self._table_time >= OVERLAY_REFRESH:
+            self._table_time = now
+            self._render_table()
+        x0, y0 = position
+        for image, x, y in self._table:
+            screen.blit(image, (x0 + x, y0 + height + 4 + y))
+
+    def _render_table(self):
+        rows = [("", "p50", "p95", "p99")]
+        for name, stats in self.summary().items():
+            rows.append((name, "%.2f" % stats['p50'], "%.2f" % stats['p95'], "%.2f" % stats['p99']))
+        self._table = []
+        y = 0
+        for row in rows:
+            # Fixed columns, since the default font is not monospaced
+            for text, x in zip(row, (0, 130, 180, 230)):
+                image = self.font.render(text, True, (255, 255, 255), (0, 0, 0))
+                self._table.append((image, x, y))
+            y += image.get_height()
@@ -0,0 +1,131 @@
+"""Binary messages exchanged by the multiplayer server and its clients.
+
+Every message is framed as a little-endian uint32 payload length and a
+uint8 message type, followed by the payload. Chunks are sent compressed
+with the region file codecs; block and entity updates are packed NumPy
+record arrays so a tick's worth of changes costs a few bytes per change.
+"""
+import struct
+
+import numpy as np
+
+import region
+
+FRAME = struct.Struct('<IB')
+
+# Server to client
+MSG_HELLO = 1
+MSG_CHUNK = 2
+MSG_UNLOAD = 3
+MSG_BLOCKS = 4
+MSG_ENTITIES = 5
+MSG_REMOVE = 6
+# Client to server
+MSG_INPUT = 16
+
+# client id, world width and height (-1 if unbounded), seed, tick rate, chunk size
+HELLO = struct.Struct('<Iiiqhh')
+CHUNK_POSITION = struct.Struct('<ii')
+# tick the state is from
+ENTITIES_HEADER = struct.Struct('<I')
+# sequence number, key flags, action, target block x and y
+INPUT = struct.Struct('<IBBii')
+
+BLOCK_DTYPE = np.dtype([('x', '<i4'), ('y', '<i4'), ('block', 'i1')])
+# Client ids are never reused, so they are 32-bit to outlast any server
+ENTITY_DTYPE = np.dtype([('id', '<u4'), ('x', '<i4'), ('y', '<i4')])
+ENTITY_ID_DTYPE = np.dtype('<u4')
+
+# Key flags of an input message
+KEY_LEFT = 1
+KEY_RIGHT = 2
+KEY_JUMP = 4
+
+# Actions of an input message
+ACTION_NONE = 0
+ACTION_BREAK = 1
+ACTION_PLACE = 2
+
+CHUNK_CODEC = 'zlib'
+
+def frame(message_type, payload=b''):
+    return FRAME.pack(len(payload), message_type) + payload
+
+async def read_message(reader):
+    """Read one (message_type, payload) from a stream, or None at end of stream"""
+    try:
+        header = await reader.readexactly(FRAME.size)
+        length, message_type = FRAME.unpack(header)
+        payload = await reader.readexactly(length)
+    except EOFError:
+        return None
+    return message_type, payload
+
+def encode_hello(client_id, width, height, seed, tick_rate, chunk_size):
+    return frame(MSG_HELLO, HELLO.pack(
+        client_id, -1 if width is None else width, -1 if height is None else height,
+        seed, tick_rate, chunk_size))
+
+def decode_hello(payload):
+    client_id, width, height, seed, tick_rate, chunk_size = HELLO.unpack(payload)
+    return {
+        'client_id': client_id,
+        'width': None if width < 0 else width,
+        'height': None if height < 0 else height,
+        'seed': seed,
+        'tick_rate': tick_rate,
+        'chunk_size': chunk_size,
+    }
+
+def encode_chunk(cx, cy, blocks):
+    return frame(MSG_CHUNK, CHUNK_POSITION.pack(cx, cy) + region.compress_chunk(blocks, CHUNK_CODEC))
+
+def decode_chunk(payload):
+    cx, cy = CHUNK_POSITION.unpack_from(payload)
+    return cx, cy, region.decompress_chunk(payload[CHUNK_POSITION.size:], CHUNK_CODEC)
+
+def encode_unload(cx, cy):
+    return frame(MSG_UNLOAD, CHUNK_POSITION.pack(cx, cy))
+
+def decode_unload(payload):
+    return CHUNK_POSITION.unpack(payload)
+
+def encode_blocks(xs, ys, blocks):
+    records = np.empty(len(xs), dtype=BLOCK_DTYPE)
+    records['x'] = xs
+    records['y'] = ys
+    records['block'] = blocks
+    return frame(MSG_BLOCKS, records.tobytes())
+
+def decode_blocks(payload):
+    return np.frombuffer(payload, dtype=BLOCK_DTYPE)
+
+def encode_entities(tick, records):
+    return frame(MSG_ENTITIES, ENTITIES_HEADER.pack(tick) + records.tobytes())
+
+def decode_entities(payload):
+    tick, = ENTITIES_HEADER.unpack_from(payload)
+    return tick, np.frombuffer(payload, dtype=ENTITY_DTYPE, offset=ENTITIES_HEADER.size)
+
+def encode_remove(ids):
+    return frame(MSG_REMOVE, np.asarray(ids, dtype=ENTITY_ID_DTYPE).tobytes())
+
+def decode_remove(payload):
+    return np.frombuffer(payload, dtype=ENTITY_ID_DTYPE)
+
+def encode_input(sequence, left=False, right=False, jump=False, action=ACTION_NONE, target=(0, 0)):
+    keys = (KEY_LEFT if left else 0) | (KEY_RIGHT if right else 0) | (KEY_JUMP if jump else 0)
+    return frame(MSG_INPUT, INPUT.pack(sequence, keys, action, target[0], target[1]))
+
+def decode_input(payload):
+    if len(payload) != INPUT.size:
+        raise ValueError("Input message of %d bytes, expected %d" % (len(payload), INPUT.size))
+    sequence, keys, action, target_x, target_y = INPUT.unpack(payload)
+    return {
+        'sequence': sequence,
+        'left': bool(keys & KEY_LEFT),
+        'right': bool(keys & KEY_RIGHT),
+        'jump': bool(keys & KEY_JUMP),
+        'action': action,
+        'target': (target_x, target_y),
+    }
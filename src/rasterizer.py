@@ -0,0 +1,98 @@
+import numpy as np
+import pygame
+
+from blocks import COLORS, SOLID, Lookup
+
+class TileRasterizer:
+    """Turn arrays of block ids into RGB pixels in one shot.
+
+    Colours come from a lookup table indexed by block id, upscaled to
+    block_size pixel images with the block outline applied as a mask. A
+    whole array of tiles is then rasterized with one gather, so no per-tile
+    drawing calls are made. Pixel arrays are indexed
+    [x, y, channel] as pygame.surfarray expects.
+    """
+
+    def __init__(self, block_colors=None, block_size=32, outline_color=(0, 0, 0)):
+        self.block_size = block_size
+        self.outline_color = np.array(outline_color, dtype=np.uint8)
+
+        # Lookup table over every possible int8 id (viewed as uint8): the
+        # registry's colours, with block_colors overriding some of them
+        self.colors = COLORS.copy()
+        for block_type, color in (block_colors or {}).items():
+            self.colors[block_type.value & 0xFF] = color
+
+        # Border pixels of a single block
+        edge = np.zeros(block_size, dtype=bool)
+        edge[[0, -1]] = True
+        self.outline = edge[:, np.newaxis] | edge[np.newaxis, :]
+
+        # Pre-rendered image of every block id, outlined if it is solid
+        self.images = np.empty((256, block_size, block_size, 3), dtype=np.uint8)
+        self.images[:] = self.colors[:, np.newaxis, np.newaxis, :]
+        self.images[SOLID[:, np.newaxis, np.newaxis] & self.outline] = self.outline_color
+        self._mapped_images = {}  # Surface pixel format -> Lookup of the images as mapped pixel values
+        # Gathers reusing their arrays while the view keeps its size
+        self._colors = Lookup(self.colors)
+        self._images = Lookup(self.images)
+
+    def colorize(self, tiles):
+        """Colour of each tile, as a [x, y, channel] array overwritten by the next call"""
+        return self._colors(tiles.view(np.uint8).T)
+
+    def rasterize(self, tiles, outlines=True):
+        """Pixels of a [y, x] block id array, block_size pixels per tile"""
+        size = self.block_size
+        width, height = tiles.shape[1], tiles.shape[0]
+        if outlines:
+            # Gather each tile's image, then interleave into (x, px, y, py) order
+            images = self._images(tiles.view(np.uint8).T)
+            pixels = images.transpose(0, 2, 1, 3, 4)
+        else:
+            colors = self.colorize(tiles)[:, np.newaxis, :, np.newaxis, :]
+            pixels = np.broadcast_to(colors, (width, size, height, size, 3))
+        return np.ascontiguousarray(pixels).reshape(width * size, height * size, 3)
+
+    def blit(self, surface, tiles, outlines=True):
+        """Rasterize tiles straight into a surface of matching size"""
+        if outlines and surface.get_bytesize() == 4:
+            # Skip the RGB to pixel conversion by gathering mapped pixel values
+            images = self.mapped_images(surface)(tiles.view(np.uint8).T)
+            pixels = np.ascontiguousarray(images.transpose(0, 2, 1, 3))
+            size = self.block_size
+            pygame.surfarray.blit_array(
+                surface, pixels.reshape(tiles.shape[1] * size, tiles.shape[0] * size))
+        else:
+            pygame.surfarray.blit_array(surface, self.rasterize(tiles, outlines))
+
+    def mapped_images(self, surface):
+        """Lookup of the block images as pixel values in the format of a 32-bit surface"""
+        key = (surface.get_masks(), surface.get_shifts())
+        images = self._mapped_images.get(key)
+        if images is None:
+            channels = self.images.astype(np.uint32)
+            table = np.zeros(self.images.shape[:3], dtype=np.uint32)
+            for channel, shift in enumerate(surface.get_shifts()[:3]):
+                table |= channels[..., channel] << shift
+            images = self._mapped_images[key] = Lookup(table)
+        return images
+
+    def render_view(self, surface, world, camera, outlines=True):
+        """Rasterize the part of the world seen by the camera into surface"""
+        size = self.block_size
+        view_width, view_height = surface.get_size()
+        left, top = int(camera.x), int(camera.y)
+        x0, y0 = left // size, top // size
+        x1 = (left + view_width - 1) // size + 1
+        y1 = (top + view_height - 1) // size + 1
+        pixels = self.rasterize(world.get_region(x0, y0, x1, y1), outlines)
+
+        # Crop to the camera's sub-tile offset
+        offset_x, offset_y = left - x0 * size, top - y0 * size
+        pixels = pixels[offset_x:offset_x + view_width, offset_y:offset_y + view_height]
+        pygame.surfarray.blit_array(surface, pixels)
+
+    def minimap(self, tiles, step=1):
+        """Surface with one pixel per step x step tiles, for a map overview"""
+        return pygame.surfarray.make_surface(self.colorize(tiles[::step, ::step]))
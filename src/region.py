@@ -0,0 +1,259 @@
+import lzma
+import os
+import struct
+import zlib
+
+import numpy as np
+
+import storage
+from chunks import CHUNK_SIZE
+
+# A world saved as regions is a directory holding a world header file and one
+# file per REGION_SIZE x REGION_SIZE group of chunks. Each region file is:
+#   header (magic, version, codec)
+#   table of contents: (offset, length) per chunk slot, length 0 if absent
+#   independently compressed chunk payloads
+REGION_SIZE = 16
+HEADER_NAME = 'world.hdr'
+MAGIC = b'TWRG'
+VERSION = 1
+REGION_HEADER = struct.Struct('<4sHH')
+TOC_DTYPE = np.dtype([('offset', '<u4'), ('length', '<u4')])
+TOC_OFFSET = REGION_HEADER.size
+DATA_OFFSET = TOC_OFFSET + REGION_SIZE * REGION_SIZE * TOC_DTYPE.itemsize
+
+CODECS = {'none': 0, 'zlib': 1, 'lzma': 2, 'rle': 3}
+CODEC_NAMES = {value: name for name, value in CODECS.items()}
+DEFAULT_CODEC = 'zlib'
+
+RLE_LENGTH_DTYPE = np.dtype('<u2')
+
+def rle_encode(blocks):
+    """Run-length encode tiles as all run lengths (uint16) followed by all run values"""
+    flat = blocks.ravel()
+    starts = np.concatenate(([0], np.flatnonzero(flat[1:] != flat[:-1]) + 1))
+    lengths = np.diff(np.append(starts, flat.size)).astype(RLE_LENGTH_DTYPE)
+    return lengths.tobytes() + flat[starts].tobytes()
+
+def rle_decode(data):
+    runs = len(data) // (RLE_LENGTH_DTYPE.itemsize + 1)
+    lengths = np.frombuffer(data, dtype=RLE_LENGTH_DTYPE, count=runs)
+    values = np.frombuffer(data, dtype=np.int8, offset=runs * RLE_LENGTH_DTYPE.itemsize)
+    return np.repeat(values, lengths)
+
+def compress_chunk(blocks, codec):
+    if codec == 'none':
+        return blocks.tobytes()
+    if codec == 'zlib':
+        return zlib.compress(blocks.tobytes(), 6)
+    if codec == 'lzma':
+        return lzma.compress(blocks.tobytes())
+    if codec == 'rle':
+        return rle_encode(blocks)
+    raise ValueError("Unknown codec %r" % codec)
+
+def decompress_chunk(data, codec):
+    """Decompress a chunk payload into a writable (CHUNK_SIZE, CHUNK_SIZE) array"""
+    if codec == 'rle':
+        tiles = rle_decode(data)
+    else:
+        if codec == 'zlib':
+            data = zlib.decompress(data)
+        elif codec == 'lzma':
+            data = lzma.decompress(data)
+        elif codec != 'none':
+            raise ValueError("Unknown codec %r" % codec)
+        tiles = np.frombuffer(bytearray(data), dtype=np.int8)
+    return tiles.reshape(CHUNK_SIZE, CHUNK_SIZE)
+
+def region_of(cx, cy):
+    """Region coordinates containing chunk (cx, cy)"""
+    return cx // REGION_SIZE, cy // REGION_SIZE
+
+def _slot(cx, cy):
+    return (cy % REGION_SIZE) * REGION_SIZE + cx % REGION_SIZE
+
+class RegionStore:
+    """Read access to the chunks of a region directory.
+
+    Only the table of contents of a region is read to locate a chunk, so a
+    single chunk can be loaded without decompressing the rest of its region.
+    Offers the same read interface as storage.SavedChunks.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._tocs = {}  # (rx, ry) -> (codec, toc) or None when the file is missing
+
+    def region_path(self, rx, ry):
+        return os.path.join(self.directory, 'r.%d.%d.twr' % (rx, ry))
+
+    def region_keys(self):
+        """Coordinates of every region file in the directory"""
+        keys = []
+        for name in os.listdir(self.directory):
+            parts = name.split('.')
+            if len(parts) == 4 and parts[0] == 'r' and parts[3] == 'twr':
+                keys.append((int(parts[1]), int(parts[2])))
+        return keys
+
+    def codec(self):
+        """Codec the region files are written with, None if there are none"""
+        for rx, ry in self.region_keys():
+            return self._toc(rx, ry)[0]
+        return None
+
+    def _toc(self, rx, ry):
+        if (rx, ry) not in self._tocs:
+            path = self.region_path(rx, ry)
+            if not os.path.exists(path):
+                self._tocs[(rx, ry)] = None
+            else:
+                with open(path, 'rb') as f:
+                    magic, version, codec = REGION_HEADER.unpack(f.read(REGION_HEADER.size))
+                    if magic != MAGIC or version != VERSION:
+                        raise ValueError("Not a region file: %s" % path)
+                    toc = np.frombuffer(f.read(DATA_OFFSET - TOC_OFFSET), dtype=TOC_DTYPE)
+                self._tocs[(rx, ry)] = (CODEC_NAMES[codec], toc)
+        return self._tocs[(rx, ry)]
+
+    def _entry(self, key):
+        region = self._toc(*region_of(*key))
+        if region is None:
+            return None
+        codec, toc = region
+        offset, length = toc[_slot(*key)]
+        if length == 0:
+            return None
+        return codec, int(offset), int(length)
+
+    def __contains__(self, key):
+        return self._entry(key) is not None
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        keys = []
+        for rx, ry in self.region_keys():
+            codec, toc = self._toc(rx, ry)
+            for slot in np.flatnonzero(toc['length']):
+                keys.append((rx * REGION_SIZE + int(slot) % REGION_SIZE,
+                             ry * REGION_SIZE + int(slot) // REGION_SIZE))
+        return keys
+
+    def read_raw(self, key):
+        """Read the compressed payload of a chunk and the codec it uses"""
+        codec, offset, length = self._entry(key)
+        with open(self.region_path(*region_of(*key)), 'rb') as f:
+            f.seek(offset)
+            return codec, f.read(length)
+
+    def read(self, key):
+        """Read a writable copy of a saved chunk's blocks"""
+        codec, data = self.read_raw(key)
+        return decompress_chunk(data, codec)
+
+def write_region(path, codec, payloads):
+    """Write a region file from a dict of chunk key -> compressed payload"""
+    toc = np.zeros(REGION_SIZE * REGION_SIZE, dtype=TOC_DTYPE)
+    offset = DATA_OFFSET
+    ordered = sorted(payloads.items(), key=lambda item: _slot(*item[0]))
+    for key, data in ordered:
+        toc[_slot(*key)] = (offset, len(data))
+        offset += len(data)
+
+    def write(f):
+        f.write(REGION_HEADER.pack(MAGIC, VERSION, CODECS[codec]))
+        f.write(toc.tobytes())
+        for key, data in ordered:
+            f.write(data)
+    storage.replace_file(path, write)
+
+def _dense_chunk(world, cx, cy):
+    """Copy of a chunk of a dense world, padded with air past the world edge"""
+    blocks = np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=np.int8)
+    region = world.blocks[storage.chunk_rect(world, cx, cy)]
+    blocks[:region.shape[0], :region.shape[1]] = region
+    return blocks
+
+def save_world(world, directory, codec=DEFAULT_CODEC):
+    """Save a world as a directory of compressed region files.
+
+    Saving again to the same directory only rewrites the regions holding
+    chunks changed since the last save, copying the other chunks' payloads
+    without recompressing them.
+    """
+    if codec not in CODECS:
+        raise ValueError("Unknown codec %r" % codec)
+    os.makedirs(directory, exist_ok=True)
+    header_path = os.path.join(directory, HEADER_NAME)
+    layout = storage.LAYOUT_CHUNKED if world.chunked else storage.LAYOUT_DENSE
+
+    previous = None
+    if world.save_path is not None and os.path.abspath(world.save_path) == os.path.abspath(directory):
+        previous = world.saved_chunks if world.chunked else RegionStore(directory)
+    if previous is not None:
+        if not os.path.exists(header_path):
+            previous = None
+        else:
+            header = storage.read_header(header_path)
+            if (header.layout, header.width, header.height, header.seed) != \
+                    (layout, world.width, world.height, world.seed):
+                previous = None
+
+    # Chunks that need storing: all of a dense world, or those that differ
+    # from the generated terrain for a chunked one
+    if world.chunked:
+        keys = set(world.dirty_chunks)
+        if world.saved_chunks is not None:
+            keys.update(world.saved_chunks.keys())
+    else:
+        keys = {(cx, cy)
+                for cy in range(-(-world.height // CHUNK_SIZE))
+                for cx in range(-(-world.width // CHUNK_SIZE))}
+
+    regions = {}
+    for key in keys:
+        regions.setdefault(region_of(*key), []).append(key)
+
+    if previous is None:
+        # Drop region files left over from whatever was saved here before
+        for rx, ry in RegionStore(directory).region_keys():
+            if (rx, ry) not in regions:
+                os.remove(os.path.join(directory, 'r.%d.%d.twr' % (rx, ry)))
+
+    for (rx, ry), region_keys in regions.items():
+        if previous is not None and not any(key in world.dirty_chunks for key in region_keys):
+            continue
+        payloads = {}
+        for key in region_keys:
+            if previous is not None and key not in world.dirty_chunks and key in previous:
+                old_codec, data = previous.read_raw(key)
+                if old_codec == codec:
+                    payloads[key] = data
+                    continue
+            if world.chunked:
+                if key in world.dirty_chunks or key in world.chunks:
+                    blocks = world.get_chunk(*key).blocks
+                else:
+                    blocks = world.saved_chunks.read(key)
+            else:
+                blocks = _dense_chunk(world, *key)
+            payloads[key] = compress_chunk(blocks, codec)
+        write_region(os.path.join(directory, 'r.%d.%d.twr' % (rx, ry)), codec, payloads)
+
+    with open(header_path, 'wb') as f:
+        f.write(storage.WorldHeader(layout, world.width, world.height, world.seed).pack())
+
+def read_world_header(directory):
+    return storage.read_header(os.path.join(directory, HEADER_NAME))
+
+def load_dense(store, width, height):
+    """Read every chunk of a dense world saved as regions into one array"""
+    blocks = np.zeros((height, width), dtype=np.int8)
+    for cx, cy in store.keys():
+        x0, y0 = cx * CHUNK_SIZE, cy * CHUNK_SIZE
+        target = blocks[y0:y0 + CHUNK_SIZE, x0:x0 + CHUNK_SIZE]
+        target[:] = store.read((cx, cy))[:target.shape[0], :target.shape[1]]
+    return blocks
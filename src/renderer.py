@@ -0,0 +1,114 @@
+from collections import OrderedDict
+
+import numpy as np
+import pygame
+
+from rasterizer import TileRasterizer
+
+# Blocks per side of each cached surface
+SURFACE_TILES = 16
+
+class ChunkRenderer:
+    """Draw the world from cached, pre-rendered surfaces.
+
+    The world is split into SURFACE_TILES x SURFACE_TILES block sections.
+    Each section is drawn once to an off-screen surface, and a frame only
+    blits the handful of sections that overlap the view, so its cost no
+    longer depends on the number of visible tiles. A section is redrawn,
+    in place, only after one of its blocks changes; changes are read from
+    the world's change journal at the start of each frame.
+    """
+
+    def __init__(self, world, block_colors=None, block_size=32, max_surfaces=64):
+        self.world = world
+        self.block_colors = block_colors
+        self.block_size = block_size
+        self.rasterizer = TileRasterizer(block_colors, block_size)
+        self.max_surfaces = max_surfaces
+        self.surfaces = OrderedDict()  # (sx, sy) -> Surface, least recently used first
+        self.stale = set()  # Sections whose blocks changed since they were drawn
+        self.builds = 0
+        self.cursor = world.journal.cursor  # Journal position read up to
+
+    def sync(self):
+        """Mark the sections holding blocks changed since the last sync as stale"""
+        changes = self.world.changes_since(self.cursor)
+        self.cursor = self.world.journal.cursor
+        if changes is None:
+            # Too far behind the journal to know what changed
+            self.stale.update(self.surfaces)
+            return
+        if len(changes) == 0:
+            return
+        sections = np.stack((changes['x'] // SURFACE_TILES, changes['y'] // SURFACE_TILES), axis=1)
+        for key in map(tuple, np.unique(sections, axis=0).tolist()):
+            if key in self.surfaces:
+                self.stale.add(key)
+
+    def clear(self):
+        self.surfaces.clear()
+        self.stale.clear()
+
+    def get_surface(self, sx, sy):
+        """Get the surface for section (sx, sy), drawing it if needed"""
+        key = (sx, sy)
+        surface = self.surfaces.get(key)
+        if surface is None:
+            # Recycle the least recently used surface once the cache is full
+            recycled = None
+            if len(self.surfaces) >= self.max_surfaces:
+                old_key, recycled = self.surfaces.popitem(last=False)
+                self.stale.discard(old_key)
+            surface = self.build_surface(sx, sy, recycled)
+            self.surfaces[key] = surface
+        else:
+            if key in self.stale:
+                self.stale.discard(key)
+                self.build_surface(sx, sy, surface)
+            self.surfaces.move_to_end(key)
+        return surface
+
+    def build_surface(self, sx, sy, surface=None):
+        """Draw section (sx, sy), into surface if given, else a new surface"""
+        if surface is None:
+            size = SURFACE_TILES * self.block_size
+            surface = pygame.Surface((size, size))
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()  # Match the display format for fast blits
+
+        # Air tiles take the background colour, so sections can be blitted opaque
+        x0 = sx * SURFACE_TILES
+        y0 = sy * SURFACE_TILES
+        tiles = self.world.get_region(x0, y0, x0 + SURFACE_TILES, y0 + SURFACE_TILES)
+        self.rasterizer.blit(surface, tiles)
+        self.builds += 1
+        return surface
+
+    def visible_sections(self, camera, view_size):
+        """Range of section coordinates overlapping the view"""
+        section_size = SURFACE_TILES * self.block_size
+        start_x = int(camera.x) // section_size
+        end_x = (int(camera.x) + view_size[0] - 1) // section_size
+        start_y = int(camera.y) // section_size
+        end_y = (int(camera.y) + view_size[1] - 1) // section_size
+
+        # Skip sections entirely outside a bounded world
+        if self.world.width is not None:
+            start_x = max(start_x, 0)
+            end_x = min(end_x, (self.world.width - 1) // SURFACE_TILES)
+        if self.world.height is not None:
+            start_y = max(start_y, 0)
+            end_y = min(end_y, (self.world.height - 1) // SURFACE_TILES)
+        return range(start_x, end_x + 1), range(start_y, end_y + 1)
+
+    def render(self, screen, camera):
+        """Blit the cached sections overlapping the camera view; returns how many"""
+        section_size = SURFACE_TILES * self.block_size
+        self.sync()
+        columns, rows = self.visible_sections(camera, screen.get_size())
+        for sy in rows:
+            for sx in columns:
+                screen.blit(self.get_surface(sx, sy),
+                            (sx * section_size - int(camera.x),
+                             sy * section_size - int(camera.y)))
+        return len(columns) * len(rows)
@@ -0,0 +1,294 @@
+"""Recording and replaying the input of a game session.
+
+A Recorder attached to a Game writes, tick by tick, the keys held, the
+mouse buttons and the world-space point under the mouse, plus the torch
+and pour actions, to a compact binary stream along with the world's
+seed. Every CHECKPOINT_INTERVAL ticks it also writes a hash of the game
+state. replay() rebuilds the world from the seed, feeds the recorded
+input back to a headless Game as fast as it will go and compares the
+state hashes, reporting the first tick where the replay went its own
+way. Replays of real sessions also make realistic benchmark workloads.
+
+The mouse is recorded in world space, so a replay targets the same
+blocks even if its camera ends up somewhere else. The world is rebuilt
+from its seed, so only sessions started in a freshly generated world
+can be recorded.
+
+Stream layout, little-endian:
+    header: MAGIC, version, width, height (-1 if unbounded), chunked, seed,
+            checkpoint interval
+    records, each starting with its type byte:
+        INPUT:      ticks (uint16), flags (uint8), then the mouse target
+                    (2 float64) if a mouse button is down; the same input
+                    held for that many ticks
+        ACTION:     action (uint8), target (2 float64); applied at the
+                    start of the next tick
+        CHECKPOINT: tick (uint64), state hash (16 bytes), after that tick
+
+Usage: python src/replay.py session.rpl [--profile trace.csv]
+"""
+import argparse
+import hashlib
+import os
+import struct
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import numpy as np
+from pygame.locals import K_a, K_d, K_SPACE
+
+from game import Game, Camera
+
+MAGIC = b'TRPL'
+VERSION = 1
+HEADER = struct.Struct('<4sHqq?QI')
+RECORD_TYPE = struct.Struct('<B')
+INPUT = struct.Struct('<HB')
+TARGET = struct.Struct('<dd')
+ACTION = struct.Struct('<B')
+CHECKPOINT = struct.Struct('<Q16s')
+
+INPUT_RECORD = 1
+ACTION_RECORD = 2
+CHECKPOINT_RECORD = 3
+
+CHECKPOINT_INTERVAL = 60
+
+# Bits of the input flags
+LEFT = 1
+RIGHT = 2
+JUMP = 4
+BUTTONS = (8, 16, 32)  # Left, middle and right mouse buttons
+ANY_BUTTON = 8 | 16 | 32
+
+def state_hash(game):
+    """16-byte hash of everything a tick can change"""
+    digest = hashlib.blake2b(digest_size=16)
+    player = game.player
+    digest.update(struct.pack('<dddd?q', player.x, player.y, player.velocity_x,
+                              player.velocity_y, player.on_ground, game.world.tick))
+    world = game.world
+    if world.chunked:
+        # Resident chunks depend on the prefetcher's timing, so hash the
+        # blocks around the player instead of all of them
+        x, y = (int(value) // 32 for value in player.center_position)
+        digest.update(np.ascontiguousarray(world.get_region(x - 64, y - 64, x + 64, y + 64)))
+    else:
+        digest.update(np.ascontiguousarray(world.blocks))
+    if game.liquids is not None:
+        digest.update(game.liquids.level)
+        digest.update(game.liquids.kind)
+    if game.lighting is not None:
+        digest.update(repr(sorted(game.lighting.sources.items())).encode())
+    return digest.digest()
+
+class ReplayMouse:
+    """Mouse state for one tick; the position is in world space"""
+    def __init__(self, buttons, pos):
+        self.buttons = buttons
+        self.pos = pos
+
+    def get_pressed(self):
+        return self.buttons
+
+    def get_pos(self):
+        return self.pos
+
+class Recorder:
+    def __init__(self, game, path, checkpoint_interval=CHECKPOINT_INTERVAL):
+        """Record the input of game from now on into the file at path"""
+        world = game.world
+        if world.save_path is not None or world.tick != 0:
+            raise ValueError("Recording needs a freshly generated world")
+        self.game = game
+        self.file = open(path, 'wb')
+        self.checkpoint_interval = checkpoint_interval
+        self.file.write(HEADER.pack(MAGIC, VERSION,
+                                    -1 if world.width is None else world.width,
+                                    -1 if world.height is None else world.height,
+                                    world.chunked, world.seed, checkpoint_interval))
+        self.run = None  # (flags, target) of the input being held
+        self.run_ticks = 0
+        self.ticks = 0
+        game.recorder = self
+
+    def record_action(self, action, world_x, world_y):
+        self._flush_run()
+        self.file.write(RECORD_TYPE.pack(ACTION_RECORD) + ACTION.pack(action)
+                        + TARGET.pack(world_x, world_y))
+
+    def record_input(self, keys, buttons, target):
+        """Record one tick's keys, mouse buttons and world-space mouse target"""
+        flags = (LEFT if keys[K_a] else 0) | (RIGHT if keys[K_d] else 0) | (JUMP if keys[K_SPACE] else 0)
+        for bit, pressed in zip(BUTTONS, buttons):
+            if pressed:
+                flags |= bit
+        # The target only matters while a button is down
+        run = (flags, tuple(target) if flags & ANY_BUTTON else None)
+        if run != self.run or self.run_ticks == 0xFFFF:
+            self._flush_run()
+            self.run = run
+        self.run_ticks += 1
+
+    def end_tick(self):
+        self.ticks += 1
+        if self.ticks % self.checkpoint_interval == 0:
+            self._flush_run()
+            self.file.write(RECORD_TYPE.pack(CHECKPOINT_RECORD)
+                            + CHECKPOINT.pack(self.ticks, state_hash(self.game)))
+
+    def _flush_run(self):
+        if self.run_ticks == 0:
+            return
+        flags, target = self.run
+        record = RECORD_TYPE.pack(INPUT_RECORD) + INPUT.pack(self.run_ticks, flags)
+        if target is not None:
+            record += TARGET.pack(*target)
+        self.file.write(record)
+        self.run_ticks = 0
+
+    def close(self):
+        self._flush_run()
+        self.file.close()
+        if self.game.recorder is self:
+            self.game.recorder = None
+
+def read_replay(path):
+    """Header values and the list of records of a replay file.
+
+    Records are (INPUT_RECORD, ticks, flags, target),
+    (ACTION_RECORD, action, target) and (CHECKPOINT_RECORD, tick, hash).
+    """
+    with open(path, 'rb') as file:
+        data = file.read()
+    if len(data) < HEADER.size:
+        raise ValueError("Not a replay file: %s" % path)
+    magic, version, width, height, chunked, seed, interval = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a replay file: %s" % path)
+    header = {
+        'width': None if width < 0 else width,
+        'height': None if height < 0 else height,
+        'chunked': chunked,
+        'seed': seed,
+        'checkpoint_interval': interval,
+    }
+
+    records = []
+    offset = HEADER.size
+    while offset < len(data):
+        record_type = data[offset]
+        offset += 1
+        if record_type == INPUT_RECORD:
+            ticks, flags = INPUT.unpack_from(data, offset)
+            offset += INPUT.size
+            target = None
+            if flags & ANY_BUTTON:
+                target = TARGET.unpack_from(data, offset)
+                offset += TARGET.size
+            records.append((INPUT_RECORD, ticks, flags, target))
+        elif record_type == ACTION_RECORD:
+            action, = ACTION.unpack_from(data, offset)
+            target = TARGET.unpack_from(data, offset + ACTION.size)
+            offset += ACTION.size + TARGET.size
+            records.append((ACTION_RECORD, action, target))
+        elif record_type == CHECKPOINT_RECORD:
+            tick, expected = CHECKPOINT.unpack_from(data, offset)
+            offset += CHECKPOINT.size
+            records.append((CHECKPOINT_RECORD, tick, expected))
+        else:
+            raise ValueError("Corrupt replay file: record type %d at byte %d" % (record_type, offset - 1))
+    return header, records
+
+def replay(path, profile=False, stop_on_divergence=True):
+    """Replay a recording headlessly as fast as possible.
+
+    Returns the ticks replayed, timing, checkpoints checked and the tick
+    of the first checkpoint whose state differed (None if all matched),
+    and the Game the replay ran in. Stops at the first difference unless
+    stop_on_divergence is False.
+    """
+    header, records = read_replay(path)
+    game = Game(headless=True, chunked=header['chunked'], seed=header['seed'], profile=profile)
+    if (game.world.width, game.world.height) != (header['width'], header['height']):
+        raise ValueError("Recorded in a %sx%s world, replays make %sx%s" % (
+            header['width'], header['height'], game.world.width, game.world.height))
+
+    # The mouse position is already in world space, so the player sees it
+    # through a camera at the origin
+    origin = Camera(*game.WINDOW_SIZE)
+    keys = {K_a: False, K_d: False, K_SPACE: False}
+    mouse = ReplayMouse((0, 0, 0), (0, 0))
+    game.input_source = lambda: (keys, mouse, origin)
+
+    ticks = 0
+    checkpoints = 0
+    diverged_at = None
+    start = time.perf_counter()
+    for record in records:
+        if record[0] == INPUT_RECORD:
+            _, count, flags, target = record
+            keys[K_a] = bool(flags & LEFT)
+            keys[K_d] = bool(flags & RIGHT)
+            keys[K_SPACE] = bool(flags & JUMP)
+            mouse.buttons = tuple(int(bool(flags & bit)) for bit in BUTTONS)
+            mouse.pos = target if target is not None else (0, 0)
+            for _ in range(count):
+                game.update()
+                game.profiler.end_frame()
+            ticks += count
+        elif record[0] == ACTION_RECORD:
+            _, action, (world_x, world_y) = record
+            game.actions.append((action, world_x, world_y))
+        else:
+            _, tick, expected = record
+            checkpoints += 1
+            if state_hash(game) != expected and diverged_at is None:
+                diverged_at = tick
+                if stop_on_divergence:
+                    break
+    seconds = time.perf_counter() - start
+    if game.prefetcher is not None:
+        game.prefetcher.close()
+
+    return {
+        'seed': header['seed'],
+        'ticks': ticks,
+        'seconds': seconds,
+        'ticks_per_second': ticks / seconds if seconds > 0 else float('inf'),
+        'checkpoints': checkpoints,
+        'diverged_at': diverged_at,
+        'game': game,
+    }
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Replay a recorded session")
+    parser.add_argument('path', help="replay file written by game.py --record")
+    parser.add_argument('--profile', metavar='TRACE', nargs='?', const='',
+                        help="profile the replay, writing a .csv or .json trace if given")
+    parser.add_argument('--keep-going', action='store_true',
+                        help="replay to the end even after the state diverges")
+    return parser.parse_args(argv)
+
+def main(argv):
+    args = parse_args(argv)
+    result = replay(args.path, profile=args.profile is not None,
+                    stop_on_divergence=not args.keep_going)
+    print("%d ticks in %.2f s (%.0f ticks/s), %d checkpoints" % (
+        result['ticks'], result['seconds'], result['ticks_per_second'], result['checkpoints']))
+    profiler = result['game'].profiler
+    if args.profile is not None:
+        for name, stats in profiler.summary().items():
+            print("  %-16s p50 %8.3f  p95 %8.3f  p99 %8.3f" % (name, stats['p50'], stats['p95'], stats['p99']))
+        if args.profile:
+            profiler.export(args.profile)
+    if result['diverged_at'] is not None:
+        print("Diverged from the recording by tick %d" % result['diverged_at'])
+        return 1
+    print("Matched the recording")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,232 @@
+"""Authoritative multiplayer server.
+
+The server owns the World and a Player per connected client. Clients only
+send input; every tick the server applies the latest input of each
+client, steps the players and sends each client what changed within its
+area of interest (see interest.py): chunks that have just come into
+view, the block changes to chunks it already holds (read from the
+world's change journal) and the nearby players that moved. Messages are
+defined in protocol.py.
+
+Usage: python src/server.py [--port 5555] [--width 400] [--height 200]
+"""
+import argparse
+import asyncio
+import time
+
+import numpy as np
+
+import protocol
+from chunks import CHUNK_SIZE
+from game import Camera
+from interest import InterestManager
+from player import Player
+from simulate import ScriptedMouse, make_keys
+from timestep import FixedTimestep
+from world import World
+
+class ClientState:
+    """What the server knows about one connected client"""
+    def __init__(self, client_id, player, writer):
+        self.id = client_id
+        self.player = player
+        self.writer = writer
+        self.input = None  # Latest decoded input, held until the next one arrives
+        self.camera = None  # View the client's area of interest follows
+        self.entities = {}  # Player id -> position last sent to the client
+        self.bytes_sent = 0
+
+class GameServer:
+    def __init__(self, world, tick_rate=60, view_size=(800, 600), margin=1):
+        """Serve world to clients.
+
+        Each client's camera, view_size pixels and centered on its player,
+        plus margin chunks around it is its area of interest: it receives
+        the chunks and the players inside that area and nothing else.
+        """
+        self.world = world
+        self.tick_rate = tick_rate
+        self.view_size = view_size
+        self.interest = InterestManager(world, view_size, margin)
+        self.clients = {}
+        self.next_id = 0
+        self.tick = 0
+        self.cursor = world.journal.cursor  # Journal position already sent
+        self.tick_times = []  # Seconds spent in each step
+        self.server = None
+        self.port = None
+        self.connections = set()  # Tasks handling the open connections
+        # Input targets arrive in world coordinates, so the camera is the origin
+        self.origin = Camera(0, 0)
+
+    async def start(self, host='127.0.0.1', port=0):
+        """Start listening; with port 0 a free port is picked, see self.port"""
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        # Closing the connections ends their handlers at end of stream
+        for client in list(self.clients.values()):
+            client.writer.close()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+
+    async def handle_connection(self, reader, writer):
+        task = asyncio.current_task()
+        self.connections.add(task)
+        client = self.add_client(writer)
+        try:
+            self.send(client, protocol.encode_hello(
+                client.id, self.world.width, self.world.height, self.world.seed,
+                self.tick_rate, CHUNK_SIZE))
+            while True:
+                message = await protocol.read_message(reader)
+                if message is None:
+                    break
+                message_type, payload = message
+                if message_type == protocol.MSG_INPUT:
+                    client.input = protocol.decode_input(payload)
+        except ConnectionError:
+            pass
+        except ValueError:
+            # A malformed message drops the client that sent it
+            pass
+        finally:
+            self.remove_client(client)
+            self.connections.discard(task)
+            writer.close()
+
+    def add_client(self, writer):
+        # Spawn in the middle of the world, like Game
+        spawn_x = (self.world.width * 32) // 2 if self.world.width is not None else 0
+        client = ClientState(self.next_id, Player(self.world, spawn_x, 0), writer)
+        client.camera = Camera(*self.view_size)
+        self.next_id += 1
+        self.clients[client.id] = client
+        return client
+
+    def remove_client(self, client):
+        # Other clients are told to remove its player on the next tick
+        self.clients.pop(client.id, None)
+        self.interest.remove(client.id)
+
+    def send(self, client, data):
+        client.writer.write(data)
+        client.bytes_sent += len(data)
+
+    async def flush(self):
+        """Wait for the data queued for every client to be sent"""
+        for client in list(self.clients.values()):
+            try:
+                await client.writer.drain()
+            except ConnectionError:
+                self.remove_client(client)
+
+    def apply_input(self, client):
+        message = client.input
+        if message is None:
+            return
+        keys = make_keys(message['left'], message['right'], message['jump'])
+        buttons = (0, 0, 0)
+        if message['action'] == protocol.ACTION_BREAK:
+            buttons = (1, 0, 0)
+        elif message['action'] == protocol.ACTION_PLACE:
+            buttons = (0, 0, 1)
+        # Aim at the center of the target block
+        target_x, target_y = message['target']
+        mouse = ScriptedMouse(buttons, (target_x * 32 + 16, target_y * 32 + 16))
+        client.player.handle_input(keys, mouse, self.origin)
+
+    def step(self):
+        """Advance the simulation one tick and queue each client's update"""
+        start = time.perf_counter()
+        for client in self.clients.values():
+            self.apply_input(client)
+            client.player.move()
+        self.world.tick += 1
+        self.tick += 1
+        self.broadcast()
+        self.tick_times.append(time.perf_counter() - start)
+
+    def broadcast(self):
+        changes = self.world.changes_since(self.cursor)
+        self.cursor = self.world.journal.cursor
+        if changes is None:
+            # Fell behind the journal: empty every area so all chunks are resent
+            for client in self.clients.values():
+                self.interest.remove(client.id)
+            changes = self.world.changes_since(self.cursor)
+
+        # Block changes go to the clients holding their chunks, routed before
+        # the areas move so newly sent chunks do not get them twice
+        routed = self.interest.route(changes['x'], changes['y'])
+        for client_id, selected in routed.items():
+            self.send(self.clients[client_id], protocol.encode_blocks(
+                changes['x'][selected], changes['y'][selected], changes['new'][selected]))
+
+        positions = {}
+        for client in self.clients.values():
+            player = client.player
+            positions[client.id] = (round(player.x), round(player.y))
+            client.camera.follow(*player.center_position)
+        buckets = self.interest.bucket({key: self.clients[key].player.center_position
+                                        for key in positions})
+
+        for client in self.clients.values():
+            # Stream chunks in and out as the view moves
+            entered, left = self.interest.update(client.id, client.camera.x, client.camera.y)
+            for cx, cy in sorted(entered):
+                blocks = self.world.get_region(cx * CHUNK_SIZE, cy * CHUNK_SIZE,
+                                               (cx + 1) * CHUNK_SIZE, (cy + 1) * CHUNK_SIZE)
+                self.send(client, protocol.encode_chunk(cx, cy, blocks))
+            for key in sorted(left):
+                self.send(client, protocol.encode_unload(*key))
+
+            # Nearby players whose position changed since last sent
+            visible = {key: positions[key] for key in self.interest.nearby(client.id, buckets)}
+            moved = [(key, x, y) for key, (x, y) in visible.items()
+                     if client.entities.get(key) != (x, y)]
+            gone = [key for key in client.entities if key not in visible]
+            if gone:
+                self.send(client, protocol.encode_remove(gone))
+            client.entities = visible
+            # Always sent, last, so it also marks the end of the tick's update
+            self.send(client, protocol.encode_entities(
+                self.tick, np.array(moved, dtype=protocol.ENTITY_DTYPE)))
+
+    async def run(self, ticks=None):
+        """Step at the tick rate until ticks have passed (forever if None)"""
+        timestep = FixedTimestep(self.tick_rate)
+        done = 0
+        while ticks is None or done < ticks:
+            for _ in range(timestep.advance()):
+                self.step()
+                done += 1
+            await self.flush()
+            await asyncio.sleep(max(timestep.dt - timestep.accumulator, 0))
+
+async def serve(world, host, port, tick_rate):
+    server = GameServer(world, tick_rate)
+    await server.start(host, port)
+    print("Serving on %s:%d" % (host, server.port))
+    try:
+        await server.run()
+    finally:
+        await server.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a multiplayer server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--width', type=int, default=400)
+    parser.add_argument('--height', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--tick-rate', type=int, default=60)
+    args = parser.parse_args()
+    world = World(args.width, args.height, seed=args.seed)
+    asyncio.run(serve(world, args.host, args.port, args.tick_rate))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Headless batch simulation of scripted play-throughs.
+
+Each simulation is a World plus a Player driven by a scripted input
+source, stepped without pygame display. run_batch fans independent
+simulations out over a process pool and reports ticks per second.
+
+Usage: python src/simulate.py --count 16 --ticks 5000 --workers 4
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from pygame.locals import K_a, K_d, K_SPACE
+
+from game import Camera
+from player import Player
+from world import World
+
+class ScriptedMouse:
+    """Mouse state for one tick, in screen coordinates"""
+    def __init__(self, buttons=(0, 0, 0), pos=(0, 0)):
+        self.buttons = buttons
+        self.pos = pos
+
+    def get_pressed(self):
+        return self.buttons
+
+    def get_pos(self):
+        return self.pos
+
+def make_keys(left=False, right=False, jump=False):
+    return {K_a: left, K_d: right, K_SPACE: jump}
+
+class IdleScript:
+    """Press nothing"""
+    def __call__(self, simulation):
+        return make_keys(), ScriptedMouse()
+
+class WalkScript:
+    """Walk right, jumping once a second"""
+    def __call__(self, simulation):
+        return make_keys(right=True, jump=simulation.tick % 60 == 0), ScriptedMouse()
+
+class RandomScript:
+    """Change direction at random and dig or build near the player"""
+    def __init__(self):
+        self.keys = make_keys()
+
+    def __call__(self, simulation):
+        rng = simulation.rng
+        if simulation.tick % 30 == 0:
+            direction = rng.integers(3)
+            self.keys = make_keys(left=direction == 1, right=direction == 2)
+        keys = dict(self.keys)
+        keys[K_SPACE] = bool(rng.random() < 0.05)
+
+        buttons = (0, 0, 0)
+        pos = (0, 0)
+        if rng.random() < 0.1:
+            # Click somewhere within a few blocks of the player
+            center_x, center_y = simulation.player.center_position
+            offset_x, offset_y = rng.integers(-96, 97, size=2)
+            pos = (int(center_x + offset_x - simulation.camera.x),
+                   int(center_y + offset_y - simulation.camera.y))
+            buttons = (1, 0, 0) if rng.random() < 0.5 else (0, 0, 1)
+        return keys, ScriptedMouse(buttons, pos)
+
+SCRIPTS = {
+    'idle': IdleScript,
+    'walk': WalkScript,
+    'random': RandomScript,
+}
+
+class Simulation:
+    def __init__(self, seed, width=100, height=100, script='random'):
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.world = World(width, height, seed=seed)
+        self.camera = Camera(800, 600)
+        # Spawn in the middle of the world, like Game
+        self.player = Player(self.world, (width * 32) // 2, 0)
+        self.script = SCRIPTS[script]()
+        self.tick = 0
+
+    def step(self):
+        """Feed one tick of scripted input and advance the physics"""
+        keys, mouse = self.script(self)
+        self.player.handle_input(keys, mouse, self.camera)
+        self.player.move()
+        self.camera.follow(*self.player.center_position)
+        self.tick += 1
+        self.world.tick = self.tick
+
+    def run(self, ticks):
+        for _ in range(ticks):
+            self.step()
+
+    def state(self):
+        return {
+            'seed': self.seed,
+            'ticks': self.tick,
+            'player': (self.player.x, self.player.y,
+                       self.player.velocity_x, self.player.velocity_y),
+        }
+
+def run_simulation(seed, ticks, width=100, height=100, script='random'):
+    """Run one simulation to completion and time it"""
+    simulation = Simulation(seed, width, height, script)
+    start = time.perf_counter()
+    simulation.run(ticks)
+    seconds = time.perf_counter() - start
+    result = simulation.state()
+    result['seconds'] = seconds
+    result['ticks_per_second'] = ticks / seconds if seconds > 0 else float('inf')
+    result['worker'] = os.getpid()
+    return result
+
+def run_batch(count, ticks, workers=None, width=100, height=100, script='random', base_seed=0):
+    """Run count independent simulations over a process pool.
+
+    Returns the per-simulation results, ticks per second for each worker
+    process and the aggregate ticks per second over the wall-clock time.
+    """
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(run_simulation, base_seed + i, ticks, width, height, script)
+                   for i in range(count)]
+        results = [future.result() for future in futures]
+    wall_seconds = time.perf_counter() - start
+
+    per_worker = {}
+    for result in results:
+        worker = per_worker.setdefault(result['worker'], {'ticks': 0, 'seconds': 0.0})
+        worker['ticks'] += result['ticks']
+        worker['seconds'] += result['seconds']
+    for worker in per_worker.values():
+        worker['ticks_per_second'] = worker['ticks'] / worker['seconds'] if worker['seconds'] > 0 else float('inf')
+
+    return {
+        'results': results,
+        'workers': per_worker,
+        'wall_seconds': wall_seconds,
+        'ticks_per_second': count * ticks / wall_seconds,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Run headless simulations in parallel")
+    parser.add_argument('--count', type=int, default=8, help="number of simulations")
+    parser.add_argument('--ticks', type=int, default=3600, help="ticks per simulation")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--width', type=int, default=100)
+    parser.add_argument('--height', type=int, default=100)
+    parser.add_argument('--script', choices=sorted(SCRIPTS), default='random')
+    parser.add_argument('--seed', type=int, default=0, help="seed of the first simulation")
+    args = parser.parse_args()
+
+    batch = run_batch(args.count, args.ticks, args.workers, args.width, args.height,
+                      args.script, args.seed)
+    for pid, worker in sorted(batch['workers'].items()):
+        print("worker %d: %d ticks, %.0f ticks/s" % (pid, worker['ticks'], worker['ticks_per_second']))
+    print("aggregate: %d simulations x %d ticks in %.2fs, %.0f ticks/s" % (
+        args.count, args.ticks, batch['wall_seconds'], batch['ticks_per_second']))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import os
+import struct
+
+import numpy as np
+
+from chunks import CHUNK_SIZE
+
+# File layout:
+#   header (HEADER_SIZE bytes)
+#   dense worlds:   height * width int8 tiles, row-major
+#   chunked worlds: CHUNK_SIZE * CHUNK_SIZE int8 tiles per saved chunk,
+#                   followed by an index of (cx, cy, offset) records
+MAGIC = b'TWLD'
+VERSION = 1
+HEADER_SIZE = 64
+HEADER = struct.Struct('<4sHHqqQIIQ')
+
+LAYOUT_DENSE = 0
+LAYOUT_CHUNKED = 1
+
+INDEX_DTYPE = np.dtype([('cx', '<i8'), ('cy', '<i8'), ('offset', '<u8')])
+CHUNK_BYTES = CHUNK_SIZE * CHUNK_SIZE
+
+class WorldHeader:
+    def __init__(self, layout, width, height, seed, chunk_count=0, index_offset=0):
+        self.layout = layout
+        self.width = width  # None for an unbounded axis
+        self.height = height
+        self.seed = seed
+        self.chunk_count = chunk_count
+        self.index_offset = index_offset
+
+    def pack(self):
+        data = HEADER.pack(MAGIC, VERSION, self.layout,
+                           -1 if self.width is None else self.width,
+                           -1 if self.height is None else self.height,
+                           self.seed, CHUNK_SIZE, self.chunk_count, self.index_offset)
+        return data.ljust(HEADER_SIZE, b'\0')
+
+    @classmethod
+    def read(cls, f):
+        data = f.read(HEADER_SIZE)
+        if len(data) < HEADER_SIZE:
+            raise ValueError("Not a world file: truncated header")
+        (magic, version, layout, width, height, seed,
+         chunk_size, chunk_count, index_offset) = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a world file: bad magic %r" % magic)
+        if version != VERSION:
+            raise ValueError("Unsupported world file version %d" % version)
+        if chunk_size != CHUNK_SIZE:
+            raise ValueError("World file uses chunk size %d, expected %d" % (chunk_size, CHUNK_SIZE))
+        return cls(layout,
+                   None if width < 0 else width,
+                   None if height < 0 else height,
+                   seed, chunk_count, index_offset)
+
+def read_header(path):
+    with open(path, 'rb') as f:
+        return WorldHeader.read(f)
+
+class SavedChunks:
+    """Read-only, memory-mapped view of the chunks stored in a chunked world file"""
+
+    def __init__(self, path):
+        self.path = path
+        header = read_header(path)
+        self.index = {}
+        self._data = None
+        if header.chunk_count:
+            self._data = np.memmap(path, dtype=np.int8, mode='r')
+            records = np.frombuffer(
+                self._data[header.index_offset:header.index_offset + header.chunk_count * INDEX_DTYPE.itemsize],
+                dtype=INDEX_DTYPE)
+            self.index = {(int(r['cx']), int(r['cy'])): int(r['offset']) for r in records}
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def keys(self):
+        return self.index.keys()
+
+    def read(self, key):
+        """Read a writable copy of a saved chunk's blocks"""
+        offset = self.index[key]
+        return np.array(self._data[offset:offset + CHUNK_BYTES]).reshape(CHUNK_SIZE, CHUNK_SIZE)
+
+def replace_file(path, write):
+    """Write a file through a temporary file so memory maps of the old one stay valid"""
+    tmp_path = '%s.tmp' % path
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+def chunk_rect(world, cx, cy):
+    """Slices of the dense blocks array covered by chunk (cx, cy)"""
+    x0, y0 = cx * CHUNK_SIZE, cy * CHUNK_SIZE
+    return (slice(y0, min(y0 + CHUNK_SIZE, world.height)),
+            slice(x0, min(x0 + CHUNK_SIZE, world.width)))
+
+def _can_update_in_place(world, path, layout):
+    if world.save_path is None or os.path.abspath(world.save_path) != os.path.abspath(path):
+        return False
+    if not os.path.exists(path):
+        return False
+    header = read_header(path)
+    return (header.layout == layout and header.width == world.width
+            and header.height == world.height and header.seed == world.seed)
+
+def save_dense(world, path):
+    if _can_update_in_place(world, path, LAYOUT_DENSE):
+        # Only rewrite the chunks changed since the last save
+        if world.dirty_chunks:
+            target = np.memmap(path, dtype=np.int8, mode='r+', offset=HEADER_SIZE,
+                               shape=(world.height, world.width))
+            for cx, cy in world.dirty_chunks:
+                rect = chunk_rect(world, cx, cy)
+                target[rect] = world.blocks[rect]
+            target.flush()
+            del target
+        return
+
+    header = WorldHeader(LAYOUT_DENSE, world.width, world.height, world.seed)
+    def write(f):
+        f.write(header.pack())
+        f.write(np.ascontiguousarray(world.blocks).tobytes())
+    replace_file(path, write)
+
+def save_chunked(world, path):
+    if _can_update_in_place(world, path, LAYOUT_CHUNKED):
+        with open(path, 'r+b') as f:
+            header = WorldHeader.read(f)
+            index = dict(world.saved_chunks.index)
+            end = header.index_offset
+            for key in sorted(world.dirty_chunks):
+                # Rewrite existing chunks in place, append new ones over the old index
+                offset = index.get(key)
+                if offset is None:
+                    offset = index[key] = end
+                    end += CHUNK_BYTES
+                f.seek(offset)
+                f.write(world.get_chunk(*key).blocks.tobytes())
+            if len(index) != header.chunk_count:
+                header.chunk_count = len(index)
+                header.index_offset = end
+                f.seek(end)
+                f.write(_pack_index(index))
+                f.truncate()
+                f.seek(0)
+                f.write(header.pack())
+        return
+
+    # Chunks that differ from the generated terrain: previously saved plus dirty ones
+    keys = set(world.dirty_chunks)
+    if world.saved_chunks is not None:
+        keys.update(world.saved_chunks.keys())
+    keys = sorted(keys)
+    index = {key: HEADER_SIZE + i * CHUNK_BYTES for i, key in enumerate(keys)}
+    header = WorldHeader(LAYOUT_CHUNKED, world.width, world.height, world.seed,
+                         len(keys), HEADER_SIZE + len(keys) * CHUNK_BYTES)
+    def write(f):
+        f.write(header.pack())
+        for key in keys:
+            if key in world.dirty_chunks or key in world.chunks:
+                blocks = world.get_chunk(*key).blocks
+            else:
+                blocks = world.saved_chunks.read(key)
+            f.write(blocks.tobytes())
+        f.write(_pack_index(index))
+    replace_file(path, write)
+
+def _pack_index(index):
+    records = np.empty(len(index), dtype=INDEX_DTYPE)
+    for i, ((cx, cy), offset) in enumerate(sorted(index.items())):
+        records[i] = (cx, cy, offset)
+    return records.tobytes()
+
+def open_dense(path, header):
+    """Memory-map the tiles of a dense world file, copy-on-write"""
+    return np.memmap(path, dtype=np.int8, mode='c', offset=HEADER_SIZE,
+                     shape=(header.height, header.width))
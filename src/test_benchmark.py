@@ -0,0 +1,46 @@
+import json
+from benchmark import run, compare, main, benchmarks
+
+def results(**medians):
+    return {'results': {name: {'median_ms': ms} for name, ms in medians.items()}}
+
+def test_suite_covers_the_hot_paths():
+    names = set(benchmarks())
+    for name in ('generate_small', 'get_block_random', 'is_solid_sequential',
+                 'player_tick_100', 'render_frame'):
+        assert name in names
+
+def test_run_selected():
+    document = run(['generate_small', 'tick_100'], repeat_scale=0)
+    assert set(document['results']) == {'generate_small', 'player_tick_100', 'player_tick_1000',
+                                        'batched_tick_100', 'batched_tick_1000'}
+    result = document['results']['generate_small']
+    assert result['repeat'] == 3
+    assert 0 < result['min_ms'] <= result['median_ms'] <= result['max_ms']
+    # Plain JSON
+    assert json.loads(json.dumps(document)) == document
+
+def test_compare_flags_regressions():
+    baseline = results(a=10.0, b=10.0, c=10.0, gone=1.0)
+    current = results(a=11.0, b=13.0, c=5.0, new=1.0)
+    rows = {row[0]: row for row in compare(current, baseline, threshold=0.2)}
+    assert set(rows) == {'a', 'b', 'c'}
+    assert not rows['a'][4]
+    assert rows['b'][4] and abs(rows['b'][3] - 1.3) < 1e-9
+    assert not rows['c'][4]
+
+def test_main_exit_status(tmp_path, capsys):
+    output = tmp_path / 'results.json'
+    assert main(['generate_small', '--quick', '--output', str(output)]) == 0
+    saved = json.loads(output.read_text())
+
+    # A baseline impossibly fast fails, one impossibly slow passes
+    saved['results']['generate_small']['median_ms'] = 1e-6
+    fast = tmp_path / 'fast.json'
+    fast.write_text(json.dumps(saved))
+    assert main(['generate_small', '--quick', '--compare', str(fast)]) == 1
+    saved['results']['generate_small']['median_ms'] = 1e6
+    slow = tmp_path / 'slow.json'
+    slow.write_text(json.dumps(saved))
+    assert main(['generate_small', '--quick', '--compare', str(slow)]) == 0
+    assert 'REGRESSION' in capsys.readouterr().out
@@ -0,0 +1,61 @@
+import pytest
+import numpy as np
+from bitmap import SolidBitmap
+
+@pytest.fixture
+def solid():
+    rng = np.random.default_rng(0)
+    return rng.random((40, 150)) < 0.1
+
+def test_round_trip(solid):
+    bitmap = SolidBitmap.from_array(solid)
+    assert bitmap.bits.shape == (40, 3)
+    assert np.array_equal(bitmap.to_array(), solid)
+
+def test_get_and_set(solid):
+    bitmap = SolidBitmap.from_array(solid)
+    for y, x in [(0, 0), (5, 63), (6, 64), (39, 149), (20, 127)]:
+        assert bitmap.get(x, y) == solid[y, x]
+        bitmap.set(x, y, True)
+        assert bitmap.get(x, y)
+        bitmap.set(x, y, False)
+        assert not bitmap.get(x, y)
+    bitmap.set(63, 1, True)
+    assert bitmap.to_array()[1, 63]
+
+def test_get_many(solid):
+    bitmap = SolidBitmap.from_array(solid)
+    ys, xs = np.nonzero(np.ones_like(solid))
+    assert np.array_equal(bitmap.get_many(xs, ys), solid[ys, xs])
+
+def test_any_matches_slices(solid):
+    bitmap = SolidBitmap.from_array(solid)
+    rng = np.random.default_rng(1)
+    # Small rectangles take the Python path, large ones the NumPy path
+    for _ in range(500):
+        x0, x1 = sorted(rng.integers(0, 150, 2))
+        y0, y1 = sorted(rng.integers(0, 40, 2))
+        if rng.random() < 0.5:
+            y1 = min(y0 + 2, 39)
+        assert bitmap.any(x0, y0, x1, y1) == solid[y0:y1 + 1, x0:x1 + 1].any()
+
+def test_any_on_empty_and_full():
+    empty = SolidBitmap(200, 10)
+    assert not empty.any(0, 0, 199, 9)
+    empty.set(199, 9, True)
+    assert empty.any(0, 0, 199, 9)
+    assert empty.any(199, 9, 199, 9)
+    assert not empty.any(0, 0, 198, 9)
+
+def test_set_many(solid):
+    bitmap = SolidBitmap.from_array(solid)
+    rng = np.random.default_rng(2)
+    # Many bits of the same words at once
+    xs = rng.integers(0, 150, 500)
+    ys = rng.integers(0, 40, 500)
+    _, first = np.unique(np.stack((xs, ys), axis=1), axis=0, return_index=True)
+    xs, ys = xs[first], ys[first]
+    values = rng.random(len(xs)) < 0.5
+    bitmap.set_many(xs, ys, values)
+    solid[ys, xs] = values
+    assert np.array_equal(bitmap.to_array(), solid)
@@ -0,0 +1,47 @@
+import numpy as np
+from blocks import BlockType, TYPES, SOLID, COLORS, HARDNESS, Lookup, lookup
+from world import World
+
+def test_tables_cover_every_block_type():
+    for block_type in BlockType:
+        assert TYPES[block_type.value] is block_type
+        assert SOLID[block_type.value] == (block_type != BlockType.AIR)
+        assert HARDNESS[block_type.value] >= 0
+    assert HARDNESS[BlockType.STONE.value] > HARDNESS[BlockType.DIRT.value]
+    # Ids with no block type are air-like
+    assert TYPES[100] is None and not SOLID[100] and not COLORS[100].any()
+
+def test_lookup_single_and_arrays():
+    blocks = np.array([[0, 2], [3, -5]], dtype=np.int8)
+    assert SOLID[blocks].tolist() == [[False, True], [True, False]]
+    assert COLORS[blocks].shape == (2, 2, 3)
+    # Negative ids land on the same entry as their uint8 view
+    assert np.array_equal(SOLID[blocks], SOLID[blocks.view(np.uint8)])
+
+    out = np.empty((2, 2), dtype=bool)
+    assert lookup(SOLID, blocks, out=out) is out
+    assert out.tolist() == [[False, True], [True, False]]
+    colors = np.empty((2, 2, 3), dtype=np.uint8)
+    lookup(COLORS, blocks, out=colors)
+    assert np.array_equal(colors, COLORS[blocks])
+
+    # A Lookup keeps writing into one array while the shape stays the same
+    colors = Lookup(COLORS)
+    first = colors(blocks)
+    assert colors(blocks[::-1]) is first
+    assert np.array_equal(first, COLORS[blocks[::-1]])
+    assert colors(blocks[:1]).shape == (1, 2, 3)
+
+def test_world_uses_the_registry():
+    for chunked in (False, True):
+        world = World(64, 48, seed=3, chunked=chunked)
+        blocks = world.get_region(0, 0, 64, 48)
+        for y in range(0, 48, 5):
+            for x in range(0, 64, 3):
+                assert world.get_block(x, y) is BlockType(int(blocks[y, x]))
+                assert world.is_solid(x, y) == SOLID[blocks[y, x]]
+        xs, ys = np.meshgrid(np.arange(64), np.arange(48))
+        assert np.array_equal(world.solid_at(xs, ys), SOLID[blocks])
+        out = np.ones(xs.shape, dtype=bool)
+        assert world.solid_at(xs - 10, ys, out) is out
+        assert np.array_equal(out[:, 10:], SOLID[blocks[:, :-10]]) and not out[:, :10].any()
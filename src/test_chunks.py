@@ -0,0 +1,79 @@
+import pytest
+import numpy as np
+from chunks import CHUNK_BYTES, CHUNK_SIZE, ChunkCache
+from world import World, BlockType
+
+def make_generator(calls):
+    def generate(cx, cy):
+        calls.append((cx, cy))
+        return np.full((CHUNK_SIZE, CHUNK_SIZE), (cx + cy) % 4, dtype=np.int8)
+    return generate
+
+def test_unbounded_cache_keeps_everything():
+    calls = []
+    cache = ChunkCache(make_generator(calls))
+    for cx in range(10):
+        cache.get_chunk(cx, 0)
+    assert len(cache) == 10
+    assert cache.evictions == 0
+    assert cache.misses == 10
+
+def test_memory_budget_limits_resident_chunks():
+    cache = ChunkCache(make_generator([]), memory_budget=3 * CHUNK_BYTES)
+    assert cache.max_chunks == 3
+    for cx in range(10):
+        cache.get_chunk(cx, 0)
+    assert len(cache) == 3
+    assert cache.memory_used <= 3 * CHUNK_BYTES
+    assert cache.evictions == 7
+
+def test_lru_order_and_counters():
+    calls = []
+    cache = ChunkCache(make_generator(calls), memory_budget=2 * CHUNK_BYTES)
+    cache.get_chunk(0, 0)
+    cache.get_chunk(1, 0)
+    cache.get_chunk(0, 0)  # Hit, (1, 0) is now least recently used
+    cache.get_chunk(2, 0)  # Evicts (1, 0)
+    assert (0, 0) in cache
+    assert (1, 0) not in cache
+    assert (cache.hits, cache.misses, cache.evictions) == (1, 3, 1)
+    
+    # Clean chunks are regenerated on their next access
+    cache.get_chunk(1, 0)
+    assert calls == [(0, 0), (1, 0), (2, 0), (1, 0)]
+    assert cache.spills == 0
+
+def test_modified_chunks_are_spilled(tmp_path):
+    calls = []
+    spill_path = tmp_path / 'chunks.spill'
+    cache = ChunkCache(make_generator(calls), memory_budget=CHUNK_BYTES,
+                       spill_path=spill_path)
+    chunk = cache.get_chunk(5, 5)
+    chunk.blocks[3, 4] = 7
+    chunk.is_modified = True
+    
+    cache.get_chunk(6, 5)  # Evicts and spills (5, 5)
+    assert cache.spills == 1
+    assert spill_path.exists()
+    
+    restored = cache.get_chunk(5, 5)
+    assert restored.blocks[3, 4] == 7
+    assert restored.is_modified
+    assert calls.count((5, 5)) == 1  # Read back instead of regenerated
+    cache.close()
+
+def test_world_with_memory_budget_keeps_edits():
+    world = World(width=None, height=None, seed=9, chunked=True,
+                  memory_budget=4 * CHUNK_BYTES)
+    world.set_block(0, 0, BlockType.STONE)
+    original = world.get_chunk(3, 3).blocks.copy()
+    
+    # Walk far enough to evict everything touched so far
+    for x in range(0, 20 * CHUNK_SIZE, CHUNK_SIZE):
+        world.get_block(x, 1000)
+    assert (0, 0) not in world.chunks
+    assert len(world.chunks) == 4
+    
+    assert world.get_block(0, 0) == BlockType.STONE
+    assert np.array_equal(world.get_chunk(3, 3).blocks, original)
+    assert world.chunks.stats['spilled'] == 1
@@ -0,0 +1,71 @@
+import pytest
+from collision import Hit, sweep, move_and_collide
+from player import Player
+from world import World, BlockType
+
+@pytest.fixture
+def world():
+    # An empty 20x20 world with a one-block-thick floor at row 15
+    world = World(20, 20)
+    for y in range(world.height):
+        for x in range(world.width):
+            world.set_block(x, y, BlockType.STONE if y == 15 else BlockType.AIR)
+    return world
+
+def test_no_hit_in_open_air(world):
+    assert sweep(world, 64, 64, 20, 40, 30, 100) is None
+    assert sweep(world, 64, 64, 20, 40, 0, 0) is None
+
+def test_floor_contact_time_and_normal(world):
+    # Bottom edge at 200, floor top at 15 * 32 = 480
+    hit = sweep(world, 64, 160, 20, 40, 0, 560)
+    assert hit == Hit(0.5, 0, -1)
+
+def test_fast_fall_does_not_tunnel(world):
+    # Far more than a block per step, through a single block of floor
+    x, y, normal_x, normal_y = move_and_collide(world, 64, 0, 20, 40, 7, 5000)
+    assert (normal_x, normal_y) == (0, -1)
+    assert y == 15 * 32 - 40
+    assert x == 71  # Slides along the floor for the rest of the step
+
+def test_wall_contact(world):
+    world.set_block(10, 14, BlockType.STONE)
+    x, y, normal_x, normal_y = move_and_collide(world, 32, 14 * 32 + 4, 20, 20, 1000, 0)
+    assert (normal_x, normal_y) == (-1, 0)
+    assert x == 10 * 32 - 20
+    assert y == 14 * 32 + 4
+
+def test_moving_up_hits_ceiling(world):
+    hit = sweep(world, 64, 600, 20, 40, 0, -200)
+    assert hit.normal_y == 1
+    x, y, _, _ = move_and_collide(world, 64, 600, 20, 40, 0, -200)
+    assert y == 16 * 32
+
+def test_touching_surface_is_hit_immediately(world):
+    assert sweep(world, 64, 15 * 32 - 40, 20, 40, 0, 1) == Hit(0.0, 0, -1)
+    # Moving away from it is free
+    assert sweep(world, 64, 15 * 32 - 40, 20, 40, 0, -1) is None
+
+def test_corner_counts_as_floor(world):
+    world.set_block(5, 10, BlockType.STONE)
+    # Heads exactly for the top-left corner of block (5, 10)
+    hit = sweep(world, 5 * 32 - 64, 10 * 32 - 64, 32, 32, 64, 64)
+    assert hit == Hit(0.5, 0, -1)
+
+def test_player_continuous_collision(world):
+    player = Player(world, 64, 0)
+    player.continuous_collision = True
+    player.terminal_velocity = 1000
+    player.velocity_y = 900
+    player.move()
+    assert player.on_ground
+    assert player.y == 15 * 32 - 40
+    assert player.velocity_y == 0
+
+    # The default discrete check tunnels at the same speed
+    player = Player(world, 64, 0)
+    player.terminal_velocity = 1000
+    player.velocity_y = 900
+    player.move()
+    assert not player.on_ground
+    assert player.y > 16 * 32
@@ -0,0 +1,105 @@
+import pytest
+import numpy as np
+from entities import Entity, EntityManager, SpatialHash
+
+def overlaps(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+@pytest.fixture
+def boxes():
+    rng = np.random.default_rng(0)
+    return [(int(x), int(y), int(w), int(h)) for x, y, w, h in zip(
+        rng.integers(-500, 500, 300), rng.integers(-500, 500, 300),
+        rng.integers(1, 80, 300), rng.integers(1, 80, 300))]
+
+def test_insert_and_remove():
+    index = SpatialHash()
+    index.insert('a', 10, 10, 50, 20)
+    assert 'a' in index
+    assert set(index.cells) == {(0, 0), (1, 0)}
+    with pytest.raises(KeyError):
+        index.insert('a', 0, 0, 1, 1)
+    index.remove('a')
+    assert len(index) == 0
+    assert not index.cells
+
+def test_box_on_cell_boundary():
+    index = SpatialHash()
+    # [0, 32) only covers cell 0
+    index.insert(1, 0, 0, 32, 32)
+    assert set(index.cells) == {(0, 0)}
+    assert index.query_rect(32, 0, 10, 10) == []
+    assert index.query_rect(31, 31, 10, 10) == [1]
+
+def test_queries_match_brute_force(boxes):
+    index = SpatialHash()
+    for key, box in enumerate(boxes):
+        index.insert(key, *box)
+    rng = np.random.default_rng(1)
+    for x, y in rng.integers(-600, 600, (50, 2)):
+        rect = (int(x), int(y), 120, 90)
+        expected = {key for key, box in enumerate(boxes) if overlaps(box, rect)}
+        assert set(index.query_rect(*rect)) == expected
+
+        expected = set()
+        for key, (bx, by, bw, bh) in enumerate(boxes):
+            dx = max(bx - x, 0, x - (bx + bw))
+            dy = max(by - y, 0, y - (by + bh))
+            if dx * dx + dy * dy <= 100 ** 2:
+                expected.add(key)
+        assert set(index.query_radius(int(x), int(y), 100)) == expected
+
+def test_pairs_match_brute_force(boxes):
+    index = SpatialHash()
+    for key, box in enumerate(boxes):
+        index.insert(key, *box)
+    expected = {(a, b) for a in range(len(boxes)) for b in range(a + 1, len(boxes))
+                if overlaps(boxes[a], boxes[b])}
+    pairs = index.pairs()
+    assert len(pairs) == len(expected)
+    assert set(pairs) == expected
+
+def test_move_updates_cells():
+    index = SpatialHash()
+    index.insert(1, 0, 0, 10, 10)
+    index.move(1, 5, 5)
+    assert set(index.cells) == {(0, 0)}
+    index.move(1, 100, 40)
+    assert set(index.cells) == {(3, 1)}
+    assert index.query_rect(0, 0, 32, 32) == []
+    assert index.query_rect(96, 32, 32, 32) == [1]
+    index.move(1, 100, 40, width=40)
+    assert set(index.cells) == {(3, 1), (4, 1)}
+
+def test_manager_collision_groups():
+    entities = EntityManager()
+    player = entities.add(Entity(0, 0, 20, 40, group='player'))
+    mob = entities.add(Entity(10, 10, 20, 20, group='mob'))
+    item = entities.add(Entity(5, 5, 8, 8, group='item'))
+    other_item = entities.add(Entity(6, 6, 8, 8, group='item'))
+    assert len(entities.collisions()) == 6
+
+    entities.set_collision('item', 'item', False)
+    entities.set_collision('mob', 'item', False)
+    pairs = {frozenset((a.group, b.group)) for a, b in entities.collisions()}
+    assert pairs == {frozenset(('player', 'mob')), frozenset(('player', 'item'))}
+    assert len(entities.collisions()) == 3
+
+    entities.move(mob, 500, 500)
+    assert len(entities.collisions()) == 2
+    entities.remove(other_item)
+    assert len(entities.collisions()) == 1
+    assert entities.get(other_item.id) is None
+
+def test_manager_queries():
+    entities = EntityManager()
+    near = entities.add(Entity(100, 100, group='mob'))
+    far = entities.add(Entity(180, 100, group='mob'))
+    entities.add(Entity(90, 90, group='item'))
+    assert entities.nearest(95, 95, 200, group='mob') is near
+    assert entities.nearest(1000, 1000, 50) is None
+    # The camera's view
+    assert set(e.id for e in entities.query_rect(150, 0, 100, 200)) == {far.id}
+    assert len(entities.query_radius(100, 100, 300, group='mob')) == 2
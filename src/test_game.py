@@ -88,4 +88,45 @@ def test_game_update():
     
     # Allow small offset for floating point differences
     assert abs(player_center_x - camera_center_x) <= game.player.width
-    assert abs(player_center_y - camera_center_y) <= game.player.height
\ No newline at end of file
+    assert abs(player_center_y - camera_center_y) <= game.player.height
+
+def test_minimap_toggle():
+    game = Game()
+    assert not game.show_minimap
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, {'key': pygame.K_m}))
+    game.handle_events()
+    assert game.show_minimap
+    game.render()
+
+def test_headless_game():
+    game = Game(headless=True)
+    assert game.headless
+    assert game.run_headless(120) == 120
+    # Nothing holds the player up in the air forever
+    assert game.player.y > 0
+
+def test_render_interpolates_between_ticks():
+    game = Game(headless=True)
+    game.player.x, game.player.y = 1000, 200
+    game.update()
+    previous_x, previous_y = game.previous_position
+    
+    game.render(0.5)
+    expected_y = previous_y + (game.player.y - previous_y) * 0.5
+    camera_center_y = game.camera.y + game.camera.height // 2
+    assert camera_center_y == pytest.approx(expected_y + game.player.height / 2)
+
+def test_fixed_tick_rate():
+    game = Game(headless=True, tick_rate=120)
+    assert game.TICK_RATE == 120
+    assert game.timestep.dt == pytest.approx(1 / 120)
+
+def test_render_blocks_in_unbounded_world():
+    game = Game(headless=True, chunked=True)
+    game.use_tile_cache = False
+    game.show_lighting = False
+    game.camera.x, game.camera.y = -1000, 1000
+    start_x, end_x, start_y, end_y = game.visible_blocks()
+    assert start_x < 0 and end_x - start_x == game.WINDOW_SIZE[0] // game.BLOCK_SIZE + 1
+    game.render_blocks()
+    game.prefetcher.close()
@@ -0,0 +1,55 @@
+import pytest
+import numpy as np
+from interest import InterestManager
+from world import World
+
+@pytest.fixture
+def interest():
+    # 32 x 8 chunks
+    return InterestManager(World(1024, 256, seed=1), view_size=(800, 600), margin=1)
+
+def test_area_follows_view(interest):
+    entered, left = interest.update(1, 5000, 2000)
+    # View x 5000..5799 is chunks 4..5, y 2000..2599 chunks 1..2, plus the margin
+    assert entered == {(x, y) for x in range(3, 7) for y in range(0, 4)}
+    assert left == set()
+    assert interest.interested(3, 0) == {1}
+
+    # A small step keeps the area; chunks only leave past the margin
+    assert interest.update(1, 5100, 2000) == (set(), set())
+    entered, left = interest.update(1, 5000 + 3 * 1024, 2000)
+    assert entered == {(x, y) for x in range(7, 10) for y in range(0, 4)}
+    assert left == {(x, y) for x in range(3, 5) for y in range(0, 4)}
+    assert interest.interested(3, 0) == set()
+
+def test_area_is_clipped_to_world(interest):
+    entered, _ = interest.update(1, -2000, -2000)
+    assert entered == set()
+    entered, _ = interest.update(2, 0, 0)
+    assert entered == {(x, y) for x in range(0, 2) for y in range(0, 2)}
+
+def test_remove(interest):
+    interest.update(1, 0, 0)
+    interest.update(2, 0, 0)
+    interest.remove(1)
+    assert interest.interested(0, 0) == {2}
+    interest.remove(2)
+    assert not interest.subscribers
+    assert interest.area(2) == set()
+
+def test_route_changes(interest):
+    interest.update(1, 0, 0)  # chunks 0..1
+    interest.update(2, 10000, 0)  # chunks 8..11
+    xs = np.array([5, 40, 300, 100, 5])
+    ys = np.array([5, 5, 5, 100, 6])
+    routed = interest.route(xs, ys)
+    assert routed[1].tolist() == [0, 1, 4]
+    assert routed[2].tolist() == [2]
+    assert interest.route(np.array([], dtype=int), np.array([], dtype=int)) == {}
+
+def test_nearby(interest):
+    interest.update(1, 0, 0)
+    positions = {1: (100, 100), 2: (1500, 900), 3: (9000, 100)}
+    buckets = interest.bucket(positions)
+    assert sorted(interest.nearby(1, buckets)) == [1, 2]
+    assert interest.nearby(4, buckets) == []
@@ -0,0 +1,44 @@
+import pytest
+import numpy as np
+from journal import ChangeJournal
+
+def test_changes_since_cursor():
+    journal = ChangeJournal(capacity=2)
+    assert journal.cursor == 0
+    journal.record(1, 2, 0, 3, tick=5)
+    cursor = journal.cursor
+    journal.record_many(np.array([4, 5, 6]), np.array([7, 8, 9]), 1, np.array([0, 2, 3]), tick=6)
+    assert journal.cursor == 4
+
+    changes = journal.changes_since(0)
+    assert changes['x'].tolist() == [1, 4, 5, 6]
+    assert changes['new'].tolist() == [3, 0, 2, 3]
+    assert changes['old'].tolist() == [0, 1, 1, 1]
+    assert changes['tick'].tolist() == [5, 6, 6, 6]
+    assert journal.changes_since(cursor)['y'].tolist() == [7, 8, 9]
+    assert len(journal.changes_since(journal.cursor)) == 0
+
+def test_changes_are_copies():
+    journal = ChangeJournal()
+    journal.record(1, 1, 0, 1, 0)
+    changes = journal.changes_since(0)
+    journal.record(2, 2, 0, 1, 0)
+    changes['x'][0] = 99
+    assert journal.changes_since(0)['x'].tolist() == [1, 2]
+
+def test_old_changes_are_dropped():
+    journal = ChangeJournal(max_length=10)
+    for i in range(25):
+        journal.record(i, 0, 0, 1, i)
+    assert journal.cursor == 25
+    assert len(journal) <= 10
+    assert journal.changes_since(0) is None
+    assert journal.changes_since(journal.start)['x'].tolist() == list(range(journal.start, 25))
+
+def test_clear_keeps_cursors_valid():
+    journal = ChangeJournal()
+    journal.record(1, 1, 0, 1, 0)
+    journal.clear()
+    assert journal.cursor == 1
+    assert len(journal.changes_since(1)) == 0
+    assert journal.changes_since(0) is None
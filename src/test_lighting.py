@@ -0,0 +1,105 @@
+import numpy as np
+import pygame
+import pytest
+from lighting import LightMap, MAX_LIGHT, AIR_FALLOFF, SOLID_FALLOFF
+from world import World, BlockType
+
+class MockCamera:
+    def __init__(self, x=0, y=0):
+        self.x = x
+        self.y = y
+
+def recomputed(lighting):
+    """Light map computed from scratch for the same world and sources"""
+    fresh = LightMap(lighting.world)
+    for (x, y), level in lighting.sources.items():
+        fresh.sources[(x, y)] = level
+    fresh.recompute()
+    return fresh.light
+
+def test_sky_is_fully_lit():
+    world = World(width=50, height=50, seed=1)
+    lighting = LightMap(world)
+    for x in range(world.width):
+        for y in range(world.height):
+            if world.get_block(x, y) != BlockType.AIR:
+                break
+            assert lighting.get_light(x, y) == MAX_LIGHT
+
+def test_light_fades_into_the_ground():
+    world = World(width=20, height=40, seed=1)
+    world.set_blocks(*np.nonzero(np.ones((20, 40))), np.full(800, BlockType.STONE.value))
+    world.set_blocks(np.arange(20), np.zeros(20, dtype=int), np.full(20, BlockType.AIR.value))
+    lighting = LightMap(world)
+    assert lighting.get_light(10, 0) == MAX_LIGHT
+    assert lighting.get_light(10, 1) == MAX_LIGHT - SOLID_FALLOFF
+    assert lighting.get_light(10, 2) == MAX_LIGHT - 2 * SOLID_FALLOFF
+    assert lighting.get_light(10, 39) == 0
+
+def test_torch_lights_a_cave():
+    world = World(width=60, height=60, seed=1)
+    lighting = LightMap(world)
+    # Hollow out a cave deep underground
+    for x in range(20, 40):
+        for y in range(45, 50):
+            world.set_block(x, y, BlockType.AIR)
+    lighting.sync()
+    assert lighting.get_light(30, 47) == 0
+    lighting.add_light(30, 47)
+    assert lighting.get_light(30, 47) == MAX_LIGHT
+    assert lighting.get_light(33, 47) == MAX_LIGHT - 3 * AIR_FALLOFF
+    lighting.remove_light(30, 47)
+    assert lighting.get_light(33, 47) == 0
+
+@pytest.mark.parametrize('chunked', [False, True])
+def test_incremental_updates_match_recompute(chunked):
+    width = 64 if chunked else 80
+    world = World(width=width, height=80, seed=3, chunked=chunked)
+    lighting = LightMap(world)
+    rng = np.random.default_rng(0)
+    for step in range(200):
+        x, y = int(rng.integers(width)), int(rng.integers(80))
+        if step % 10 == 0:
+            if (x, y) in lighting.sources:
+                lighting.remove_light(x, y)
+            else:
+                lighting.add_light(x, y, int(rng.integers(1, MAX_LIGHT + 1)))
+        else:
+            world.set_block(x, y, BlockType(int(rng.integers(4))))
+            lighting.sync()
+        if step % 20 == 19:
+            assert np.array_equal(lighting.light, recomputed(lighting))
+
+def test_digging_a_shaft_lets_in_sunlight():
+    world = World(width=40, height=60, seed=1)
+    lighting = LightMap(world)
+    x = 20
+    surface = next(y for y in range(world.height) if world.get_block(x, y) != BlockType.AIR)
+    for y in range(surface, surface + 10):
+        world.set_block(x, y, BlockType.AIR)
+    lighting.sync()
+    assert lighting.get_light(x, surface + 9) == MAX_LIGHT
+    assert np.array_equal(lighting.light, recomputed(lighting))
+
+def test_many_changes_recompute_everything():
+    world = World(width=40, height=40, seed=1)
+    lighting = LightMap(world)
+    xs, ys = np.meshgrid(np.arange(40), np.arange(40))
+    world.set_blocks(xs.ravel(), ys.ravel(), np.zeros(xs.size, dtype=int))
+    lighting.sync()
+    assert lighting.relit_blocks == 0
+    assert (lighting.light == MAX_LIGHT).all()
+
+def test_render_darkens_unlit_blocks():
+    world = World(width=100, height=100, seed=1)
+    lighting = LightMap(world)
+    screen = pygame.Surface((800, 600))
+    screen.fill((200, 200, 200))
+    lighting.render(screen, MockCamera(0, 2800))
+    # The top of the view is deep underground, the bottom beyond the world
+    assert screen.get_at((10, 10))[:3] == (0, 0, 0)
+    assert screen.get_at((10, 590))[:3] == (200, 200, 200)
+
+def test_unbounded_world_is_rejected():
+    with pytest.raises(ValueError):
+        LightMap(World(width=None, height=None, chunked=True))
@@ -0,0 +1,132 @@
+import numpy as np
+import pytest
+from liquids import LiquidSim, MAX_LEVEL, WATER, LAVA, NONE, DENSE_MIN_BLOCKS
+from world import World, BlockType
+
+def empty_world(width=40, height=30, floor=25):
+    """Air with a flat stone floor from row floor down"""
+    world = World(width=width, height=height, seed=1)
+    xs, ys = np.meshgrid(np.arange(width), np.arange(height))
+    blocks = np.where(ys >= floor, BlockType.STONE.value, BlockType.AIR.value)
+    world.set_blocks(xs.ravel(), ys.ravel(), blocks.ravel())
+    return world
+
+def run(liquids, ticks):
+    for _ in range(ticks):
+        liquids.step()
+
+def test_water_falls_to_the_floor():
+    world = empty_world()
+    liquids = LiquidSim(world)
+    liquids.add_liquid(20, 5)
+    run(liquids, 30)
+    assert liquids.level[:24].sum() == 0
+    assert liquids.total(WATER) == MAX_LEVEL
+
+def test_water_spreads_and_settles():
+    world = empty_world()
+    liquids = LiquidSim(world)
+    for y in range(10, 20):
+        liquids.add_liquid(20, y)
+    run(liquids, 2000)
+    assert liquids.total(WATER) == 10 * MAX_LEVEL
+    assert not liquids.active
+    assert liquids.step() == 0
+    # Spread into a thin layer on the floor
+    assert liquids.level[:24].sum() == 0
+    assert np.count_nonzero(liquids.level[24]) > 20
+
+def test_walls_hold_water():
+    world = empty_world()
+    for y in range(15, 25):
+        world.set_block(10, y, BlockType.STONE)
+        world.set_block(14, y, BlockType.STONE)
+    liquids = LiquidSim(world)
+    for y in range(18, 25):
+        for x in range(11, 14):
+            liquids.add_liquid(x, y)
+    run(liquids, 200)
+    assert liquids.level[:, :10].sum() == 0
+    assert liquids.level[:, 15:].sum() == 0
+    assert not liquids.active
+
+    # Knocking out the wall lets it flow on the next ticks
+    world.set_block(14, 24, BlockType.AIR)
+    run(liquids, 200)
+    assert liquids.level[24, 15:].sum() > 0
+    assert liquids.total(WATER) == 21 * MAX_LEVEL
+
+def test_placed_block_displaces_liquid():
+    world = empty_world()
+    liquids = LiquidSim(world)
+    liquids.add_liquid(20, 24)
+    run(liquids, 5)
+    world.set_block(20, 24, BlockType.DIRT)
+    liquids.step()
+    assert liquids.get_liquid(20, 24) == (NONE, 0)
+
+def test_liquid_is_not_poured_into_solid_blocks():
+    world = empty_world()
+    liquids = LiquidSim(world)
+    liquids.add_liquid(20, 27)
+    assert liquids.get_liquid(20, 27) == (NONE, 0)
+    assert not liquids.active
+
+def test_lava_meeting_water_turns_to_stone():
+    world = empty_world()
+    liquids = LiquidSim(world)
+    for y in range(14, 24):
+        liquids.add_liquid(10, y, WATER)
+        liquids.add_liquid(30, y, LAVA)
+    run(liquids, 500)
+    row = world.get_region(0, 24, 40, 25)[0]
+    assert (row == BlockType.STONE.value).any()
+    assert liquids.level[liquids.kind == LAVA].sum() < 10 * MAX_LEVEL
+
+def test_settled_liquid_costs_nothing():
+    world = empty_world(400, 100, floor=90)
+    world.set_block(99, 89, BlockType.STONE)
+    world.set_block(300, 89, BlockType.STONE)
+    liquids = LiquidSim(world)
+    for x in range(100, 300):
+        liquids.add_liquid(x, 89)
+    run(liquids, 2)
+    assert not liquids.active
+    world.set_block(5, 5, BlockType.DIRT)
+    assert liquids.step() == 9
+
+@pytest.mark.parametrize('seed', [0, 1])
+def test_vectorized_steps_match_block_by_block(seed):
+    rng = np.random.default_rng(seed)
+    worlds = [World(width=48, height=48, seed=seed) for _ in range(2)]
+    sims = [LiquidSim(worlds[0], vectorize=False), LiquidSim(worlds[1], vectorize=True)]
+    for tick in range(300):
+        if tick % 20 == 0:
+            x, y = int(rng.integers(48)), int(rng.integers(30))
+            kind = WATER if rng.random() < 0.7 else LAVA
+            edit = (int(rng.integers(48)), int(rng.integers(48)), BlockType(int(rng.integers(4))))
+            for world, liquids in zip(worlds, sims):
+                liquids.add_liquid(x, y, kind)
+                world.set_block(*edit)
+        for liquids in sims:
+            liquids.step()
+        assert np.array_equal(sims[0].level, sims[1].level)
+        assert np.array_equal(sims[0].kind, sims[1].kind)
+        assert np.array_equal(worlds[0].blocks, worlds[1].blocks)
+
+def test_large_releases_switch_to_numpy():
+    world = empty_world(100, 60, floor=55)
+    liquids = LiquidSim(world)
+    for y in range(0, 20):
+        for x in range(20, 80):
+            liquids.add_liquid(x, y)
+    assert len(liquids.active) >= DENSE_MIN_BLOCKS
+    liquids.step()
+    assert liquids.dense_ticks == 1
+    total = liquids.total(WATER)
+    run(liquids, 100)
+    assert liquids.total(WATER) == total
+
+def test_unbounded_world_is_rejected():
+    with pytest.raises(ValueError):
+        LiquidSim(World(width=None, height=None, chunked=True))
@@ -0,0 +1,128 @@
+import numpy as np
+from pygame.locals import K_a, K_d, K_SPACE
+from game import Camera, NullMouse
+from pathfinding import NavGraph, jump_templates, MAX_INCREMENTAL_CHANGES
+from player import Player
+from world import World, BlockType
+
+def flat_world(width=48, height=24, floor=20):
+    """Empty world with a floor: feet of a body standing on it are in row floor - 1"""
+    world = World(width, height, seed=1)
+    xs, ys = np.meshgrid(np.arange(width), np.arange(height))
+    world.set_blocks(xs, ys, np.where(ys >= floor, BlockType.STONE.value, BlockType.AIR.value))
+    return world
+
+def column(world, x, top, bottom, block=BlockType.STONE):
+    world.set_blocks(x, np.arange(top, bottom), block.value)
+
+def test_templates_follow_the_physics():
+    player = Player(None)
+    rises = -min(template.dy for template in jump_templates(player))
+    # jump_strength 8 and gravity 0.4 peak at 80 px, over two 32 px blocks
+    assert rises == 2
+    player.jump_strength = -11
+    assert -min(template.dy for template in jump_templates(player)) == 4
+    # Walking to the next block takes a block's width at max_speed
+    walks = [t for t in jump_templates(Player(None)) if (t.dx, t.dy) == (1, 0) and not t.cells]
+    assert walks[0].cost == 32 / 4
+
+def test_walk_along_the_floor():
+    world = flat_world()
+    graph = NavGraph(world)
+    assert graph.is_node(5, 19) and not graph.is_node(5, 18) and not graph.is_node(5, 20)
+    path = graph.find_path((5, 19), (15, 19))
+    assert path == [(x, 19) for x in range(5, 16)]
+    assert graph.path_cost(path) == 10 * 8
+
+def test_jump_heights_and_gaps():
+    world = flat_world()
+    column(world, 20, 18, 20)  # Two blocks high
+    graph = NavGraph(world)
+    path = graph.find_path((10, 19), (20, 17))
+    assert path is not None and path[-1] == (20, 17)
+
+    column(world, 20, 17, 18)  # Now three
+    path = graph.find_path((10, 19), (20, 16))
+    assert path is None
+
+    # A three block gap is jumped, a wide one is not
+    world = flat_world()
+    world.set_blocks(np.arange(20, 23), 20, BlockType.AIR.value)
+    world.set_blocks(np.arange(20, 23), 21, BlockType.AIR.value)
+    world.set_blocks(np.arange(20, 23), 22, BlockType.AIR.value)
+    world.set_blocks(np.arange(20, 23), 23, BlockType.AIR.value)
+    graph = NavGraph(world)
+    path = graph.find_path((10, 19), (30, 19))
+    assert path is not None and all(y == 19 for _, y in path)
+    world.set_blocks(np.arange(10, 40), 20, BlockType.AIR.value)
+    world.set_blocks(np.arange(10, 40), 21, BlockType.AIR.value)
+    world.set_blocks(np.arange(10, 40), 22, BlockType.AIR.value)
+    world.set_blocks(np.arange(10, 40), 23, BlockType.AIR.value)
+    assert graph.find_path((5, 19), (45, 19)) is None
+
+def test_player_can_follow_a_jump_link():
+    world = flat_world()
+    column(world, 12, 18, 20)
+    graph = NavGraph(world)
+    assert graph.find_path((10, 19), (12, 17)) is not None
+
+    # The player, holding right and jump, gets up the same step
+    player = Player(world, 10 * 32 + 6, 19 * 32 - 8)
+    camera = Camera(800, 600)
+    for _ in range(60):
+        player.handle_input({K_a: False, K_d: True, K_SPACE: True}, NullMouse(), camera)
+        player.move()
+        if player.x >= 12 * 32:
+            break
+    for _ in range(10):
+        player.handle_input({K_a: False, K_d: False, K_SPACE: False}, NullMouse(), camera)
+        player.move()
+    assert graph.node_at(player.x, player.y, player.width, player.height) == (12, 17)
+
+def test_repairs_match_a_fresh_graph():
+    world = World(128, 96, seed=4)
+    graph = NavGraph(world)
+    keys = [(cx, cy) for cx in range(4) for cy in range(3)]
+    for key in keys:
+        graph.chunk(*key)
+    rng = np.random.default_rng(0)
+    for _ in range(40):
+        x, y = int(rng.integers(0, 128)), int(rng.integers(20, 80))
+        world.set_block(x, y, BlockType.AIR if world.is_solid(x, y) else BlockType.DIRT)
+        graph.sync()
+    assert graph.repairs > 0 and graph.builds == len(keys)
+
+    # A big batch of changes drops the chunks instead
+    xs = rng.integers(0, 128, MAX_INCREMENTAL_CHANGES + 1)
+    world.set_blocks(xs, 30, BlockType.DIRT.value)
+    graph.sync()
+
+    fresh = NavGraph(world)
+    for key in keys:
+        repaired, built = graph.chunk(*key), fresh.chunk(*key)
+        assert np.array_equal(repaired.standable, built.standable)
+        assert {node: sorted(links) for node, links in repaired.links.items()} == \
+               {node: sorted(links) for node, links in built.links.items()}
+        assert {node: sorted(links) for node, links in repaired.incoming.items()} == \
+               {node: sorted(links) for node, links in built.incoming.items()}
+
+def test_batched_paths_are_as_fast():
+    world = World(160, 96, seed=2)
+    graph = NavGraph(world)
+    # Nodes on the surface, mostly connected, rather than in closed caves
+    nodes = [next(y for y in range(96) if graph.is_node(x, y)) for x in range(0, 160, 3)]
+    nodes = [(x, y) for x, y in zip(range(0, 160, 3), nodes)]
+    rng = np.random.default_rng(1)
+    goal = nodes[len(nodes) // 2]
+    starts = [nodes[i] for i in rng.choice(len(nodes), 20, replace=False)]
+    queries = [(start, goal) for start in starts] + [(starts[0], starts[1])]
+    batched = graph.find_paths(queries)
+    found = 0
+    for (start, end), path in zip(queries, batched):
+        single = graph.find_path(start, end)
+        assert (path is None) == (single is None)
+        if path is not None:
+            found += 1
+            assert path[0] == start and path[-1] == end
+            assert abs(graph.path_cost(path) - graph.path_cost(single)) < 1e-9
+    assert found > 10
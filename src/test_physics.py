@@ -0,0 +1,80 @@
+import pytest
+import numpy as np
+from physics import EntityPhysics
+from player import Player
+from world import World, BlockType
+
+def assert_matches(physics, players):
+    for slot, player in enumerate(players):
+        assert physics.x[slot] == player.x
+        assert physics.y[slot] == player.y
+        assert physics.velocity_x[slot] == player.velocity_x
+        assert physics.velocity_y[slot] == player.velocity_y
+        assert physics.on_ground[slot] == player.on_ground
+
+def run_against_players(world, players, ticks, seed):
+    physics = EntityPhysics(world)
+    for player in players:
+        physics.add_player(player)
+    rng = np.random.default_rng(seed)
+    for _ in range(ticks):
+        left = rng.random(len(players)) < 0.3
+        right = rng.random(len(players)) < 0.3
+        jump = rng.random(len(players)) < 0.1
+        for i, player in enumerate(players):
+            # What Player.handle_input does with the keys
+            player.moving_left = bool(left[i])
+            player.moving_right = bool(right[i])
+            if jump[i] and player.on_ground:
+                player.velocity_y = player.jump_strength
+                player.on_ground = False
+            player.move()
+        physics.step(left, right, jump)
+        assert_matches(physics, players)
+    return physics
+
+def test_matches_player_physics_bit_for_bit():
+    world = World(100, 100, seed=5)
+    rng = np.random.default_rng(1)
+    players = [Player(world, int(x), int(y))
+               for x, y in zip(rng.integers(0, 3200, 50), rng.integers(0, 2000, 50))]
+    run_against_players(world, players, 300, seed=2)
+
+def test_matches_player_physics_with_edits_and_edges():
+    world = World(100, 100, seed=5)
+    # Dig some holes and tunnels to collide with
+    for x in range(20, 80):
+        world.set_block(x, 55, BlockType.AIR)
+        world.set_block(x, 56, BlockType.AIR)
+    players = [Player(world, x, y) for x, y in
+               [(-10, 0), (3190, 1500), (25 * 32, 55 * 32), (-40, 2000), (1600, -300)]]
+    run_against_players(world, players, 400, seed=3)
+
+def test_matches_player_physics_in_chunked_world():
+    world = World(None, None, seed=8, chunked=True)
+    players = [Player(world, x, 0) for x in range(-3000, 3000, 250)]
+    run_against_players(world, players, 200, seed=4)
+
+def test_add_and_remove():
+    world = World(50, 50, seed=1)
+    physics = EntityPhysics(world, capacity=2)
+    for i in range(5):
+        physics.add(i * 100, 0, width=10, height=10)
+    assert len(physics) == 5
+    assert physics.capacity >= 5
+    assert physics.width.tolist() == [10] * 5
+    
+    physics.remove(physics.slot_of(1))
+    assert len(physics) == 4
+    assert sorted(physics.ids.tolist()) == [0, 2, 3, 4]
+    assert physics.x[physics.slot_of(4)] == 400
+
+def test_per_body_constants():
+    world = World(50, 50, seed=1)
+    physics = EntityPhysics(world)
+    physics.add(0, 0, gravity=1.0, terminal_velocity=3)
+    physics.add(200, 0)
+    for _ in range(5):
+        physics.step()
+    assert physics.velocity_y[0] == 3
+    assert physics.velocity_y[1] == pytest.approx(2.0)
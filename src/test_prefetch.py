@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+from chunks import CHUNK_SIZE
+from prefetch import ChunkPrefetcher
+from world import World, BlockType
+
+class MockCamera:
+    def __init__(self, x=0, y=0, width=800, height=600):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+@pytest.fixture
+def world():
+    world = World(width=None, height=None, seed=4, chunked=True)
+    yield world
+    if world.prefetcher is not None:
+        world.prefetcher.close()
+
+def finish(prefetcher):
+    for future in prefetcher.pending.values():
+        future.result()
+    prefetcher.collect()
+
+def test_prefetched_chunks_match_generated_ones(world):
+    prefetcher = ChunkPrefetcher(world)
+    prefetcher.update(MockCamera(0, 1200))
+    finish(prefetcher)
+    assert prefetcher.installed > 0
+    reference = World(width=None, height=None, seed=4, chunked=True)
+    for key, chunk in world.chunks.items():
+        assert np.array_equal(chunk.blocks, reference.get_chunk(*key).blocks)
+
+def test_installed_arrays_are_not_copied(world):
+    blocks = world.generate_chunk(3, 2)
+    assert world.install_chunk(3, 2, blocks)
+    assert world.get_chunk(3, 2).blocks is blocks
+    # A chunk already loaded is kept
+    assert not world.install_chunk(3, 2, blocks.copy())
+    assert world.get_chunk(3, 2).blocks is blocks
+
+def test_modified_chunks_are_not_replaced(world):
+    world.set_block(5, 5, BlockType.STONE)
+    prefetcher = ChunkPrefetcher(world, max_pending=100)
+    prefetcher.update(MockCamera(-400, -300))
+    assert (0, 0) not in prefetcher.pending
+    finish(prefetcher)
+    assert world.get_block(5, 5) == BlockType.STONE
+
+def test_chunks_ahead_are_requested_first(world):
+    prefetcher = ChunkPrefetcher(world, margin=0, max_pending=4)
+    camera = MockCamera(0, 1600)
+    prefetcher.update(camera, velocity=(20, 0))
+    view_right = (camera.x + camera.width) // (CHUNK_SIZE * 32)
+    assert all(cx >= 0 for cx, _ in prefetcher.pending)
+    assert max(cx for cx, _ in prefetcher.pending) > view_right
+
+    wanted = prefetcher.wanted(camera, velocity=(-20, 0))
+    assert wanted[0][0] < 0
+
+def test_claim_waits_for_chunks_in_progress(world):
+    prefetcher = ChunkPrefetcher(world)
+    assert prefetcher.request(7, 3)
+    assert not prefetcher.request(7, 3)
+    # Reading the chunk takes the queued result instead of generating again
+    block = world.get_block(7 * CHUNK_SIZE, 3 * CHUNK_SIZE)
+    assert prefetcher.claimed == 1
+    assert (7, 3) not in prefetcher.pending
+    assert block == BlockType(world.generate_chunk(7, 3)[0, 0])
+
+def test_saved_chunks_are_not_prefetched(world, tmp_path):
+    world.set_block(40, 40, BlockType.GRASS)
+    world.save(tmp_path / 'world.twld')
+    loaded = World.load(tmp_path / 'world.twld')
+    prefetcher = ChunkPrefetcher(loaded)
+    try:
+        assert not prefetcher.request(1, 1)
+        assert loaded.get_block(40, 40) == BlockType.GRASS
+    finally:
+        prefetcher.close()
+
+def test_process_pool(world):
+    prefetcher = ChunkPrefetcher(world, processes=True, workers=1)
+    prefetcher.request(-2, 1)
+    finish(prefetcher)
+    assert np.array_equal(world.get_chunk(-2, 1).blocks, world.generate_chunk(-2, 1))
+
+def test_dense_world_is_rejected():
+    with pytest.raises(ValueError):
+        ChunkPrefetcher(World(width=10, height=10))
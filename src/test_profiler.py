@@ -0,0 +1,110 @@
+import csv
+import json
+import time
+
+import pygame
+from profiler import Profiler, NULL_SCOPE, OVERLAY_REFRESH
+from game import Game
+from world import World
+
+def test_scopes_and_counters_per_frame():
+    profiler = Profiler(enabled=True)
+    for frame in range(3):
+        with profiler.scope('work'):
+            time.sleep(0.002)
+        with profiler.scope('work'):
+            pass
+        profiler.count('things', frame)
+        profiler.end_frame()
+    assert len(profiler.history) == 3
+    assert [record['frame'] for record in profiler.history] == [0, 1, 2]
+    assert all(2 <= record['work'] <= record['frame_ms'] for record in profiler.history)
+    assert profiler.values('things').tolist() == [0, 1, 2]
+    p50, p95, p99 = profiler.percentiles('work')
+    assert 2 <= p50 <= p95 <= p99
+
+def test_disabled_profiler_records_nothing():
+    profiler = Profiler()
+    assert profiler.scope('work') is NULL_SCOPE
+    with profiler.scope('work'):
+        profiler.count('things')
+    profiler.end_frame()
+    assert len(profiler.history) == 0
+    assert profiler.percentiles('work') == (0.0, 0.0, 0.0)
+
+def test_count_calls_only_while_enabled():
+    world = World(20, 20, seed=1)
+    profiler = Profiler()
+    profiler.count_calls(world, 'is_solid')
+    # Nothing wrapped while disabled
+    assert 'is_solid' not in world.__dict__
+
+    profiler.enable()
+    for x in range(5):
+        world.is_solid(x, 0)
+    profiler.end_frame()
+    assert profiler.history[-1]['is_solid calls'] == 5
+    assert world.is_solid(0, 19) == World.is_solid(world, 0, 19)
+
+    profiler.disable()
+    assert 'is_solid' not in world.__dict__
+
+def test_export(tmp_path):
+    profiler = Profiler(enabled=True)
+    for frame in range(4):
+        with profiler.scope('a'):
+            pass
+        if frame % 2:
+            profiler.count('odd')
+        profiler.end_frame()
+
+    profiler.export(str(tmp_path / 'trace.csv'))
+    with open(tmp_path / 'trace.csv') as file:
+        rows = list(csv.DictReader(file))
+    assert len(rows) == 4
+    assert [row['odd'] for row in rows] == ['0', '1', '0', '1']
+
+    profiler.export(str(tmp_path / 'trace.json'))
+    trace = json.loads((tmp_path / 'trace.json').read_text())
+    assert len(trace['frames']) == 4
+    assert set(trace['summary']) == {'frame_ms', 'a', 'odd'}
+    assert trace['summary']['odd']['max'] == 1
+
+def test_overlay_refreshes_its_table_a_few_times_a_second():
+    pygame.init()
+    screen = pygame.Surface((400, 300))
+    profiler = Profiler(enabled=True)
+    for _ in range(10):
+        with profiler.scope('work'):
+            pass
+        profiler.end_frame()
+    profiler.render(screen)
+    panel, table = profiler._panel, profiler._table
+    assert len(table) == 4 * 3  # Header, frame_ms and work rows of 4 columns
+    # Drawn again straight away from the same surface and text
+    profiler.end_frame()
+    profiler.render(screen)
+    assert profiler._panel is panel and profiler._table is table
+    profiler._table_time -= OVERLAY_REFRESH
+    profiler.render(screen)
+    assert profiler._table is not table
+
+def test_game_profiling():
+    game = Game(headless=True, profile=True)
+    game.run_headless(120)
+    assert len(game.profiler.history) == 120
+    names = game.profiler.names()
+    assert {'update', 'player', 'any_solid calls'} <= set(names)
+
+    game.profiler.show_overlay = True
+    game.use_tile_cache = False
+    # Bring the surface into view
+    game.camera.y = game.world.SURFACE_LEVEL * 32 - 300
+    game.render()
+    assert game.profiler.times['tiles'] > 0
+    assert game.profiler.counters['tiles drawn'] > 0
+
+    game.profiler.toggle()
+    assert not game.profiler.enabled and not game.profiler.show_overlay
+    game.run_headless(5)
+    assert len(game.profiler.history) == 120
@@ -0,0 +1,64 @@
+import pytest
+import numpy as np
+import pygame
+from blocks import COLORS
+from rasterizer import TileRasterizer
+from world import World, BlockType
+
+BLOCK_COLORS = {block_type: tuple(COLORS[block_type.value].tolist()) for block_type in BlockType}
+
+class MockCamera:
+    def __init__(self, x=0, y=0):
+        self.x = x
+        self.y = y
+
+def draw_reference(surface, tiles, block_size, offset=(0, 0)):
+    """Draw tiles the old way, with two pygame.draw.rect calls per block"""
+    surface.fill(BLOCK_COLORS[BlockType.AIR])
+    for y in range(tiles.shape[0]):
+        for x in range(tiles.shape[1]):
+            block_type = BlockType(tiles[y, x])
+            if block_type != BlockType.AIR:
+                rect = pygame.Rect(x * block_size - offset[0], y * block_size - offset[1],
+                                   block_size, block_size)
+                pygame.draw.rect(surface, BLOCK_COLORS[block_type], rect)
+                pygame.draw.rect(surface, (0, 0, 0), rect, 1)
+
+def test_rasterize_matches_draw_rect():
+    world = World(width=40, height=40, seed=3)
+    tiles = world.get_region(0, 10, 20, 30)
+    rasterizer = TileRasterizer(BLOCK_COLORS, 8)
+    pixels = rasterizer.rasterize(tiles)
+    assert pixels.shape == (160, 160, 3)
+    
+    reference = pygame.Surface((160, 160))
+    draw_reference(reference, tiles, 8)
+    assert np.array_equal(pixels, pygame.surfarray.array3d(reference))
+
+def test_rasterize_without_outlines():
+    tiles = np.array([[BlockType.STONE.value, BlockType.AIR.value]], dtype=np.int8)
+    pixels = TileRasterizer(BLOCK_COLORS, 4).rasterize(tiles, outlines=False)
+    assert pixels.shape == (8, 4, 3)
+    assert np.all(pixels[:4] == BLOCK_COLORS[BlockType.STONE])
+    assert np.all(pixels[4:] == BLOCK_COLORS[BlockType.AIR])
+
+def test_render_view_matches_draw_rect():
+    world = World(width=100, height=100, seed=3)
+    rasterizer = TileRasterizer(BLOCK_COLORS, 32)
+    camera = MockCamera(1000.7, 1390.2)
+    surface = pygame.Surface((800, 600))
+    rasterizer.render_view(surface, world, camera)
+    
+    reference = pygame.Surface((800, 600))
+    x0, y0 = 1000 // 32, 1390 // 32
+    tiles = world.get_region(x0, y0, x0 + 27, y0 + 20)
+    draw_reference(reference, tiles, 32, (1000 - x0 * 32, 1390 - y0 * 32))
+    assert np.array_equal(pygame.surfarray.array3d(surface), pygame.surfarray.array3d(reference))
+
+def test_minimap():
+    world = World(width=100, height=60, seed=3)
+    rasterizer = TileRasterizer(BLOCK_COLORS, 1)
+    minimap = rasterizer.minimap(world.blocks, step=2)
+    assert minimap.get_size() == (50, 30)
+    block_type = BlockType(world.blocks[40, 10])
+    assert minimap.get_at((5, 20))[:3] == BLOCK_COLORS[block_type]
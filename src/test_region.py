@@ -0,0 +1,93 @@
+import os
+import pytest
+import numpy as np
+import region
+from chunks import CHUNK_SIZE
+from world import World, BlockType
+
+@pytest.mark.parametrize('codec', sorted(region.CODECS))
+def test_chunk_codec_round_trip(codec):
+    world = World(width=64, height=64, seed=13)
+    blocks = np.ascontiguousarray(world.blocks[16:16 + CHUNK_SIZE, 0:CHUNK_SIZE])
+    data = region.compress_chunk(blocks, codec)
+    restored = region.decompress_chunk(data, codec)
+    assert np.array_equal(restored, blocks)
+    restored[0, 0] = 1  # Must be writable
+
+def test_rle_compresses_uniform_chunks():
+    blocks = np.full((CHUNK_SIZE, CHUNK_SIZE), BlockType.STONE.value, dtype=np.int8)
+    data = region.rle_encode(blocks)
+    assert len(data) == 3  # A single run
+    assert np.array_equal(region.rle_decode(data).reshape(blocks.shape), blocks)
+
+def test_unknown_codec():
+    with pytest.raises(ValueError):
+        region.compress_chunk(np.zeros((CHUNK_SIZE, CHUNK_SIZE), dtype=np.int8), 'brotli')
+
+@pytest.mark.parametrize('codec', ['zlib', 'lzma', 'rle'])
+def test_dense_world_region_round_trip(tmp_path, codec):
+    directory = tmp_path / 'world'
+    world = World(width=600, height=100, seed=17)
+    world.set_block(599, 99, BlockType.GRASS)
+    world.save(directory, codec=codec)
+    
+    # 600 blocks wide is 19 chunks, so two regions across
+    assert sorted(region.RegionStore(directory).region_keys()) == [(0, 0), (1, 0)]
+    
+    loaded = World.load(directory)
+    assert not loaded.chunked
+    assert np.array_equal(loaded.blocks, world.blocks)
+
+def test_single_chunk_read(tmp_path):
+    directory = tmp_path / 'world'
+    world = World(width=256, height=256, seed=2)
+    world.save(directory, codec='zlib')
+    
+    store = region.RegionStore(directory)
+    assert (3, 5) in store
+    assert (100, 100) not in store
+    assert np.array_equal(store.read((3, 5)), world.blocks[160:192, 96:128])
+
+def test_chunked_world_regions_and_incremental_save(tmp_path):
+    directory = tmp_path / 'world'
+    world = World(width=None, height=None, seed=5, chunked=True)
+    world.set_block(10, 10, BlockType.STONE)
+    world.set_block(5000, -40, BlockType.DIRT)
+    world.save(directory, codec='rle')
+    assert sorted(region.RegionStore(directory).keys()) == [(0, 0), (156, -2)]
+    
+    loaded = World.load(directory)
+    assert loaded.chunked
+    assert loaded.get_block(5000, -40) == BlockType.DIRT
+    
+    # Only the region holding the edit is rewritten
+    far_region = region.RegionStore(directory).region_path(*region.region_of(156, -2))
+    before = os.stat(far_region).st_mtime_ns
+    os.utime(far_region, ns=(before - 10**9, before - 10**9))
+    loaded.set_block(11, 10, BlockType.STONE)
+    loaded.save(directory, codec='rle')
+    assert os.stat(far_region).st_mtime_ns == before - 10**9
+    
+    reloaded = World.load(directory)
+    assert reloaded.get_block(10, 10) == BlockType.STONE
+    assert reloaded.get_block(11, 10) == BlockType.STONE
+    assert reloaded.get_block(5000, -40) == BlockType.DIRT
+
+@pytest.mark.parametrize('chunked', [False, True])
+def test_loaded_regions_save_back_without_a_codec(tmp_path, chunked):
+    directory = str(tmp_path / 'world')
+    world = World(200, 100, seed=4, chunked=chunked)
+    world.set_block(20, 30, BlockType.STONE)
+    world.save(directory, codec='lzma')
+
+    loaded = World.load(directory)
+    assert loaded.save_codec == 'lzma'
+    loaded.set_block(21, 30, BlockType.DIRT)
+    loaded.save(directory)  # As Game does on exit
+    assert os.path.isdir(directory)
+    assert region.RegionStore(directory).codec() == 'lzma'
+
+    reloaded = World.load(directory)
+    assert reloaded.chunked == chunked
+    assert reloaded.get_block(20, 30) == BlockType.STONE
+    assert reloaded.get_block(21, 30) == BlockType.DIRT
@@ -0,0 +1,81 @@
+import pytest
+import pygame
+from blocks import COLORS
+from game import Game
+from renderer import ChunkRenderer, SURFACE_TILES
+from world import World, BlockType
+
+BLOCK_COLORS = {block_type: tuple(COLORS[block_type.value].tolist()) for block_type in BlockType}
+
+class MockCamera:
+    def __init__(self, x=0, y=0):
+        self.x = x
+        self.y = y
+
+def test_cached_render_matches_direct_render():
+    game = Game()
+    game.camera.x = 1234.6
+    game.camera.y = 1456.2
+    
+    game.screen.fill(game.BLOCK_COLORS[BlockType.AIR])
+    game.render_blocks()
+    direct = pygame.image.tostring(game.screen, 'RGB')
+    
+    game.screen.fill(game.BLOCK_COLORS[BlockType.AIR])
+    game.tile_renderer.render(game.screen, game.camera)
+    cached = pygame.image.tostring(game.screen, 'RGB')
+    assert cached == direct
+
+def test_surfaces_are_reused_between_frames():
+    world = World(width=100, height=100, seed=1)
+    renderer = ChunkRenderer(world, BLOCK_COLORS)
+    screen = pygame.Surface((800, 600))
+    camera = MockCamera(600, 1500)
+    
+    renderer.render(screen, camera)
+    builds = renderer.builds
+    assert builds > 0
+    renderer.render(screen, camera)
+    assert renderer.builds == builds
+
+def test_set_block_invalidates_only_its_section():
+    world = World(width=100, height=100, seed=1)
+    renderer = ChunkRenderer(world, BLOCK_COLORS)
+    screen = pygame.Surface((800, 600))
+    camera = MockCamera(0, 1400)
+    renderer.render(screen, camera)
+    sections = set(renderer.surfaces)
+    
+    builds = renderer.builds
+    world.set_block(3, 50, BlockType.AIR)
+    renderer.sync()
+    assert renderer.stale == {(0, 50 // SURFACE_TILES)}
+    
+    renderer.render(screen, camera)
+    assert renderer.builds == builds + 1
+    assert set(renderer.surfaces) == sections
+    assert not renderer.stale
+    # The broken block is now drawn as sky
+    assert screen.get_at((3 * 32 + 16, 50 * 32 - 1400 + 16))[:3] == BLOCK_COLORS[BlockType.AIR]
+
+def test_surface_cache_is_bounded():
+    world = World(width=None, height=None, seed=1, chunked=True)
+    renderer = ChunkRenderer(world, BLOCK_COLORS, max_surfaces=4)
+    screen = pygame.Surface((800, 600))
+    for x in range(0, 20000, 500):
+        renderer.render(screen, MockCamera(x, 1400))
+    assert len(renderer.surfaces) == 4
+
+def test_renderer_catches_up_after_journal_is_trimmed():
+    world = World(width=100, height=100, seed=1)
+    world.journal.max_length = 8
+    renderer = ChunkRenderer(world, BLOCK_COLORS)
+    screen = pygame.Surface((800, 600))
+    camera = MockCamera(0, 1400)
+    renderer.render(screen, camera)
+
+    for x in range(20):
+        world.set_block(x, 48, BlockType.STONE)
+    assert world.changes_since(renderer.cursor) is None
+    renderer.sync()
+    assert renderer.stale == set(renderer.surfaces)
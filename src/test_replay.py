@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from pygame.locals import K_a, K_d, K_SPACE
+from game import Game, TORCH, POUR_WATER
+from replay import (Recorder, ReplayMouse, replay, read_replay, state_hash, HEADER,
+                    INPUT_RECORD, ACTION_RECORD, CHECKPOINT_RECORD)
+
+def scripted_input(game, seed):
+    """Input source playing like a person: walking, jumping and clicking near the player"""
+    rng = np.random.default_rng(seed)
+    keys = {K_a: False, K_d: False, K_SPACE: False}
+
+    def next_input():
+        if game.world.tick % 40 == 0:
+            direction = rng.integers(3)
+            keys[K_a], keys[K_d] = direction == 1, direction == 2
+        keys[K_SPACE] = bool(rng.random() < 0.05)
+        buttons, pos = (0, 0, 0), (0, 0)
+        if rng.random() < 0.2:
+            center_x, center_y = game.player.center_position
+            offset_x, offset_y = rng.integers(-96, 97, size=2)
+            pos = (int(center_x + offset_x - game.camera.x), int(center_y + offset_y - game.camera.y))
+            buttons = (1, 0, 0) if rng.random() < 0.5 else (0, 0, 1)
+        return keys, ReplayMouse(buttons, pos), game.camera
+    return next_input
+
+def record_session(path, ticks=400, seed=7):
+    game = Game(headless=True, seed=seed)
+    recorder = Recorder(game, str(path))
+    game.input_source = scripted_input(game, seed)
+    for tick in range(ticks):
+        if tick == 100:
+            game.queue_action(TORCH, 400, 300)
+        if tick == 150:
+            game.queue_action(POUR_WATER, 420, 280)
+        game.update()
+    recorder.close()
+    return game
+
+def test_replay_matches_the_session(tmp_path):
+    path = tmp_path / 'session.rpl'
+    original = record_session(path)
+    assert original.recorder is None
+
+    result = replay(str(path))
+    assert result['ticks'] == 400
+    assert result['checkpoints'] == 400 // 60
+    assert result['diverged_at'] is None
+    game = result['game']
+    assert (game.player.x, game.player.y) == (original.player.x, original.player.y)
+    assert np.array_equal(game.world.blocks, original.world.blocks)
+    assert np.array_equal(game.liquids.level, original.liquids.level)
+    assert game.lighting.sources == original.lighting.sources
+    assert state_hash(game) == state_hash(original)
+    # The session actually changed the world
+    assert original.world.journal.cursor > 0
+
+def test_divergence_is_detected(tmp_path):
+    path = tmp_path / 'session.rpl'
+    record_session(path, ticks=200)
+    header, records = read_replay(str(path))
+    kinds = [record[0] for record in records]
+    assert {INPUT_RECORD, ACTION_RECORD, CHECKPOINT_RECORD} <= set(kinds)
+
+    # Corrupt the hash of the second checkpoint
+    data = bytearray(path.read_bytes())
+    end = data.rfind(records[[i for i, kind in enumerate(kinds) if kind == CHECKPOINT_RECORD][1]][2])
+    data[end] ^= 0xFF
+    path.write_bytes(bytes(data))
+    result = replay(str(path))
+    assert result['diverged_at'] == 120
+    assert result['ticks'] == 120
+
+def test_held_input_is_compact(tmp_path):
+    path = tmp_path / 'idle.rpl'
+    game = Game(headless=True, seed=1)
+    recorder = Recorder(game, str(path), checkpoint_interval=10000)
+    game.run_headless(5000)
+    recorder.close()
+    header, records = read_replay(str(path))
+    assert header['seed'] == 1 and header['width'] == 100
+    assert [record[1] for record in records] == [5000]
+    assert path.stat().st_size == HEADER.size + 4
+
+def test_recording_needs_a_fresh_world(tmp_path):
+    game = Game(headless=True, seed=1)
+    game.run_headless(1)
+    with pytest.raises(ValueError):
+        Recorder(game, str(tmp_path / 'late.rpl'))
+
+    (tmp_path / 'junk.rpl').write_bytes(b'not a replay at all, no' * 3)
+    with pytest.raises(ValueError):
+        read_replay(str(tmp_path / 'junk.rpl'))
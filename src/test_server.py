@@ -0,0 +1,186 @@
+import asyncio
+import pytest
+import numpy as np
+import protocol
+from chunks import CHUNK_SIZE
+from client import GameClient
+from server import GameServer
+from world import World, BlockType
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+async def start(world, clients=1, **options):
+    server = GameServer(world, **options)
+    await server.start()
+    connected = []
+    for _ in range(clients):
+        client = GameClient()
+        await client.connect('127.0.0.1', server.port)
+        connected.append(client)
+    # Let the server accept the connections
+    while len(server.clients) < clients:
+        await asyncio.sleep(0.001)
+    return server, connected
+
+async def tick(server, clients):
+    server.step()
+    await server.flush()
+    for client in clients:
+        await client.read_tick()
+
+def test_protocol_round_trip():
+    assert protocol.decode_hello(protocol.encode_hello(3, None, 200, 2**40, 60, 32)[5:]) == {
+        'client_id': 3, 'width': None, 'height': 200, 'seed': 2**40,
+        'tick_rate': 60, 'chunk_size': 32}
+    # Ids keep counting up past 16 bits on a long-running server
+    assert protocol.decode_hello(protocol.encode_hello(70000, 10, 10, 1, 60, 32)[5:])['client_id'] == 70000
+    records = np.array([(70000, -3, 8)], dtype=protocol.ENTITY_DTYPE)
+    assert protocol.decode_entities(protocol.encode_entities(9, records)[5:])[1].tolist() == [(70000, -3, 8)]
+    assert protocol.decode_remove(protocol.encode_remove([70000])[5:]).tolist() == [70000]
+    message = protocol.decode_input(protocol.encode_input(
+        7, right=True, jump=True, action=protocol.ACTION_PLACE, target=(-4, 9))[5:])
+    assert message == {'sequence': 7, 'left': False, 'right': True, 'jump': True,
+                       'action': protocol.ACTION_PLACE, 'target': (-4, 9)}
+    blocks = np.arange(CHUNK_SIZE * CHUNK_SIZE).reshape(CHUNK_SIZE, CHUNK_SIZE).astype(np.int8)
+    cx, cy, decoded = protocol.decode_chunk(protocol.encode_chunk(-1, 5, blocks)[5:])
+    assert (cx, cy) == (-1, 5)
+    assert np.array_equal(decoded, blocks)
+
+def test_client_receives_chunks_in_view():
+    async def scenario():
+        world = World(200, 100, seed=1)
+        server, (client,) = await start(world, margin=0)
+        await tick(server, [client])
+        assert client.id == 0
+        assert client.info['width'] == 200
+        # The player spawns at x = 3200 of a 7x4 chunk world, so an 800 px
+        # view centered on it spans chunks 2 and 3
+        assert set(client.chunks) == {(2, 0), (3, 0)}
+        for (cx, cy), blocks in client.chunks.items():
+            expected = world.get_region(cx * CHUNK_SIZE, cy * CHUNK_SIZE,
+                                        (cx + 1) * CHUNK_SIZE, (cy + 1) * CHUNK_SIZE)
+            assert np.array_equal(blocks, expected)
+        assert client.position == (server.clients[0].player.x, server.clients[0].player.y)
+        await client.close()
+        await server.close()
+    run(scenario())
+
+def test_block_changes_are_sent_as_deltas():
+    async def scenario():
+        world = World(200, 100, seed=1)
+        server, (client,) = await start(world)
+        await tick(server, [client])
+        received = client.bytes_received
+
+        world.set_block(100, 60, BlockType.STONE)
+        world.set_block(5, 5, BlockType.STONE)  # Not in view
+        await tick(server, [client])
+        assert client.get_block(100, 60) == BlockType.STONE.value
+        assert client.get_block(5, 5) is None
+        # A block change and the tick's player update, far less than a chunk
+        assert client.bytes_received - received < 64
+        await client.close()
+        await server.close()
+    run(scenario())
+
+def test_input_moves_player_and_breaks_blocks():
+    async def scenario():
+        world = World(200, 100, seed=1)
+        server, (client,) = await start(world)
+        # Fall to the ground
+        for _ in range(300):
+            await tick(server, [client])
+        x, y = client.position
+        target = (x // 32, (y + 40) // 32)  # Block under the player
+        assert world.get_block(*target) != BlockType.AIR
+
+        client.send_input(right=True, action=protocol.ACTION_BREAK, target=target)
+        await client.drain()
+        while server.clients[0].input is None:
+            await asyncio.sleep(0.001)
+        await tick(server, [client])
+        assert world.get_block(*target) == BlockType.AIR
+        await tick(server, [client])
+        assert client.get_block(*target) == BlockType.AIR.value
+        assert client.position[0] > x
+        await client.close()
+        await server.close()
+    run(scenario())
+
+def test_players_see_each_other_and_leave():
+    async def scenario():
+        world = World(200, 100, seed=1)
+        server, clients = await start(world, clients=2)
+        await tick(server, clients)
+        assert set(clients[0].players) == {0, 1}
+        assert set(clients[1].players) == {0, 1}
+
+        # Positions are only resent when they change
+        for _ in range(300):
+            await tick(server, clients)
+        received = clients[0].bytes_received
+        await tick(server, clients)
+        assert clients[0].bytes_received - received == protocol.FRAME.size + protocol.ENTITIES_HEADER.size
+
+        await clients[1].close()
+        while len(server.clients) > 1:
+            await asyncio.sleep(0.001)
+        await tick(server, clients[:1])
+        assert set(clients[0].players) == {0}
+        await clients[0].close()
+        await server.close()
+    run(scenario())
+
+class Sink:
+    """Stream writer that keeps what is written"""
+    def __init__(self):
+        self.data = bytearray()
+
+    def write(self, data):
+        self.data += data
+
+    def close(self):
+        pass
+
+def test_malformed_input_drops_only_its_client():
+    with pytest.raises(ValueError):
+        protocol.decode_input(b'\0' * 3)
+
+    async def scenario():
+        server = GameServer(World(200, 100, seed=1))
+        other = server.add_client(Sink())
+        reader = asyncio.StreamReader()
+        # An input frame cut short after the sequence number
+        reader.feed_data(protocol.frame(protocol.MSG_INPUT, protocol.encode_input(1)[5:9]))
+        # Returns instead of raising, having dropped the client
+        await asyncio.wait_for(server.handle_connection(reader, Sink()), 1)
+        assert list(server.clients.values()) == [other]
+    run(scenario())
+
+def test_chunks_unload_out_of_view():
+    async def scenario():
+        world = World(1000, 100, seed=1)
+        server, (client,) = await start(world)
+        await tick(server, [client])
+        before = set(client.chunks)
+        server.clients[0].player.x = 30000
+        await tick(server, [client])
+        assert (29, 0) in client.chunks
+        assert not before & set(client.chunks)
+        assert set(client.chunks) == server.interest.area(0)
+        await client.close()
+        await server.close()
+    run(scenario())
+
+def test_run_at_tick_rate():
+    async def scenario():
+        world = World(100, 100, seed=1)
+        server, (client,) = await start(world, tick_rate=100)
+        await server.run(ticks=5)
+        for _ in range(5):
+            await client.read_tick()
+        assert client.tick == server.tick == 5
+        await client.close()
+        await server.close()
+    run(scenario())
@@ -0,0 +1,42 @@
+import pytest
+from pygame.locals import K_a, K_d, K_SPACE
+from simulate import Simulation, ScriptedMouse, make_keys, run_simulation, run_batch, SCRIPTS
+
+def test_scripted_mouse():
+    mouse = ScriptedMouse((1, 0, 0), (10, 20))
+    assert mouse.get_pressed() == (1, 0, 0)
+    assert mouse.get_pos() == (10, 20)
+    assert make_keys(right=True) == {K_a: False, K_d: True, K_SPACE: False}
+
+def test_simulation_is_deterministic():
+    first = Simulation(seed=42, script='random')
+    second = Simulation(seed=42, script='random')
+    first.run(300)
+    second.run(300)
+    assert first.state() == second.state()
+    assert (first.world.blocks == second.world.blocks).all()
+
+@pytest.mark.parametrize('script', sorted(SCRIPTS))
+def test_scripts_run(script):
+    simulation = Simulation(seed=1, script=script)
+    simulation.run(120)
+    assert simulation.tick == 120
+
+def test_walk_script_moves_right():
+    simulation = Simulation(seed=1, script='walk')
+    start_x = simulation.player.x
+    simulation.run(120)
+    assert simulation.player.x > start_x
+
+def test_run_simulation_reports_speed():
+    result = run_simulation(seed=3, ticks=100)
+    assert result['ticks'] == 100
+    assert result['ticks_per_second'] > 0
+
+def test_run_batch():
+    batch = run_batch(count=4, ticks=50, workers=2, script='walk')
+    assert len(batch['results']) == 4
+    assert [result['seed'] for result in batch['results']] == [0, 1, 2, 3]
+    assert 1 <= len(batch['workers']) <= 2
+    assert sum(worker['ticks'] for worker in batch['workers'].values()) == 200
+    assert batch['ticks_per_second'] > 0
@@ -0,0 +1,97 @@
+import pytest
+import numpy as np
+import storage
+from chunks import CHUNK_BYTES, CHUNK_SIZE
+from world import World, BlockType
+
+def test_dense_save_and_load(tmp_path):
+    path = tmp_path / 'world.twld'
+    world = World(width=70, height=50, seed=21)
+    world.set_block(3, 4, BlockType.STONE)
+    world.save(path)
+    
+    loaded = World.load(path)
+    assert isinstance(loaded.blocks, np.memmap)
+    assert (loaded.width, loaded.height, loaded.seed) == (70, 50, 21)
+    assert np.array_equal(loaded.blocks, world.blocks)
+    assert loaded.get_block(3, 4) == BlockType.STONE
+    assert path.stat().st_size == storage.HEADER_SIZE + 70 * 50
+
+def test_loaded_world_edits_do_not_touch_file_until_saved(tmp_path):
+    path = tmp_path / 'world.twld'
+    World(width=40, height=40, seed=1).save(path)
+    
+    loaded = World.load(path)
+    loaded.set_block(0, 0, BlockType.STONE)
+    assert World.load(path).get_block(0, 0) == BlockType.AIR
+    
+    loaded.save(path)
+    assert World.load(path).get_block(0, 0) == BlockType.STONE
+
+def test_dense_save_only_rewrites_dirty_chunks(tmp_path, monkeypatch):
+    path = tmp_path / 'world.twld'
+    world = World(width=100, height=100, seed=4)
+    world.save(path)
+    assert not world.dirty_chunks
+    
+    world.set_block(40, 70, BlockType.GRASS)
+    assert world.dirty_chunks == {(1, 2)}
+    
+    # Tamper with a clean region on disk; an incremental save must leave it alone
+    target = np.memmap(path, dtype=np.int8, mode='r+', offset=storage.HEADER_SIZE, shape=(100, 100))
+    target[0, 0] = BlockType.STONE.value
+    target.flush()
+    del target
+    
+    world.save(path)
+    loaded = World.load(path)
+    assert loaded.get_block(40, 70) == BlockType.GRASS
+    assert loaded.get_block(0, 0) == BlockType.STONE
+
+def test_chunked_save_stores_only_modified_chunks(tmp_path):
+    path = tmp_path / 'world.twld'
+    world = World(width=None, height=None, seed=8, chunked=True)
+    for x in range(0, 10 * CHUNK_SIZE, CHUNK_SIZE):
+        world.get_block(x, 0)
+    world.set_block(5, 5, BlockType.STONE)
+    world.set_block(-100, 200, BlockType.GRASS)
+    world.save(path)
+    
+    header = storage.read_header(path)
+    assert header.layout == storage.LAYOUT_CHUNKED
+    assert header.width is None and header.height is None
+    assert header.chunk_count == 2
+    
+    loaded = World.load(path)
+    assert loaded.chunked
+    assert len(loaded.chunks) == 0
+    assert loaded.get_block(5, 5) == BlockType.STONE
+    assert loaded.get_block(-100, 200) == BlockType.GRASS
+    # Unsaved chunks are regenerated from the seed
+    assert np.array_equal(loaded.get_chunk(7, 3).blocks, world.get_chunk(7, 3).blocks)
+
+def test_chunked_incremental_save(tmp_path):
+    path = tmp_path / 'world.twld'
+    world = World(width=None, height=None, seed=8, chunked=True)
+    world.set_block(1, 1, BlockType.STONE)
+    world.save(path)
+    
+    loaded = World.load(path, memory_budget=2 * CHUNK_BYTES)
+    loaded.set_block(1, 2, BlockType.STONE)  # Existing chunk, rewritten in place
+    loaded.set_block(500, 2, BlockType.GRASS)  # New chunk, appended
+    # Touch enough chunks to push the edits out to the spill file
+    for x in range(0, 5 * CHUNK_SIZE, CHUNK_SIZE):
+        loaded.get_block(x, 1000)
+    loaded.save(path)
+    assert storage.read_header(path).chunk_count == 2
+    
+    reloaded = World.load(path)
+    assert reloaded.get_block(1, 1) == BlockType.STONE
+    assert reloaded.get_block(1, 2) == BlockType.STONE
+    assert reloaded.get_block(500, 2) == BlockType.GRASS
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / 'not_a_world'
+    path.write_bytes(b'x' * 100)
+    with pytest.raises(ValueError):
+        World.load(path)
@@ -0,0 +1,52 @@
+import pytest
+from timestep import FixedTimestep
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def test_first_call_starts_the_clock():
+    clock = FakeClock()
+    timestep = FixedTimestep(60, clock=clock)
+    clock.now = 100.0
+    assert timestep.advance() == 0
+
+def test_ticks_follow_elapsed_time():
+    clock = FakeClock()
+    timestep = FixedTimestep(50, clock=clock)
+    timestep.advance()
+    
+    clock.now = 0.05  # Two and a half ticks
+    assert timestep.advance() == 2
+    assert timestep.alpha == pytest.approx(0.5)
+    
+    clock.now = 0.07  # The leftover half tick carries over
+    assert timestep.advance() == 1
+    assert timestep.ticks == 3
+
+def test_slow_frames_do_not_slow_the_simulation():
+    clock = FakeClock()
+    timestep = FixedTimestep(60, clock=clock)
+    timestep.advance()
+    # Rendering at 20 FPS still simulates 60 ticks per second
+    ticks = 0
+    for frame in range(1, 21):
+        clock.now = frame / 20
+        ticks += timestep.advance()
+    assert ticks == pytest.approx(60, abs=1)
+
+def test_catch_up_is_limited():
+    clock = FakeClock()
+    timestep = FixedTimestep(10, max_catch_up=3, clock=clock)
+    timestep.advance()
+    
+    clock.now = 1.05  # A one second stall
+    assert timestep.advance() == 3
+    assert timestep.alpha == pytest.approx(0.5)
+    assert timestep.dropped_time == pytest.approx(0.7)
+    
+    clock.now = 1.15
+    assert timestep.advance() == 1
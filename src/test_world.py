@@ -1,6 +1,6 @@
 import pytest
 import numpy as np
-from world import World, BlockType
+from world import World, BlockType, CHUNK_SIZE
 
 def test_world_initialization():
     world = World(width=100, height=100)
@@ -22,14 +22,15 @@ def test_block_setting_and_getting():
 def test_terrain_generation():
     world = World(width=50, height=50)
     
-    # Test that surface level has some grass blocks
-    grass_count = np.sum(world.blocks == BlockType.GRASS.value)
-    assert grass_count > 0
+    # Test that surface level has some grass, sand or snow blocks
+    top_count = np.sum(np.isin(world.blocks, (BlockType.GRASS.value, BlockType.SAND.value,
+                                              BlockType.SNOW.value)))
+    assert top_count > 0
     
-    # Test that there are both dirt and stone blocks
-    dirt_count = np.sum(world.blocks == BlockType.DIRT.value)
+    # Test that there are both soil and stone blocks
+    soil_count = np.sum(np.isin(world.blocks, (BlockType.DIRT.value, BlockType.SAND.value)))
     stone_count = np.sum(world.blocks == BlockType.STONE.value)
-    assert dirt_count > 0
+    assert soil_count > 0
     assert stone_count > 0
     
     # Test that top portion is mostly air
@@ -54,4 +55,208 @@ def test_solid_blocks():
     
     # Grass is solid
     world.set_block(3, 3, BlockType.GRASS)
-    assert world.is_solid(3, 3)
\ No newline at end of file
+    assert world.is_solid(3, 3)
+
+def test_terrain_is_reproducible_from_seed():
+    world_a = World(width=60, height=40, seed=1234)
+    world_b = World(width=60, height=40, seed=1234)
+    assert world_a.seed == 1234
+    assert np.array_equal(world_a.blocks, world_b.blocks)
+    
+    # A different seed changes the stone layout
+    world_c = World(width=60, height=40, seed=4321)
+    assert not np.array_equal(world_a.blocks, world_c.blocks)
+
+def test_terrain_layers():
+    world = World(width=80, height=60, seed=7)
+    tops = (BlockType.GRASS.value, BlockType.SAND.value, BlockType.SNOW.value)
+    soils = (BlockType.DIRT.value, BlockType.SAND.value)
+    underground = (BlockType.AIR.value, BlockType.STONE.value,
+                   BlockType.COAL_ORE.value, BlockType.IRON_ORE.value)
+    for x in range(world.width):
+        column = world.blocks[:, x]
+        top = np.flatnonzero(column)[0]
+        assert abs(top + 1 - world.SURFACE_LEVEL) <= 8
+        
+        # Air above a top block, then at least three layers of soil
+        assert column[top] in tops
+        assert np.all(np.isin(column[top + 1:top + 4], soils))
+        
+        # Soil down to the stone, then only stone, ores and caves
+        stone = top + 1 + np.flatnonzero(~np.isin(column[top + 1:], soils))[0]
+        assert np.all(np.isin(column[stone:], underground))
+
+def test_chunked_world_is_lazy():
+    world = World(width=100000, height=100000, seed=3, chunked=True)
+    assert world.blocks is None
+    assert len(world.chunks) == 0
+    
+    # Only the chunk that was touched gets generated
+    world.get_block(50000, 50000)
+    assert len(world.chunks) == 1
+    assert (50000 // CHUNK_SIZE, 50000 // CHUNK_SIZE) in world.chunks
+
+def test_chunked_world_matches_dense_surface():
+    dense = World(width=96, height=64, seed=5)
+    chunked = World(width=96, height=64, seed=5, chunked=True)
+    assert np.array_equal(chunked.get_region(0, 0, 96, 64), dense.blocks)
+
+def test_chunked_world_is_deterministic():
+    world_a = World(width=None, height=None, seed=11, chunked=True)
+    world_b = World(width=None, height=None, seed=11, chunked=True)
+    
+    # Access chunks in different orders
+    coords = [(0, 60), (-500, 70), (1234, 55), (-7, -3)]
+    for x, y in coords:
+        world_a.get_block(x, y)
+    for x, y in reversed(coords):
+        world_b.get_block(x, y)
+    for key, chunk in world_a.chunks.items():
+        assert np.array_equal(chunk.blocks, world_b.chunks[key].blocks)
+
+def test_chunked_block_setting_and_getting():
+    world = World(width=40, height=40, chunked=True)
+    world.set_block(35, 5, BlockType.STONE)
+    assert world.get_block(35, 5) == BlockType.STONE
+    assert world.is_solid(35, 5)
+    assert world.chunks[(1, 0)].is_modified
+    
+    # Out of bounds is air and setting it is ignored
+    world.set_block(40, 5, BlockType.STONE)
+    assert world.get_block(40, 5) == BlockType.AIR
+    assert world.get_block(-1, 5) == BlockType.AIR
+    
+    # Tiles of an edge chunk that fall outside the world are air
+    assert np.all(world.get_chunk(1, 1).blocks[:, 8:] == BlockType.AIR.value)
+
+def test_unbounded_chunked_world():
+    world = World(width=None, height=None, seed=2, chunked=True)
+    # Deep underground is mostly solid in every direction, apart from caves
+    for x in (-10**6, 10**6):
+        column = [world.is_solid(x, world.SURFACE_LEVEL + 100 + y) for y in range(40)]
+        assert sum(column) > 20
+    # High above is air
+    assert not world.is_solid(0, -10**6)
+
+def test_get_region():
+    for world in (World(width=70, height=50, seed=6), World(width=70, height=50, seed=6, chunked=True)):
+        world.set_block(69, 49, BlockType.STONE)
+        region = world.get_region(60, 40, 75, 55)
+        assert region.shape == (15, 15)
+        assert region[9, 9] == BlockType.STONE.value
+        # Outside the world is air
+        assert np.all(region[10:, :] == BlockType.AIR.value)
+        assert np.all(region[:, 10:] == BlockType.AIR.value)
+        
+        for y in range(40, 50):
+            for x in range(60, 70):
+                assert region[y - 40, x - 60] == world.get_block(x, y).value
+    
+    # Spanning many chunks of an unbounded world
+    world = World(width=None, height=None, seed=6, chunked=True)
+    region = world.get_region(-50, 30, 80, 100)
+    for y, x in [(30, -50), (64, 0), (99, 79), (70, -1)]:
+        assert region[y - 30, x + 50] == world.get_block(x, y).value
+
+def test_set_block_records_changes():
+    world = World(width=10, height=10)
+    world.set_block(2, 3, BlockType.AIR)
+    cursor = world.journal.cursor
+    world.set_block(2, 3, BlockType.STONE)
+    world.set_block(20, 3, BlockType.STONE)  # Out of bounds, ignored
+    changes = world.changes_since(cursor)
+    assert list(zip(changes['x'].tolist(), changes['y'].tolist(), changes['new'].tolist())) == [
+        (2, 3, BlockType.STONE.value)]
+
+def test_get_blocks():
+    xs = np.array([-1, 0, 5, 69, 70, 12])
+    ys = np.array([3, 0, 30, 49, 10, 45])
+    for world in (World(width=70, height=50, seed=6), World(width=70, height=50, seed=6, chunked=True)):
+        expected = [world.get_block(x, y).value for x, y in zip(xs, ys)]
+        assert world.get_blocks(xs, ys).tolist() == expected
+        
+        # Broadcasting a column against many rows
+        column = world.get_blocks(12, np.arange(50))
+        assert column.tolist() == [world.get_block(12, y).value for y in range(50)]
+
+def test_solid_map_follows_set_block():
+    for world in (World(width=40, height=40, seed=2), World(width=40, height=40, seed=2, chunked=True)):
+        world.set_block(5, 5, BlockType.STONE)
+        assert world.is_solid(5, 5)
+        world.set_block(5, 5, BlockType.AIR)
+        assert not world.is_solid(5, 5)
+        assert not world.is_solid(-1, 5)
+        assert not world.is_solid(5, 40)
+
+def test_any_solid_matches_is_solid():
+    rng = np.random.default_rng(0)
+    for world in (World(width=70, height=50, seed=4), World(width=70, height=50, seed=4, chunked=True)):
+        for _ in range(200):
+            x0, x1 = sorted(rng.integers(-5, 75, 2))
+            y0, y1 = sorted(rng.integers(-5, 55, 2))
+            expected = any(world.is_solid(x, y)
+                           for y in range(y0, y1 + 1) for x in range(x0, x1 + 1))
+            assert world.any_solid(x0, y0, x1, y1) == expected
+        
+        # Rectangles fully outside the world are never solid
+        assert not world.any_solid(100, 0, 120, 10)
+        assert not world.any_solid(0, -20, 10, -1)
+
+def test_solid_at():
+    world = World(width=30, height=30, seed=1)
+    xs = np.array([-1, 0, 10, 29, 30])
+    ys = np.array([20, 29, 25, 0, 20])
+    assert world.solid_at(xs, ys).tolist() == [world.is_solid(x, y) for x, y in zip(xs, ys)]
+
+def test_loaded_world_has_solid_map(tmp_path):
+    path = tmp_path / 'world.twld'
+    World(width=30, height=30, seed=1).save(path)
+    loaded = World.load(path)
+    assert np.array_equal(loaded.solid.to_array(), loaded.blocks != BlockType.AIR.value)
+
+def test_journal_records_changes():
+    for world in (World(width=40, height=40, seed=2), World(width=40, height=40, seed=2, chunked=True)):
+        cursor = world.journal.cursor
+        old = world.get_block(5, 22)
+        world.tick = 7
+        world.set_block(5, 22, BlockType.AIR)
+        world.set_block(5, 22, BlockType.AIR)  # No change, not recorded
+        world.set_block(5, 3, BlockType.STONE)
+        changes = world.changes_since(cursor)
+        assert changes[['x', 'y', 'old', 'new', 'tick']].tolist() == [
+            (5, 22, old.value, BlockType.AIR.value, 7),
+            (5, 3, BlockType.AIR.value, BlockType.STONE.value, 7),
+        ]
+
+def test_set_blocks():
+    for world in (World(width=70, height=50, seed=6), World(width=70, height=50, seed=6, chunked=True)):
+        reference = World(width=70, height=50, seed=6, chunked=world.chunked)
+        rng = np.random.default_rng(0)
+        xs = rng.integers(-5, 75, 400)
+        ys = rng.integers(-5, 55, 400)
+        values = rng.integers(0, 4, 400)
+        cursor = world.journal.cursor
+        changed = world.set_blocks(xs, ys, values)
+
+        # Same as setting them one by one, last write winning
+        for x, y, value in zip(xs, ys, values):
+            reference.set_block(int(x), int(y), BlockType(int(value)))
+        original = World(width=70, height=50, seed=6, chunked=world.chunked)
+        differing = set()
+        for y in range(50):
+            for x in range(70):
+                assert world.get_block(x, y) == reference.get_block(x, y)
+                assert world.is_solid(x, y) == reference.is_solid(x, y)
+                if world.get_block(x, y) != original.get_block(x, y):
+                    differing.add((x, y))
+
+        # One record per block that ends up different
+        changes = world.changes_since(cursor)
+        assert changed == len(changes) == len(differing)
+        assert set(zip(changes['x'].tolist(), changes['y'].tolist())) == differing
+        assert world.dirty_chunks == {(x // 32, y // 32) for x, y in differing}
+
+    # A single block type for a whole row
+    world = World(width=70, height=50, seed=6)
+    world.set_blocks(np.arange(70), 10, BlockType.STONE)
+    assert all(world.get_block(x, 10) == BlockType.STONE for x in range(70))
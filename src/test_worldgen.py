@@ -0,0 +1,98 @@
+import numpy as np
+from world import World, BlockType, CHUNK_SIZE
+from worldgen import (TerrainGenerator, SurfaceStage, BiomeStage, OreStage,
+                      gradient_noise, fractal_noise, grid_noise, sampled_noise,
+                      DESERT, TUNDRA)
+
+def generate(generator, x0, y0, width, height):
+    blocks = np.empty((height, width), dtype=np.int8)
+    generator.generate(blocks, x0, y0)
+    return blocks
+
+def test_noise_is_smooth_and_bounded():
+    xs = np.linspace(-50, 50, 20001)
+    values = gradient_noise(xs, 0.37, seed=3)
+    assert np.all(np.abs(values) <= 1)
+    assert values.std() > 0.1
+    # Neighbouring samples are close
+    assert np.abs(np.diff(values)).max() < 0.02
+
+    values = fractal_noise(xs, 0.37, seed=3)
+    assert np.all(np.abs(values) <= 1)
+
+def test_noise_depends_on_seed_and_position_only():
+    xs = np.array([0.5, 10.25, -3.75])
+    ys = np.array([1.5, -7.5, 2.0])
+    a = fractal_noise(xs, ys, seed=9)
+    # Same points evaluated in another order and shape
+    b = fractal_noise(xs[::-1, np.newaxis], ys[::-1, np.newaxis], seed=9)[::-1, 0]
+    assert np.array_equal(a, b)
+    assert not np.array_equal(a, fractal_noise(xs, ys, seed=10))
+
+def test_sampled_noise_interpolates_a_fixed_lattice():
+    values = sampled_noise(-10, 3, 40, 30, 32, 16, seed=4, step=4)
+    assert values.shape == (30, 40) and values.dtype == np.float32
+    # Exact at the lattice points, which sit at multiples of step in world space
+    lattice = grid_noise(np.arange(-8, 32, 4) / 32, np.arange(4, 33, 4) / 16, seed=4, octaves=2)
+    assert np.allclose(values[1::4, 2::4], lattice)
+    # Any rectangle agrees with the others where they overlap
+    part = sampled_noise(1, 10, 13, 9, 32, 16, seed=4, step=4)
+    assert np.array_equal(part, values[7:16, 11:24])
+
+def test_regions_match_the_whole():
+    generator = TerrainGenerator(seed=12, surface_level=40)
+    whole = generate(generator, -64, 0, 160, 128)
+    # Any rectangle, generated on its own, matches the same area of a bigger one
+    for x0, y0, width, height in [(-64, 0, 32, 32), (-10, 37, 23, 51), (60, 96, 32, 32)]:
+        part = generate(generator, x0, y0, width, height)
+        assert np.array_equal(part, whole[y0:y0 + height, x0 + 64:x0 + 64 + width])
+
+def test_chunks_match_in_any_order():
+    world_a = World(width=None, height=None, seed=21, chunked=True)
+    world_b = World(width=None, height=None, seed=21, chunked=True)
+    keys = [(cx, cy) for cx in range(-3, 3) for cy in range(0, 4)]
+    for key in keys:
+        world_a.get_chunk(*key)
+    for key in reversed(keys):
+        world_b.get_chunk(*key)
+    for key in keys:
+        assert np.array_equal(world_a.chunks[key].blocks, world_b.chunks[key].blocks)
+
+def test_world_has_caves_and_ores():
+    world = World(width=300, height=200, seed=2)
+    below = world.blocks[world.SURFACE_LEVEL + 20:]
+    assert np.count_nonzero(below == BlockType.AIR.value) > 0.02 * below.size
+    assert np.count_nonzero(below == BlockType.COAL_ORE.value) > 0
+    assert np.count_nonzero(below == BlockType.IRON_ORE.value) > 0
+
+def test_biomes_change_the_surface():
+    generator = TerrainGenerator(seed=5, surface_level=40)
+    # Sample widely spaced columns to cross several biome bands
+    seen = set()
+    for x0 in range(-20000, 20000, 500):
+        blocks = generate(generator, x0, 0, 1, 80)
+        seen.add(int(blocks[np.flatnonzero(blocks[:, 0])[0], 0]))
+    assert {BlockType.GRASS.value, BlockType.SAND.value, BlockType.SNOW.value} <= seen
+
+    biome = BiomeStage(5)
+    surface = SurfaceStage(5, 40)
+    for x0 in range(-20000, 20000, 500):
+        blocks = np.empty((80, 1), dtype=np.int8)
+        region = TerrainGenerator(5, 40, [biome, surface]).generate(blocks, x0, 0)
+        top = blocks[region.surface[0] - 1, 0]
+        if region.biome[0] == DESERT:
+            assert top == BlockType.SAND.value
+        elif region.biome[0] == TUNDRA:
+            assert top == BlockType.SNOW.value
+
+def test_custom_stages():
+    generator = TerrainGenerator(seed=1, surface_level=10, stages=[
+        SurfaceStage(1, 10, amplitude=0),
+        OreStage(1, BlockType.IRON_ORE, min_depth=0, threshold=-1),
+    ])
+    blocks = generate(generator, 0, 0, CHUNK_SIZE, CHUNK_SIZE)
+    assert np.all(blocks[:9] == BlockType.AIR.value)
+    assert np.all(blocks[9] == BlockType.GRASS.value)
+    # Every stone block turned to ore
+    assert not np.any(blocks == BlockType.STONE.value)
+    assert np.any(blocks == BlockType.IRON_ORE.value)
@@ -0,0 +1,48 @@
+import time
+
+class FixedTimestep:
+    """Accumulator that turns elapsed wall-clock time into fixed simulation ticks.
+
+    Each call to advance() adds the time since the previous call and returns
+    how many whole ticks are due. At most max_catch_up ticks are returned per
+    call; time beyond that is dropped so a long stall slows the game down
+    instead of freezing it while it catches up. alpha is the fraction of a
+    tick left over, for interpolating rendered positions between ticks.
+    """
+
+    def __init__(self, tick_rate=60, max_catch_up=5, clock=time.perf_counter):
+        self.tick_rate = tick_rate
+        self.dt = 1.0 / tick_rate
+        self.max_catch_up = max_catch_up
+        self.clock = clock
+        self.accumulator = 0.0
+        self.last_time = None
+        self.ticks = 0  # Total ticks handed out
+        self.dropped_time = 0.0  # Seconds discarded by the catch-up limit
+
+    def reset(self):
+        self.accumulator = 0.0
+        self.last_time = None
+
+    def advance(self):
+        """Return the number of ticks to simulate now"""
+        now = self.clock()
+        if self.last_time is not None:
+            self.accumulator += now - self.last_time
+        self.last_time = now
+
+        ticks = int(self.accumulator / self.dt)
+        if ticks > self.max_catch_up:
+            ticks = self.max_catch_up
+            # Keep only the fraction of a tick for interpolation
+            leftover = self.accumulator - ticks * self.dt
+            self.dropped_time += leftover - leftover % self.dt
+            self.accumulator = ticks * self.dt + leftover % self.dt
+        self.accumulator -= ticks * self.dt
+        self.ticks += ticks
+        return ticks
+
+    @property
+    def alpha(self):
+        """Progress towards the next tick, from 0 to 1"""
+        return min(self.accumulator / self.dt, 1.0)
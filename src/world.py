@@ -1,57 +1,405 @@
 import numpy as np
-from enum import Enum
+from bitmap import SolidBitmap
+from blocks import BlockType, SOLID, TYPES, lookup
+from chunks import CHUNK_SIZE, ChunkCache
+from journal import ChangeJournal
+import os
+import region
+import storage
+import worldgen
+from worldgen import TerrainGenerator
 
-class BlockType(Enum):
-    AIR = 0
-    DIRT = 1
-    STONE = 2
-    GRASS = 3
+# Surface level used when the world has no fixed height
+DEFAULT_SURFACE_LEVEL = 50
+
+# Rows of a dense world generated at a time, bounding the noise temporaries
+GENERATION_STRIP = 16 * CHUNK_SIZE
+
+def _group_by_chunk(xs, ys):
+    """Yield (cx, cy, indices) for the coordinates falling in each chunk"""
+    chunk_xs, chunk_ys = xs // CHUNK_SIZE, ys // CHUNK_SIZE
+    order = np.lexsort((chunk_xs, chunk_ys))
+    sorted_xs, sorted_ys = chunk_xs[order], chunk_ys[order]
+    if len(order) == 0:
+        return
+    boundaries = (sorted_xs[1:] != sorted_xs[:-1]) | (sorted_ys[1:] != sorted_ys[:-1])
+    starts = np.concatenate(([0], np.flatnonzero(boundaries) + 1))
+    ends = np.append(starts[1:], len(order))
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        yield int(sorted_xs[start]), int(sorted_ys[start]), order[start:end]
 
 class World:
-    def __init__(self, width=100, height=100):
+    def __init__(self, width=100, height=100, seed=None, chunked=False,
+                 memory_budget=None, spill_path=None):
+        """Create a world of width x height blocks.
+
+        With chunked=True the blocks are stored in CHUNK_SIZE chunks that are
+        generated on first access, so startup is constant-time and memory
+        scales with the area actually visited. In chunked mode width and/or
+        height may be None for a world that is unbounded along that axis.
+
+        memory_budget (bytes, chunks.CHUNK_BYTES per chunk) bounds the chunks
+        kept in memory; least recently used chunks are evicted beyond it, with
+        modified ones written to spill_path (a temporary file by default) first.
+        """
+        self._setup(width, height, seed, chunked, memory_budget, spill_path)
+        if not chunked:
+            self.blocks = np.zeros((height, width), dtype=np.int8)
+        self.generate_terrain()
+
+    def _setup(self, width, height, seed, chunked, memory_budget, spill_path):
         self.width = width
         self.height = height
-        self.blocks = np.zeros((height, width), dtype=np.int8)
-        self.SURFACE_LEVEL = height // 2
-        self.generate_terrain()
-    
+        # Pick a concrete seed so the world can always be regenerated
+        if seed is None:
+            seed = int(np.random.default_rng().integers(2**32))
+        self.seed = seed
+        self.chunked = chunked
+        if height is not None:
+            self.SURFACE_LEVEL = height // 2
+        else:
+            self.SURFACE_LEVEL = DEFAULT_SURFACE_LEVEL
+        self.generator = TerrainGenerator(seed, self.SURFACE_LEVEL)
+
+        self.blocks = None
+        self.solid = None  # Packed solidity map kept alongside blocks (dense worlds)
+        self.chunks = None
+        if chunked:
+            self.chunks = ChunkCache(self._load_chunk, memory_budget, spill_path)
+
+        # Persistence state
+        self.save_path = None  # File last saved to or loaded from
+        self.save_codec = None  # Codec of the region directory at save_path, None for a file
+        self.saved_chunks = None  # Chunks stored in that file (chunked worlds)
+        self.dirty_chunks = set()  # Chunks changed since the last save
+
+        # Every block change, for consumers that catch up from a cursor
+        self.journal = ChangeJournal()
+        self.tick = 0  # Simulation tick recorded with each change
+
+        self.prefetcher = None  # Generates chunks in the background, see prefetch.py
+
+    @classmethod
+    def load(cls, path, memory_budget=None, spill_path=None):
+        """Load a world saved with save().
+
+        Tiles of a single world file are memory-mapped rather than read up
+        front, so loading is near-instant and only the regions that are
+        accessed get paged in. A directory is loaded as region files.
+        """
+        is_regions = os.path.isdir(path)
+        if is_regions:
+            header = region.read_world_header(path)
+        else:
+            header = storage.read_header(path)
+        chunked = header.layout == storage.LAYOUT_CHUNKED
+        world = cls.__new__(cls)
+        world._setup(header.width, header.height, header.seed, chunked,
+                     memory_budget, spill_path)
+        if is_regions:
+            store = region.RegionStore(path)
+            world.save_codec = store.codec() or region.DEFAULT_CODEC
+            if chunked:
+                world.saved_chunks = store
+            else:
+                world.blocks = region.load_dense(store, header.width, header.height)
+        elif chunked:
+            world.saved_chunks = storage.SavedChunks(path)
+        else:
+            world.blocks = storage.open_dense(path, header)
+        if not chunked:
+            world.solid = SolidBitmap.from_array(SOLID[world.blocks])
+        world.save_path = path
+        return world
+
+    def save(self, path, codec=None):
+        """Save the world to a binary file.
+
+        With a codec ('zlib', 'lzma', 'rle' or 'none') path is instead a
+        directory of region files with each chunk compressed independently.
+        Without one, a world loaded from or last saved as regions, or saved
+        over an existing region directory, stays in regions with the same
+        codec. Saving again to the same place only rewrites the chunks
+        changed since the last save. Chunked worlds only store chunks that
+        differ from the generated terrain.
+        """
+        if codec is None:
+            if os.path.isdir(path):
+                codec = region.RegionStore(path).codec() or self.save_codec or region.DEFAULT_CODEC
+            else:
+                codec = self.save_codec
+        if codec is not None:
+            region.save_world(self, path, codec)
+            if self.chunked:
+                self.saved_chunks = region.RegionStore(path)
+                for chunk in self.chunks.values():
+                    chunk.is_modified = False
+        elif self.chunked:
+            storage.save_chunked(self, path)
+            self.saved_chunks = storage.SavedChunks(path)
+            # Resident chunks now match the file and can be reloaded from it
+            for chunk in self.chunks.values():
+                chunk.is_modified = False
+        else:
+            storage.save_dense(self, path)
+        self.save_path = path
+        self.save_codec = codec
+        self.dirty_chunks.clear()
+
     def generate_terrain(self):
-        """Generate basic terrain with surface variations"""
-        # Generate surface height variations
-        surface_height = np.zeros(self.width, dtype=np.int32)
-        for x in range(self.width):
-            # Simple sine wave terrain
-            surface_height[x] = self.SURFACE_LEVEL + int(np.sin(x * 0.1) * 5)
-        
-        # Fill terrain
-        for x in range(self.width):
-            height = surface_height[x]
-            # Fill underground with dirt and stone
-            for y in range(height, self.height):
-                if y < height + 5:  # Top layer is dirt
-                    self.blocks[y, x] = BlockType.DIRT.value
-                else:  # Below is stone
-                    if np.random.random() > 0.5:  # 50% chance of stone
-                        self.blocks[y, x] = BlockType.STONE.value
-                    else:
-                        self.blocks[y, x] = BlockType.DIRT.value
-            
-            # Add grass on surface
-            if height > 0:
-                self.blocks[height-1, x] = BlockType.GRASS.value
-    
+        """Generate the terrain of the whole world from the seed"""
+        if self.chunked:
+            # Chunks are regenerated lazily from the seed on next access
+            self.chunks.clear()
+            self.saved_chunks = None
+            self.save_path = None
+            self.save_codec = None
+            return
+
+        for y0 in range(0, self.height, GENERATION_STRIP):
+            self.generator.generate(self.blocks[y0:y0 + GENERATION_STRIP], 0, y0)
+        self.solid = SolidBitmap.from_array(SOLID[self.blocks])
+
+    def generate_chunk(self, cx, cy):
+        """Generate the blocks of chunk (cx, cy) deterministically from the seed"""
+        return worldgen.generate_chunk(self.generator, cx, cy, self.width, self.height)
+
+    def _load_chunk(self, cx, cy):
+        """Read chunk (cx, cy) from the save file, or generate it"""
+        if self.saved_chunks is not None and (cx, cy) in self.saved_chunks:
+            return self.saved_chunks.read((cx, cy))
+        if self.prefetcher is not None:
+            # Generated in the background already, or being generated
+            blocks = self.prefetcher.claim((cx, cy))
+            if blocks is not None:
+                return blocks
+        return self.generate_chunk(cx, cy)
+
+    def needs_generating(self, cx, cy):
+        """Whether chunk (cx, cy) would have to be generated on its next access"""
+        return (self.chunks.get_cached((cx, cy)) is None and not self.chunks.is_spilled((cx, cy))
+                and (self.saved_chunks is None or (cx, cy) not in self.saved_chunks))
+
+    def install_chunk(self, cx, cy, blocks):
+        """Add generated blocks of chunk (cx, cy) to the cache, without copying.
+
+        Ignored, returning False, if the chunk is already loaded or
+        has a saved or spilled copy, which take precedence.
+        """
+        if not self.needs_generating(cx, cy):
+            return False
+        self.chunks.install((cx, cy), blocks)
+        return True
+
+    def get_chunk(self, cx, cy):
+        """Get chunk (cx, cy), generating it on first access"""
+        return self.chunks.get_chunk(cx, cy)
+
+    def in_bounds(self, x, y):
+        """Check if block coordinates are inside the world"""
+        if self.width is not None and not 0 <= x < self.width:
+            return False
+        if self.height is not None and not 0 <= y < self.height:
+            return False
+        return True
+
+    def get_region(self, x0, y0, x1, y1):
+        """Get block ids of the rectangle [x0, x1) x [y0, y1) as an int8 array indexed [y, x].
+
+        Blocks outside the world are air.
+        """
+        region = np.zeros((y1 - y0, x1 - x0), dtype=np.int8)
+        # Clip to the world bounds
+        cx0, cy0, cx1, cy1 = x0, y0, x1, y1
+        if self.width is not None:
+            cx0, cx1 = max(cx0, 0), min(cx1, self.width)
+        if self.height is not None:
+            cy0, cy1 = max(cy0, 0), min(cy1, self.height)
+        if cx0 >= cx1 or cy0 >= cy1:
+            return region
+
+        if not self.chunked:
+            region[cy0 - y0:cy1 - y0, cx0 - x0:cx1 - x0] = self.blocks[cy0:cy1, cx0:cx1]
+            return region
+
+        for cy in range(cy0 // CHUNK_SIZE, (cy1 - 1) // CHUNK_SIZE + 1):
+            for cx in range(cx0 // CHUNK_SIZE, (cx1 - 1) // CHUNK_SIZE + 1):
+                blocks = self.get_chunk(cx, cy).blocks
+                # Overlap of the chunk with the clipped rectangle
+                ox0 = max(cx0, cx * CHUNK_SIZE)
+                ox1 = min(cx1, (cx + 1) * CHUNK_SIZE)
+                oy0 = max(cy0, cy * CHUNK_SIZE)
+                oy1 = min(cy1, (cy + 1) * CHUNK_SIZE)
+                region[oy0 - y0:oy1 - y0, ox0 - x0:ox1 - x0] = \
+                    blocks[oy0 - cy * CHUNK_SIZE:oy1 - cy * CHUNK_SIZE,
+                           ox0 - cx * CHUNK_SIZE:ox1 - cx * CHUNK_SIZE]
+        return region
+
+    def get_blocks(self, xs, ys):
+        """Get block ids at arrays of coordinates, air outside the world"""
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        xs, ys = np.broadcast_arrays(xs, ys)
+        result = np.zeros(xs.shape, dtype=np.int8)
+        inside = np.ones(xs.shape, dtype=bool)
+        if self.width is not None:
+            inside &= (xs >= 0) & (xs < self.width)
+        if self.height is not None:
+            inside &= (ys >= 0) & (ys < self.height)
+        xs, ys = xs[inside], ys[inside]
+
+        if not self.chunked:
+            result[inside] = self.blocks[ys, xs]
+            return result
+
+        # Group the lookups by chunk
+        values = np.empty(xs.shape, dtype=np.int8)
+        for cx, cy, selected in _group_by_chunk(xs, ys):
+            blocks = self.get_chunk(cx, cy).blocks
+            values[selected] = blocks[ys[selected] % CHUNK_SIZE, xs[selected] % CHUNK_SIZE]
+        result[inside] = values
+        return result
+
+    def solid_at(self, xs, ys, out=None):
+        """Check solidity at arrays of coordinates, not solid outside the world.
+
+        The result is written into out, a bool array of the broadcast
+        shape, if given.
+        """
+        if self.chunked:
+            return lookup(SOLID, self.get_blocks(xs, ys), out)
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        xs, ys = np.broadcast_arrays(xs, ys)
+        inside = (xs >= 0) & (xs < self.width) & (ys >= 0) & (ys < self.height)
+        if out is None:
+            result = np.zeros(xs.shape, dtype=bool)
+        else:
+            result = out
+            result.fill(False)
+        result[inside] = self.solid.get_many(xs[inside], ys[inside])
+        return result
+
+    def any_solid(self, x0, y0, x1, y1):
+        """Check if any block in the rectangle from (x0, y0) to (x1, y1) inclusive is solid"""
+        # Clip to the world bounds
+        if self.width is not None:
+            x0, x1 = max(x0, 0), min(x1, self.width - 1)
+        if self.height is not None:
+            y0, y1 = max(y0, 0), min(y1, self.height - 1)
+        if x0 > x1 or y0 > y1:
+            return False
+
+        if not self.chunked:
+            return self.solid.any(x0, y0, x1, y1)
+
+        for cy in range(y0 // CHUNK_SIZE, y1 // CHUNK_SIZE + 1):
+            for cx in range(x0 // CHUNK_SIZE, x1 // CHUNK_SIZE + 1):
+                chunk = self.get_chunk(cx, cy)
+                # Overlap of the chunk with the rectangle, in chunk coordinates
+                ox0 = max(x0 - cx * CHUNK_SIZE, 0)
+                ox1 = min(x1 - cx * CHUNK_SIZE, CHUNK_SIZE - 1)
+                oy0 = max(y0 - cy * CHUNK_SIZE, 0)
+                oy1 = min(y1 - cy * CHUNK_SIZE, CHUNK_SIZE - 1)
+                if chunk.solid.any(ox0, oy0, ox1, oy1):
+                    return True
+        return False
+
     def get_block(self, x, y):
         """Get block type at given coordinates"""
-        if 0 <= x < self.width and 0 <= y < self.height:
-            return BlockType(self.blocks[y, x])
+        if self.in_bounds(x, y):
+            if self.chunked:
+                chunk = self.get_chunk(x // CHUNK_SIZE, y // CHUNK_SIZE)
+                return TYPES[chunk.blocks.item(y % CHUNK_SIZE, x % CHUNK_SIZE)]
+            return TYPES[self.blocks.item(y, x)]
         return BlockType.AIR
-    
+
     def set_block(self, x, y, block_type):
         """Set block type at given coordinates"""
-        if 0 <= x < self.width and 0 <= y < self.height:
+        if not self.in_bounds(x, y):
+            return
+        if self.chunked:
+            chunk = self.get_chunk(x // CHUNK_SIZE, y // CHUNK_SIZE)
+            old = chunk.blocks.item(y % CHUNK_SIZE, x % CHUNK_SIZE)
+            if old == block_type.value:
+                return
+            chunk.blocks[y % CHUNK_SIZE, x % CHUNK_SIZE] = block_type.value
+            chunk.solid.set(x % CHUNK_SIZE, y % CHUNK_SIZE, SOLID[block_type.value])
+            chunk.is_modified = True
+        else:
+            old = self.blocks.item(y, x)
+            if old == block_type.value:
+                return
             self.blocks[y, x] = block_type.value
-    
+            self.solid.set(x, y, SOLID[block_type.value])
+        self.dirty_chunks.add((x // CHUNK_SIZE, y // CHUNK_SIZE))
+        self.journal.record(x, y, old, block_type.value, self.tick)
+
+    def set_blocks(self, xs, ys, block_types):
+        """Set blocks at arrays of coordinates; returns how many changed.
+
+        block_types is a BlockType, a block id or an array of ids matching
+        the coordinates. Coordinates outside the world are ignored, and if
+        one appears more than once the last value wins.
+        """
+        if isinstance(block_types, BlockType):
+            block_types = block_types.value
+        xs = np.asarray(xs, dtype=np.int64)
+        ys = np.asarray(ys, dtype=np.int64)
+        xs, ys, values = np.broadcast_arrays(xs, ys, np.asarray(block_types, dtype=np.int8))
+        xs, ys, values = xs.ravel(), ys.ravel(), values.ravel()
+        inside = np.ones(xs.shape, dtype=bool)
+        if self.width is not None:
+            inside &= (xs >= 0) & (xs < self.width)
+        if self.height is not None:
+            inside &= (ys >= 0) & (ys < self.height)
+        xs, ys, values = xs[inside], ys[inside], values[inside]
+
+        # Keep the last write to each block, in the order they were given.
+        # lexsort is stable, so the last of each run of equal coordinates is
+        # the last write (much faster than np.unique over coordinate pairs)
+        order = np.lexsort((xs, ys))
+        sorted_xs, sorted_ys = xs[order], ys[order]
+        run_ends = np.ones(len(order), dtype=bool)
+        run_ends[:-1] = (sorted_xs[1:] != sorted_xs[:-1]) | (sorted_ys[1:] != sorted_ys[:-1])
+        last = np.sort(order[run_ends])
+        xs, ys, values = xs[last], ys[last], values[last]
+
+        old = self.get_blocks(xs, ys)
+        changed = old != values
+        xs, ys, values, old = xs[changed], ys[changed], values[changed], old[changed]
+        if len(xs) == 0:
+            return 0
+
+        if self.chunked:
+            for cx, cy, selected in _group_by_chunk(xs, ys):
+                self.dirty_chunks.add((cx, cy))
+                chunk = self.get_chunk(cx, cy)
+                local_xs, local_ys = xs[selected] % CHUNK_SIZE, ys[selected] % CHUNK_SIZE
+                chunk.blocks[local_ys, local_xs] = values[selected]
+                chunk.solid.set_many(local_xs, local_ys, SOLID[values[selected]])
+                chunk.is_modified = True
+        else:
+            # Dense worlds are bounded, so chunks can be numbered without np.unique
+            columns = (self.width + CHUNK_SIZE - 1) // CHUNK_SIZE
+            keys = (ys // CHUNK_SIZE) * columns + xs // CHUNK_SIZE
+            for index in np.flatnonzero(np.bincount(keys)).tolist():
+                self.dirty_chunks.add((index % columns, index // columns))
+            self.blocks[ys, xs] = values
+            self.solid.set_many(xs, ys, SOLID[values])
+
+        self.journal.record_many(xs, ys, old, values, self.tick)
+        return len(xs)
+
+    def changes_since(self, cursor):
+        """Block changes recorded since cursor, see ChangeJournal.changes_since"""
+        return self.journal.changes_since(cursor)
+
     def is_solid(self, x, y):
         """Check if block at coordinates is solid"""
-        block = self.get_block(x, y)
-        return block != BlockType.AIR
\ No newline at end of file
+        if not self.in_bounds(x, y):
+            return False
+        if self.chunked:
+            chunk = self.get_chunk(x // CHUNK_SIZE, y // CHUNK_SIZE)
+            return chunk.solid.get(x % CHUNK_SIZE, y % CHUNK_SIZE)
+        return self.solid.get(x, y)
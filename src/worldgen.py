@@ -0,0 +1,311 @@
+"""Procedural terrain generation.
+
+Terrain is built from gradient noise, evaluated with NumPy for a whole
+rectangle of blocks at once, and made by a pipeline of stages that each
+fill in one feature: biome bands, the surface and its soil, caves, then
+ore veins. Every stage is a pure function of the world seed and the
+world coordinates of the blocks, so any rectangle, a chunk or the whole
+world, can be generated on its own and in any order, and always comes
+out the same.
+
+The noise of the stages below ground, which cover most of a world, is
+evaluated in float32 on a coarse lattice fixed in world space and
+interpolated (sampled_noise), so a Terraria-sized world generates in
+about half a second. Dense worlds are generated in strips of rows
+(world.GENERATION_STRIP) to keep the temporaries small.
+"""
+import numpy as np
+
+from blocks import BlockType
+from chunks import CHUNK_SIZE
+
+# Biomes, in bands across the world
+FOREST = 0
+DESERT = 1
+TUNDRA = 2
+
+# Directions of the gradients at the lattice points
+GRADIENTS = np.array([(1, 0), (-1, 0), (0, 1), (0, -1),
+                      (0.7071, 0.7071), (-0.7071, 0.7071),
+                      (0.7071, -0.7071), (-0.7071, -0.7071)], dtype=np.float64)
+
+def derive_seed(seed, salt):
+    """32-bit seed for one use of the world seed, so stages draw independent noise"""
+    return (seed * 0x9E3779B1 + salt * 0x85EBCA6B + 0x27D4EB2F) & 0xFFFFFFFF
+
+def _hash(ix, iy, seed):
+    """Well-mixed uint32 hash of integer lattice coordinates"""
+    h = (ix.astype(np.uint32) * np.uint32(0x27D4EB2D)) ^ (iy.astype(np.uint32) * np.uint32(0x165667B1))
+    h ^= np.uint32(seed)
+    h ^= h >> np.uint32(15)
+    h *= np.uint32(0x2C1B3C6D)
+    h ^= h >> np.uint32(12)
+    h *= np.uint32(0x297A2D39)
+    h ^= h >> np.uint32(15)
+    return h
+
+def gradient_noise(x, y, seed):
+    """2D gradient (Perlin) noise at float coordinates, roughly in [-1, 1].
+
+    x and y broadcast against each other; the noise is 0 on the integer
+    lattice and varies smoothly over about one unit.
+    """
+    x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+    x0, y0 = np.floor(x), np.floor(y)
+    fx, fy = x - x0, y - y0
+    ix, iy = x0.astype(np.int64), y0.astype(np.int64)
+
+    def corner(dx, dy):
+        gradient = GRADIENTS[_hash(ix + dx, iy + dy, seed) & np.uint32(7)]
+        return gradient[..., 0] * (fx - dx) + gradient[..., 1] * (fy - dy)
+
+    # Quintic fade so the noise has no visible creases at lattice lines
+    u = fx * fx * fx * (fx * (fx * 6 - 15) + 10)
+    v = fy * fy * fy * (fy * (fy * 6 - 15) + 10)
+    top_left = corner(0, 0)
+    bottom_left = corner(0, 1)
+    top = top_left + u * (corner(1, 0) - top_left)
+    bottom = bottom_left + u * (corner(1, 1) - bottom_left)
+    return (top + v * (bottom - top)) * 1.4142
+
+def fractal_noise(x, y, seed, octaves=4, persistence=0.5):
+    """Sum of octaves of gradient noise at doubling frequencies, in about [-1, 1]"""
+    total = 0
+    amplitude = 1.0
+    norm = 0.0
+    for octave in range(octaves):
+        frequency = 2 ** octave
+        octave_seed = derive_seed(seed, octave)
+        # Shift each octave so their lattices, where the noise is 0, do not line up
+        shift_x = (octave_seed & 0xFFFF) / 65536 * 100
+        shift_y = (octave_seed >> 16) / 65536 * 100
+        total = total + gradient_noise(x * frequency + shift_x, y * frequency + shift_y,
+                                       octave_seed) * amplitude
+        norm += amplitude
+        amplitude *= persistence
+    return total / norm
+
+# The same gradients split into components, for noise evaluated in float32
+GRADIENT_X = GRADIENTS[:, 0].astype(np.float32)
+GRADIENT_Y = GRADIENTS[:, 1].astype(np.float32)
+
+def grid_noise(xs, ys, seed, octaves=4, persistence=0.5):
+    """fractal_noise in float32 at every point of the grid of xs by ys.
+
+    Returns an array of shape (len(ys), len(xs)). The fade curves and
+    the column and row halves of the hashes are worked out once per
+    column and per row, so only the final mixing is done per point.
+    """
+    total = np.zeros((len(ys), len(xs)), dtype=np.float32)
+    amplitude = 1.0
+    norm = 0.0
+    for octave in range(octaves):
+        frequency = 2 ** octave
+        octave_seed = derive_seed(seed, octave)
+        x = xs * frequency + (octave_seed & 0xFFFF) / 65536 * 100
+        y = ys * frequency + (octave_seed >> 16) / 65536 * 100
+        x0, y0 = np.floor(x), np.floor(y)
+        fx = (x - x0).astype(np.float32)
+        fy = (y - y0).astype(np.float32)[:, np.newaxis]
+        ix, iy = x0.astype(np.int64), y0.astype(np.int64)[:, np.newaxis]
+
+        def corner(dx, dy):
+            gradient = _hash(ix + dx, iy + dy, octave_seed) & np.uint32(7)
+            return GRADIENT_X[gradient] * (fx - dx) + GRADIENT_Y[gradient] * (fy - dy)
+
+        u = fx * fx * fx * (fx * (fx * 6 - 15) + 10)
+        v = fy * fy * fy * (fy * (fy * 6 - 15) + 10)
+        top_left = corner(0, 0)
+        bottom_left = corner(0, 1)
+        top = top_left + u * (corner(1, 0) - top_left)
+        bottom = bottom_left + u * (corner(1, 1) - bottom_left)
+        total += (top + v * (bottom - top)) * np.float32(1.4142 * amplitude)
+        norm += amplitude
+        amplitude *= persistence
+    total /= np.float32(norm)
+    return total
+
+def sampled_noise(x0, y0, width, height, scale_x, scale_y, seed, octaves=2, step=4):
+    """Fractal noise over the width x height blocks from world (x0, y0), in float32.
+
+    The noise is evaluated every step blocks, on a lattice fixed in world
+    space, and bilinearly interpolated in between, so a block gets the
+    same value whatever rectangle it is generated in, for 1/step**2 of
+    the cost of evaluating every block.
+    """
+    gx0, gy0 = x0 // step, y0 // step
+    columns = (x0 + width - 1) // step + 1 - gx0  # Lattice intervals covered
+    rows = (y0 + height - 1) // step + 1 - gy0
+    grid = grid_noise(np.arange(gx0, gx0 + columns + 1) * step / scale_x,
+                      np.arange(gy0, gy0 + rows + 1) * step / scale_y, seed, octaves)
+
+    # Along the rows, then down the columns, over whole lattice intervals
+    # so each pass is one broadcast rather than a gather per block
+    t = np.arange(step, dtype=np.float32) / step
+    left = grid[:, :-1, np.newaxis]
+    along = (left + (grid[:, 1:, np.newaxis] - left) * t).reshape(rows + 1, columns * step)
+    above = along[:-1, np.newaxis]
+    values = (above + (along[1:, np.newaxis] - above) * t[:, np.newaxis]).reshape(rows * step, columns * step)
+    x_offset = x0 - gx0 * step
+    y_offset = y0 - gy0 * step
+    return values[y_offset:y_offset + height, x_offset:x_offset + width]
+
+class Region:
+    """A rectangle of blocks being generated, passed from stage to stage"""
+    def __init__(self, blocks, origin_x, origin_y):
+        self.blocks = blocks
+        self.origin_x = origin_x
+        self.origin_y = origin_y
+        height, width = blocks.shape
+        self.columns = np.arange(origin_x, origin_x + width)  # World x of each column
+        self.rows = np.arange(origin_y, origin_y + height)[:, np.newaxis]  # World y of each row
+        self.biome = None  # Biome of each column, set by BiomeStage
+        self.surface = None  # World y of the first soil row of each column, set by SurfaceStage
+
+    def reaches(self, depth):
+        """Whether any block of the region is at least depth rows below the surface"""
+        return self.rows[-1, 0] >= self.surface.min() + depth
+
+    def first_row(self, depth):
+        """Index of the first row with a block at least depth rows below the surface"""
+        return max(0, int(self.surface.min()) + depth - self.origin_y)
+
+    def depth(self, top=0):
+        """Rows below the surface of each block from row top down, as int32"""
+        return (self.rows[top:] - self.surface).astype(np.int32)
+
+class BiomeStage:
+    """Wide bands of forest, desert and tundra"""
+    def __init__(self, seed, scale=400):
+        self.seed = derive_seed(seed, 1)
+        self.scale = scale
+
+    def __call__(self, region):
+        value = fractal_noise(region.columns / self.scale, 0.5, self.seed, octaves=2)
+        region.biome = np.where(value < -0.25, DESERT, np.where(value > 0.25, TUNDRA, FOREST))
+
+class SurfaceStage:
+    """Rolling hills: air above, a top block, a few rows of soil, then stone"""
+    TOP = {FOREST: BlockType.GRASS, DESERT: BlockType.SAND, TUNDRA: BlockType.SNOW}
+    SOIL = {FOREST: BlockType.DIRT, DESERT: BlockType.SAND, TUNDRA: BlockType.DIRT}
+
+    def __init__(self, seed, surface_level, amplitude=8, scale=64, soil_depth=5):
+        self.seed = derive_seed(seed, 2)
+        self.surface_level = surface_level
+        self.amplitude = amplitude
+        self.scale = scale
+        self.soil_depth = soil_depth
+
+    def __call__(self, region):
+        hills = fractal_noise(region.columns / self.scale, 0.5, self.seed)
+        region.surface = self.surface_level + np.round(hills * self.amplitude).astype(np.int64)
+        # Soil thickness wanders by a couple of rows
+        soil = self.soil_depth + np.round(
+            gradient_noise(region.columns / 16, 10.5, self.seed) * 2).astype(np.int64)
+
+        biome = region.biome if region.biome is not None else np.full(len(region.columns), FOREST)
+        top = np.choose(biome, [self.TOP[key].value for key in (FOREST, DESERT, TUNDRA)])
+        filler = np.choose(biome, [self.SOIL[key].value for key in (FOREST, DESERT, TUNDRA)])
+        rows = region.rows
+        blocks = region.blocks
+        blocks[:] = BlockType.AIR.value
+        # Masks broadcast a row of values down the columns without int64 temporaries
+        np.copyto(blocks, top.astype(np.int8), where=rows == region.surface - 1)
+        np.copyto(blocks, filler.astype(np.int8), where=(rows >= region.surface) & (rows < region.surface + soil))
+        np.copyto(blocks, BlockType.STONE.value, where=rows >= region.surface + soil)
+
+class CaveStage:
+    """Winding tunnels, wider with depth, and open caverns deep down"""
+    def __init__(self, seed, start_depth=8, scale=32, cavern_depth=40, step=8):
+        self.seed = derive_seed(seed, 3)
+        self.cavern_seed = derive_seed(seed, 4)
+        self.start_depth = start_depth
+        self.scale = scale
+        self.cavern_depth = cavern_depth
+        self.step = step  # Blocks between noise samples, see sampled_noise
+
+    def __call__(self, region):
+        if not region.reaches(self.start_depth):
+            return
+        top = region.first_row(self.start_depth)
+        depth = region.depth(top)
+        height, width = depth.shape
+        # Tunnels follow the zero crossings of the noise
+        tunnel_width = np.minimum(depth, 100).astype(np.float32) * np.float32(0.0003) + np.float32(0.03)
+        noise = sampled_noise(region.origin_x, region.origin_y + top, width, height,
+                              self.scale, self.scale, self.seed, step=self.step)
+        carve = (np.abs(noise) < tunnel_width) & (depth >= self.start_depth)
+        if region.reaches(self.cavern_depth):
+            deep_top = region.first_row(self.cavern_depth)
+            caverns = sampled_noise(region.origin_x, region.origin_y + deep_top, width,
+                                    height - (deep_top - top), 2 * self.scale, self.scale,
+                                    self.cavern_seed, step=self.step) > 0.55
+            caverns &= depth[deep_top - top:] >= self.cavern_depth
+            carve[deep_top - top:] |= caverns
+        region.blocks[top:][carve] = BlockType.AIR.value
+
+class OreStage:
+    """Veins of one ore in the stone below min_depth"""
+    def __init__(self, seed, block_type, min_depth, threshold=0.5, scale=6, salt=0, octaves=1, step=4):
+        self.seed = derive_seed(seed, 5 + salt)
+        self.block_type = block_type
+        self.min_depth = min_depth
+        self.threshold = threshold
+        self.scale = scale
+        self.octaves = octaves
+        self.step = step  # Blocks between noise samples, see sampled_noise
+
+    def __call__(self, region):
+        if not region.reaches(self.min_depth):
+            return
+        top = region.first_row(self.min_depth)
+        blocks = region.blocks[top:]
+        height, width = blocks.shape
+        veins = sampled_noise(region.origin_x, region.origin_y + top, width, height,
+                              self.scale, self.scale, self.seed, self.octaves, self.step) > self.threshold
+        veins &= blocks == BlockType.STONE.value
+        veins &= region.depth(top) >= self.min_depth
+        blocks[veins] = self.block_type.value
+
+def default_stages(seed, surface_level):
+    return [
+        BiomeStage(seed),
+        SurfaceStage(seed, surface_level),
+        CaveStage(seed),
+        OreStage(seed, BlockType.COAL_ORE, min_depth=6, threshold=0.43, salt=0),
+        OreStage(seed, BlockType.IRON_ORE, min_depth=25, threshold=0.47, scale=5, salt=1),
+    ]
+
+class TerrainGenerator:
+    def __init__(self, seed, surface_level, stages=None):
+        """Run stages (default_stages() if None) over regions of a world"""
+        self.seed = seed
+        self.surface_level = surface_level
+        self.stages = default_stages(seed, surface_level) if stages is None else stages
+
+    def generate(self, blocks, origin_x, origin_y):
+        """Fill blocks with the terrain of the rectangle starting at (origin_x, origin_y)"""
+        region = Region(blocks, origin_x, origin_y)
+        for stage in self.stages:
+            stage(region)
+        return region
+
+def generate_chunk(generator, cx, cy, width=None, height=None):
+    """Blocks of chunk (cx, cy) of a world width x height blocks (None if unbounded).
+
+    A plain function of its arguments, so it can run in a worker thread
+    or process.
+    """
+    blocks = np.empty((CHUNK_SIZE, CHUNK_SIZE), dtype=np.int8)
+    origin_x = cx * CHUNK_SIZE
+    origin_y = cy * CHUNK_SIZE
+    generator.generate(blocks, origin_x, origin_y)
+
+    # Blocks outside a bounded world are always air
+    if width is not None:
+        blocks[:, max(0, min(CHUNK_SIZE, width - origin_x)):] = BlockType.AIR.value
+        blocks[:, :max(0, min(CHUNK_SIZE, -origin_x))] = BlockType.AIR.value
+    if height is not None:
+        blocks[max(0, min(CHUNK_SIZE, height - origin_y)):, :] = BlockType.AIR.value
+        blocks[:max(0, min(CHUNK_SIZE, -origin_y)), :] = BlockType.AIR.value
+    return blocks